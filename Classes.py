@@ -1,17 +1,32 @@
-import visualiser_random_forest_graph as vis
 import graph_helper as gh
-import random
 import networkx
 import scipy
+import numpy as np
 from typing import List, Tuple, Dict
 import math
-import time
 import matplotlib.pyplot as plt
+import dispatch
+import render_loop
+import frame_capture
+import graph_io
+import validation
+import telemetry as telemetry_module
+import checkpoint
+import instrumentation as instrumentation_module
+import backends
 from collections import deque
+import heapq
+import contextlib
 
 class Graph:
-    def __init__(self, edges=None, pos_nodes=None):
-        """Initializes the Graph class, with edges and pos_nodes as optional parameters"""
+    def __init__(self, edges=None, pos_nodes=None, seed=None, rng=None, backend="object"):
+        """
+        Initializes the Graph class, with edges and pos_nodes as optional parameters.
+
+        All random draws of the graph, its land patches and fire fighters come from rng, a numpy.random.Generator,
+        which is created from seed if it is not given. The same seed therefore gives the same simulation.
+        backend is the name of the compute backend simulations are run with by default, see backends.py.
+        """
         self.edges = edges if edges is not None else [] # List of tuples representing the edges
         self.positions = pos_nodes if pos_nodes is not None else {} #Dictionary mapping node ID's to position tuples
         self.color_map = {} #Dictionary mapping node ID's and colors
@@ -19,7 +34,28 @@ class Graph:
         self.land_patches = {} #Dictionary mapping node ID's to land patches
         self.fire_fighters = {}
         self.fire_fighter_positions = []
+        self.fire_fighters_at = {} #Dictionary mapping node ID's to the fire fighters standing on them
+        self.fire_fighter_slots = {} #Dictionary mapping fire fighter ID's to their index in fire_fighter_positions
+        self.indexed_fire_fighters = {} #Copy of fire_fighters the position index is built from, to notice direct changes to it
+        self.probability_spread_fire = 0.3 #Chance for a burning patch to spread fire to a neighbor, set per run
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.backend = backend
+
+        self.synchronous = False #If True, land patches are read from the current state and written to the next state
+        self.next_conversions = {} #Dictionary mapping node ID's to the kind and reset arguments their land patch turns into in the next state
+        self.next_fire_status = {} #Dictionary mapping node ID's to whether they are on fire in the next state
+
+        self.active_frontier = False #If True, only the land patches in active_patches are updated every step
+        self.active_patches = set() #Node ID's of burning patches, regrowing trees, rocks and patches with fire fighters
+        self.frontier_queue = None #Heap of node ID's still to be updated in the current asynchronous frontier step
+        self.frontier_queued = set()
+        self.frontier_position = None #Node ID currently being updated in an asynchronous frontier step
+        self.rock_events = None #Heap of (step, node ID) when rocks become trees, if rock regrowth is scheduled
+        self.current_step = 0
+        self.dispatcher = None #FireDispatcher guiding fire fighters toward the nearest unclaimed fire, if enabled
         
+        self.graph_arrays = None #graph_io.GraphArrays of a graph loaded from the binary cache
+        self.parse_report = None #graph_io.ParseReport of the last loaded graph file
         self.nodes = set()
         
         self.node_list = list()
@@ -28,6 +64,23 @@ class Graph:
         self.tree_patches = []
         self.rock_patches = []
         self.wild_fires = []
+        self.burned_area = [] #Number of nodes that have been on fire since the start of the simulation
+        self.average_treestats = []
+        self.fire_fighter_utilisation = [] #Fraction of the fire fighters standing on a burning patch
+        self.colours = None #Colour value of every node in increasing order of ID as int16, kept up to date while frames are recorded
+        self.colour_slots = {} #Dictionary mapping node ID's to their index in colours
+        self.telemetry = None #Sink the statistics are streamed to instead of the lists above, see telemetry.py
+        self.telemetry_path = None #Directory of the telemetry of the last simulation, read by show_plot
+        self.telemetry_rows = 0 #Rows streamed to the telemetry in the current simulation, saved in checkpoints to resume it
+        self.instrumentation = None #instrumentation.Instrumentation timing and counting the running simulation, if enabled
+
+        #Live counters, updated on every transition so the statistics of a step cost O(1)
+        self.tree_count = 0
+        self.rock_count = 0
+        self.fire_count = 0
+        self.treestats_total = 0 #Sum of the treestats of all treepatches
+        self.burned_nodes = set()
+        self.fighting_fire_fighters = 0 #Fire fighters standing on a burning patch
     
     def get_edges(self):
         """Retrieves all edges of the graph as a list of tuples."""
@@ -87,8 +140,13 @@ class Graph:
         return self.fire_fighters.get(fire_fighter_id)
 
     def generate_graph(self, num_nodes:int):
-       """ Generates a graph structure with a specified number of nodes"""
-       self.edges, self.positions = gh.voronoi_to_edges(num_nodes)
+       """
+       Generates a graph structure with a specified number of nodes.
+       The arrays of the graph are kept in graph_arrays, so the array engine does not build its adjacency again.
+       """
+       self.graph_arrays = gh.voronoi_arrays(num_nodes, rng=self.rng)
+       self.edges = self.graph_arrays.edge_list()
+       self.positions = self.graph_arrays.position_map()
     
     def generate_colormap(self):
         """
@@ -105,6 +163,32 @@ class Graph:
                     self.color_map[node] = stats - 256 #256 is the maximum treestat, therefore max will be 0 - 256 for the color -256
             elif type(land) == Rockpatch:
                 pass
+
+    def track_colours(self, enabled=True):
+        """
+        Starts (or with enabled False stops) keeping the colour value of every node, as in the color map, in the colours
+        array. It is updated whenever a land patch changes, so a frame can be recorded without a pass over the graph.
+        """
+        if not enabled:
+            self.colours = None
+            self.colour_slots = {}
+            return
+        nodes = sorted(self.get_nodes())
+        self.colour_slots = {node: i for i, node in enumerate(nodes)}
+        self.colours = np.full(len(nodes), frame_capture.NO_COLOUR, dtype=np.int16)
+        for node in nodes:
+            self.update_colour(node)
+
+    def update_colour(self, node_id, on_fire=None):
+        """Updates the colour value of a node in the colours array, with on_fire overriding the fire status of its treepatch."""
+        if self.colours is None:
+            return
+        land = self.search_landpatches(node_id)
+        if isinstance(land, Treepatch):
+            on_fire = land.get_is_on_fire() if on_fire is None else on_fire
+            self.colours[self.colour_slots[node_id]] = int(land.get_treestats() - 256 if on_fire else land.get_treestats())
+        else:
+            self.colours[self.colour_slots[node_id]] = frame_capture.NO_COLOUR
     
     def generate_adjacency_list(self):
         """Generates or the adjacency list of the graph based on its current nodes and edges."""
@@ -122,29 +206,273 @@ class Graph:
     def generate_land_patches(self, probability_tree=0.8):
         """Generates land patches based on a given probability."""
         for node in self.nodes:
-            patch = random.choices(["tree", "rock"], weights=[probability_tree, 1- probability_tree], k=1)[0]
-            if patch == "tree":
-                self.land_patches[node] = Treepatch(node, self, treestats=100)
-            elif patch == "rock":
-                self.land_patches[node] = Rockpatch(node, self)
+            if self.rng.random() < probability_tree:
+                self.set_landpatch(node, Treepatch(node, self, treestats=100))
+            else:
+                self.set_landpatch(node, Rockpatch(node, self))
 
     def generate_fire_fighters(self, amount_to_create:int, skill_level_lower=0.4,skill_level_higher=0.6):
         """Generates a specified number of fire fighters with skills ranging between given levels."""
         self.fire_fighters
-        start_positions = random.sample(self.node_list,amount_to_create)
+        start_positions = self.rng.choice(len(self.node_list), amount_to_create, replace=False)
         for i in range(amount_to_create):
-            self.fire_fighters[i] = FireFighter(i,self,start_positions[i],random.uniform(skill_level_lower,skill_level_higher))
+            self.add_fire_fighter(FireFighter(i,self,self.node_list[start_positions[i]],self.rng.uniform(skill_level_lower,skill_level_higher)))
+
+    def add_fire_fighter(self, fire_fighter):
+        """Adds a fire fighter to the graph and to the position index, replacing any fire fighter with the same id."""
+        fire_fighter_id = fire_fighter.get_id()
+        previous = self.search_fire_fighters(fire_fighter_id)
+        if previous is not None:
+            self.leave_node(previous, previous.get_current_position())
+        else:
+            self.fire_fighter_slots[fire_fighter_id] = len(self.fire_fighter_positions)
+            self.fire_fighter_positions.append(None)
+        self.fire_fighters[fire_fighter_id] = fire_fighter
+        self.indexed_fire_fighters[fire_fighter_id] = fire_fighter
+        self.enter_node(fire_fighter, fire_fighter.get_current_position())
+
+    def get_fire_fighters_at(self, node_id):
+        """Retrieves the fire fighters standing on a node."""
+        return self.fire_fighters_at.get(node_id, [])
+
+    def enter_node(self, fire_fighter, node_id):
+        """Adds a fire fighter to the position index of a node."""
+        self.fire_fighters_at.setdefault(node_id, []).append(fire_fighter)
+        if self.is_on_fire(node_id):
+            self.fighting_fire_fighters += 1
+        if self.search_fire_fighters(fire_fighter.get_id()) is fire_fighter:
+            self.fire_fighter_positions[self.fire_fighter_slots[fire_fighter.get_id()]] = node_id
+
+    def leave_node(self, fire_fighter, node_id):
+        """
+        Removes a fire fighter from the position index of a node, and releases the treepatch of the node
+        when the fire fighter was the one working there, or the last one standing there.
+        """
+        fire_fighters_here = self.fire_fighters_at.get(node_id, [])
+        if fire_fighter not in fire_fighters_here:
+            return
+        fire_fighters_here.remove(fire_fighter)
+        if not fire_fighters_here:
+            del self.fire_fighters_at[node_id]
+        if self.is_on_fire(node_id):
+            self.fighting_fire_fighters -= 1
+        land = self.search_landpatches(node_id)
+        if isinstance(land, Treepatch):
+            if land.get_local_fire_fighter() is fire_fighter:
+                land.set_local_fire_fighter(None)
+            if not fire_fighters_here and land.get_has_fire_fighter():
+                land.set_has_fire_fighter(False)
+
+    def move_fire_fighter(self, fire_fighter, new_position_id):
+        """Moves a fire fighter to a new node, keeping the position index up to date."""
+        self.leave_node(fire_fighter, fire_fighter.get_current_position())
+        fire_fighter.current_position = new_position_id
+        self.enter_node(fire_fighter, new_position_id)
 
     def update_colormap(self, node_id, color):
         """Updates the color of a specific node in the graph's color map."""
         self.color_map[node_id] = color
 
     def update_fire_fighter_positions(self):
-        """Updates the positions of all fire fighters in the graph."""
+        """
+        Updates the positions of all fire fighters in the graph.
+
+        The positions are kept up to date as fire fighters move, so they are only rebuilt when
+        fire fighters were added to, replaced in or removed from the fire_fighters dictionary directly.
+        """
+        if self.indexed_fire_fighters == self.fire_fighters: #Compares the fire fighter objects by identity
+            return
+        self.indexed_fire_fighters = dict(self.fire_fighters)
         self.fire_fighter_positions = []
+        self.fire_fighter_slots = {}
+        self.fire_fighters_at = {}
+        self.fighting_fire_fighters = 0
         for fire_fighter_id in self.fire_fighters:
             fire_fighter = self.search_fire_fighters(fire_fighter_id)
-            self.fire_fighter_positions.append(fire_fighter.get_current_position())
+            self.fire_fighter_slots[fire_fighter_id] = len(self.fire_fighter_positions)
+            self.fire_fighter_positions.append(None)
+            self.enter_node(fire_fighter, fire_fighter.get_current_position())
+
+    def set_landpatch(self, node_id, landpatch):
+        """Sets the land patch of a node, keeping the live counters up to date."""
+        previous = self.search_landpatches(node_id)
+        if previous is not None:
+            self.count_landpatch(previous, -1)
+            if self.instrumentation is not None and type(previous) != type(landpatch):
+                self.instrumentation.count("mutations")
+        self.land_patches[node_id] = landpatch
+        self.count_landpatch(landpatch, 1)
+
+    def count_landpatch(self, landpatch, sign:int):
+        """Adds (sign 1) or removes (sign -1) a land patch to or from the live counters."""
+        if isinstance(landpatch, Treepatch):
+            self.tree_count += sign
+            self.treestats_total += sign * landpatch.get_treestats()
+            if landpatch.get_is_on_fire():
+                self.fire_count += sign
+                self.fighting_fire_fighters += sign * len(self.get_fire_fighters_at(landpatch.get_id()))
+        elif isinstance(landpatch, Rockpatch):
+            self.rock_count += sign
+        if sign > 0 and self.colours is not None:
+            self.update_colour(landpatch.get_id())
+
+    def fire_status_changed(self, node_id, status:bool):
+        """Updates the live counters when the treepatch of a node catches fire (status True) or is extinguished."""
+        sign = 1 if status else -1
+        self.fire_count += sign
+        if self.instrumentation is not None:
+            self.instrumentation.count("ignitions" if status else "extinguishes")
+        self.fighting_fire_fighters += sign * len(self.get_fire_fighters_at(node_id))
+        if status:
+            self.burned_nodes.add(node_id)
+        if self.colours is not None:
+            self.update_colour(node_id, status) #The treepatch still has its previous status
+
+    def recount(self):
+        """Sets the live counters from a full pass over the graph, for land patches that were not added with set_landpatch."""
+        self.tree_count = self.rock_count = self.fire_count = self.fighting_fire_fighters = 0
+        self.treestats_total = 0
+        for node_id in self.get_nodes():
+            self.count_landpatch(self.search_landpatches(node_id), 1)
+        self.burned_nodes = {node_id for node_id in self.get_nodes() if self.is_on_fire(node_id)}
+        self.fighting_fire_fighters = sum(len(self.get_fire_fighters_at(node_id)) for node_id in self.burned_nodes)
+
+    def record_statistics(self, step:int):
+        """
+        Records the amount of trees, rocks and fires, and the other statistics of the current state, from the live counters.
+        They are appended to the statistics lists, or streamed to the telemetry sink if there is one.
+        """
+        average_treestats = self.treestats_total / self.tree_count if self.tree_count else 0.0
+        fire_fighters = len(self.get_fire_fighters())
+        utilisation = self.fighting_fire_fighters / fire_fighters if fire_fighters else 0.0
+        if self.telemetry is not None:
+            self.telemetry.append(step, self.tree_count, self.rock_count, self.fire_count, len(self.burned_nodes),
+                                  average_treestats, utilisation)
+            self.telemetry_rows += 1
+            return
+        if step > 0: #updates starts with 0 already
+            self.updates.append(step)
+        self.tree_patches.append(self.tree_count)
+        self.rock_patches.append(self.rock_count)
+        self.wild_fires.append(self.fire_count)
+        self.burned_area.append(len(self.burned_nodes))
+        self.average_treestats.append(average_treestats)
+        self.fire_fighter_utilisation.append(utilisation)
+
+    def convert_landpatch(self, node_id, kind, *state):
+        """
+        Turns the land patch of a node into a new patch of another kind (Treepatch or Rockpatch) in place,
+        resetting it with the given state, in the next state when the graph is updated synchronously.
+        """
+        if self.synchronous:
+            self.next_conversions[node_id] = (kind, state)
+        else:
+            self.set_landpatch_kind(node_id, kind, *state)
+
+    def set_landpatch_kind(self, node_id, kind, *state):
+        """Switches the class of the land patch of a node and resets it, keeping the live counters up to date."""
+        landpatch = self.search_landpatches(node_id)
+        self.count_landpatch(landpatch, -1)
+        if self.instrumentation is not None and type(landpatch) != kind:
+            self.instrumentation.count("mutations")
+        landpatch.__class__ = kind
+        landpatch.reset(*state)
+        self.count_landpatch(landpatch, 1)
+        self.landpatch_changed(node_id)
+
+    def set_fire_status(self, node_id, status:bool):
+        """Sets whether the treepatch of a node is on fire, in the next state when the graph is updated synchronously."""
+        if self.synchronous:
+            self.next_fire_status[node_id] = status
+        else:
+            self.search_landpatches(node_id).set_is_on_fire(status)
+
+    def commit_next_state(self):
+        """Makes the next state the current state after a synchronous update step."""
+        for node_id, (kind, state) in self.next_conversions.items():
+            self.set_landpatch_kind(node_id, kind, *state)
+        for node_id, status in self.next_fire_status.items():
+            landpatch = self.search_landpatches(node_id)
+            if isinstance(landpatch, Treepatch):
+                landpatch.set_is_on_fire(status)
+        self.next_conversions = {}
+        self.next_fire_status = {}
+
+    def landpatch_changed(self, node_id):
+        """Informs the active frontier and the fire dispatcher that the land patch of a node or its fire status changed."""
+        self.activate(node_id)
+        if self.dispatcher is not None:
+            self.dispatcher.update_node(node_id)
+
+    def is_on_fire(self, node_id):
+        """Returns whether the land patch of a node is a treepatch on fire."""
+        land = self.search_landpatches(node_id)
+        return isinstance(land, Treepatch) and land.get_is_on_fire()
+
+    def is_unclaimed_fire(self, node_id):
+        """Returns whether the land patch of a node is a treepatch on fire without a fire fighter."""
+        return self.is_on_fire(node_id) and not self.search_landpatches(node_id).get_has_fire_fighter()
+
+    def activate(self, node_id):
+        """
+        Adds a node to the active frontier, when the graph is stepped with one.
+
+        During an asynchronous step a node after the one being updated is also queued, so it is still updated
+        in this step, in increasing order of the node ID's. A full asynchronous step updates the nodes in the iteration
+        order of the node set instead, so only synchronous steps give the same result with and without a frontier.
+        """
+        if not self.active_frontier:
+            return
+        self.active_patches.add(node_id)
+        if self.frontier_queue is not None and node_id > self.frontier_position and node_id not in self.frontier_queued:
+            heapq.heappush(self.frontier_queue, node_id)
+            self.frontier_queued.add(node_id)
+
+    def is_quiescent(self, node_id):
+        """
+        Returns whether a node cannot change in the next step, which is the case for fully grown trees that are not on fire,
+        and for rocks when their regrowth is scheduled.
+        """
+        land = self.search_landpatches(node_id)
+        if isinstance(land, Rockpatch):
+            return self.rock_events is not None
+        return not land.get_is_on_fire() and land.get_treestats() > 246
+
+    def schedule_rock(self, node_id):
+        """
+        Draws the step at which a new rock becomes a tree and adds it to the rock events, if rock regrowth is scheduled.
+
+        A rock has a 1% chance to become a tree every step after the one it was created in,
+        so the waiting time is geometric with p = 0.01.
+        """
+        if self.rock_events is None:
+            return None
+        convert_step = self.current_step + int(self.rng.geometric(0.01))
+        heapq.heappush(self.rock_events, (convert_step, node_id))
+        return convert_step
+
+    def initialise_rock_events(self):
+        """Schedules the regrowth of every rock in the graph with one vectorized draw."""
+        rocks = sorted(node_id for node_id in self.get_nodes() if isinstance(self.search_landpatches(node_id), Rockpatch))
+        convert_steps = self.current_step + self.rng.geometric(0.01, size=len(rocks))
+        self.rock_events = []
+        for node_id, convert_step in zip(rocks, convert_steps.tolist()):
+            self.search_landpatches(node_id).convert_step = convert_step
+            self.rock_events.append((convert_step, node_id))
+        heapq.heapify(self.rock_events)
+
+    def pop_due_rocks(self):
+        """Removes and returns the rocks that become trees in the current step."""
+        due = []
+        while self.rock_events and self.rock_events[0][0] <= self.current_step:
+            due.append(heapq.heappop(self.rock_events)[1])
+        return due
+
+    def initialise_active_frontier(self):
+        """Fills the active frontier with every node that can change, and every node with a fire fighter."""
+        self.update_fire_fighter_positions()
+        self.active_patches = {node_id for node_id in self.get_nodes() if not self.is_quiescent(node_id)}
+        self.active_patches.update(self.get_fire_fighter_positions())
 
     def add_edge(self, node1_id, node2_id):
         """ Adds an edge between two specified nodes in the graph, effectively connecting them."""
@@ -157,7 +485,7 @@ class Graph:
         for node in self.get_nodes():
             landpatch = self.search_landpatches(node)
             if isinstance(landpatch, Treepatch):
-                chance_to_ignite = random.random()
+                chance_to_ignite = self.rng.random()
                 if chance_to_ignite <= probability_ignition:
                     landpatch.set_is_on_fire(True)
     
@@ -174,16 +502,17 @@ class Graph:
         if not self.nodes:  # Quick return if no nodes in the graph
             return True
 
-        visited = set()
-        queue = deque([next(iter(self.nodes))])  # Start BFS from an arbitrary node
+        start = next(iter(self.nodes))  # Start BFS from an arbitrary node
+        visited = {start}
+        queue = deque([start])
 
         while queue:
             node = queue.popleft()
-            if node not in visited:
-                visited.add(node)
-                # Add all unvisited neighbors to the queue
-                neighbors = self.search_adj_list_neighbors(node)
-                queue.extend([neighbor for neighbor in neighbors if neighbor not in visited])
+            # Nodes are marked when they are queued, so no node is queued twice
+            for neighbor in self.search_adj_list_neighbors(node):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
 
         # If all nodes are visited, graph is connected
         if len(visited) == len(self.nodes):
@@ -191,7 +520,16 @@ class Graph:
         else:
             return False
     
-    def load_graph(self, data_file: str):
+    def validate(self, check_planar=False):
+        """
+        Validates the graph with validation.validate_arrays and returns the ValidationReport (components and planarity).
+        The arrays of the graph are built once and kept in graph_arrays. Planarity is only checked if check_planar is True.
+        """
+        if self.graph_arrays is None:
+            self.graph_arrays = graph_io.GraphArrays.from_edges(self.edges)
+        return validation.validate_arrays(self.graph_arrays, check_planar)
+
+    def load_graph(self, data_file: str, use_cache=False, cache_dir=None):
         """
         Loads a graph from a specified file.
 
@@ -200,6 +538,12 @@ class Graph:
 
         Args:
         data_file (str): The path to the file containing the graph data.
+        use_cache (bool): If True, the file is converted once to a binary cache keyed by its content (see graph_io.load_cached),
+        and later loads read the cached arrays instead of parsing the file. The arrays are kept in graph_arrays.
+        cache_dir (str): Directory of the cache, .graph_cache next to the file by default.
+
+        Malformed lines are reported once, in a single message, and the graph_io.ParseReport with their line numbers
+        is kept in parse_report.
 
         Returns:
         list: A list of tuples representing the edges of the graph.
@@ -213,23 +557,35 @@ class Graph:
         >>> len(graph)  # Number of complete tuples in the file
         2
         """
-        with open(data_file, "r") as data:
-            self.edges = []
-            
-            for line in data:
-                if not line.strip() or line.strip().startswith("#"):
-                    continue
-                
-                parts = line.strip().strip("()").split(",")
-
-                if len(parts) == 2:
-                    try:
-                        self.edges.append((int(parts[0]), int(parts[1])))
-                    except ValueError:
-                        print("\n\nThere was an incomplete entry in your graph file.\nThe entry has been ignored, but if you want all entries in the graph, please go back and fix the wrong entry.")
-                        time.sleep(2)
-                        continue # If conversion to int fails, skip line
+        if use_cache:
+            self.graph_arrays = graph_io.load_cached(data_file, cache_dir)
+            self.edges = self.graph_arrays.edge_list()
+            self.parse_report = self.graph_arrays.parse_report
+        else:
+            edges, self.parse_report = graph_io.parse_edges_text(data_file)
+            self.graph_arrays = None
+            self.edges = list(map(tuple, edges.tolist()))
+        if self.parse_report is not None and self.parse_report.malformed:
+            print(f"\n\nThere were incomplete entries in your graph file.\n{self.parse_report.summary()}.\nIf you want all entries in the graph, please go back and fix them.")
     
+    def load_landscape(self, landscape):
+        """
+        Loads the graph and the initial land patches of a landscapes.Landscape in bulk, from its arrays.
+        This replaces create_node_list, generate_adjacency_list and generate_land_patches.
+        """
+        arrays = landscape.arrays
+        self.graph_arrays = arrays
+        self.edges = arrays.edge_list()
+        self.positions = arrays.position_map()
+        node_ids = arrays.node_ids.tolist()
+        self.nodes = set(node_ids)
+        self.node_list = list(self.nodes)
+        neighbors = arrays.node_ids[arrays.indices].tolist()
+        offsets = arrays.offsets.tolist()
+        self.adj_list = {node: neighbors[offsets[i]:offsets[i + 1]] for i, node in enumerate(node_ids)}
+        for node, is_tree in zip(node_ids, landscape.is_tree().tolist()):
+            self.set_landpatch(node, Treepatch(node, self) if is_tree else Rockpatch(node, self))
+
     def count_patches(self, node_id):
         """Counts and returns the number of trees, rocks and fires on a specific node and returns it."""
         current_land = self.search_landpatches(node_id)
@@ -244,64 +600,255 @@ class Graph:
             rock = 1
         return tree, rock, fire
         
-    def run_simulation(self, update_steps:int):
-        """Runs a simulation on the graph for a specified number of update steps."""
-        initial_tree_patches = 0
-        initial_rock_patches = 0
-        initial_wild_fires = 0
-        
-        #Get initial amount of trees, rocks and fires
+    def update_frontier_step(self, step:int):
+        """
+        Updates only the land patches in the active frontier one step, records the amount of trees, rocks and fires
+        and moves the fire fighters. The cost scales with the size of the frontier instead of the size of the graph.
+        """
+        instrumentation = self.instrumentation
+        started = instrumentation.clock() if instrumentation is not None else 0
+        to_update = set(self.active_patches)
+        if self.rock_events is not None:
+            to_update.update(self.pop_due_rocks())
+        if self.synchronous:
+            for node_id in sorted(to_update):
+                self.search_landpatches(node_id).update_land()
+            self.commit_next_state()
+        else:
+            self.frontier_queue = sorted(to_update)
+            self.frontier_queued = set(self.frontier_queue)
+            while self.frontier_queue:
+                self.frontier_position = heapq.heappop(self.frontier_queue)
+                self.search_landpatches(self.frontier_position).update_land()
+            self.frontier_queue = None
+            self.frontier_queued = set()
+            self.frontier_position = None
+        if instrumentation is not None:
+            instrumentation.add_time("land_update", started)
+
+        self.record_statistics(step)
+        self.move_fire_fighters()
+
+        self.active_patches = {node_id for node_id in self.active_patches if not self.is_quiescent(node_id)}
+        self.active_patches.update(self.get_fire_fighter_positions())
+
+    def update_step(self, step:int):
+        """
+        Updates every land patch one step, records the amount of trees, rocks and fires and moves the fire fighters.
+        The statistics are read from the live counters after the whole step.
+        """
+        self.current_step = step
+        if self.active_frontier:
+            self.update_frontier_step(step)
+            return
+        instrumentation = self.instrumentation
+        started = instrumentation.clock() if instrumentation is not None else 0
+        if self.rock_events is not None:
+            self.pop_due_rocks() # Every rock is updated anyway, so the due events are only removed
         for node_id in self.get_nodes():
-            current_land = self.search_landpatches(node_id)
-            if isinstance(current_land, Treepatch):
-                initial_tree_patches += 1
-                if current_land.get_is_on_fire():
-                        initial_wild_fires += 1
-            elif isinstance(current_land, Rockpatch):
-                    initial_rock_patches += 1
-        
-        self.tree_patches.append(initial_tree_patches)
-        self.rock_patches.append(initial_rock_patches)
-        self.wild_fires.append(initial_wild_fires)
-
-        update_steps = update_steps
-
-        visual = vis.Visualiser(self.get_edges(), pos_nodes=self.get_positions())
-        visual.update_node_colours(self.get_colormap())
-        visual.update_node_edges(self.get_fire_fighter_positions())
-
-        for steps in range(update_steps):
-            trees = 0
-            rocks = 0
-            fires = 0
-            for node_id in self.get_nodes():
-                change_land = self.search_landpatches(node_id)
-                change_land.update_land()
-                tree, rock, fire = self.count_patches(node_id)
-                trees += tree
-                rocks += rock
-                fires += fire
-            self.tree_patches.append(trees)
-            self.rock_patches.append(rocks)
-            self.wild_fires.append(fires)
-            self.updates.append(steps + 1)
-
-            for fire_fighter_id in self.get_fire_fighters():
-                fire_fighter = self.search_fire_fighters(fire_fighter_id)
-                fire_fighter.move()
+            change_land = self.search_landpatches(node_id)
+            change_land.update_land()
+        if self.synchronous:
+            self.commit_next_state()
+        if instrumentation is not None:
+            instrumentation.add_time("land_update", started)
+        self.record_statistics(step)
+        self.move_fire_fighters()
+
+    def move_fire_fighters(self):
+        """Moves every fire fighter and updates their positions."""
+        instrumentation = self.instrumentation
+        started = instrumentation.clock() if instrumentation is not None else 0
+        for fire_fighter_id in self.get_fire_fighters():
+            fire_fighter = self.search_fire_fighters(fire_fighter_id)
+            fire_fighter.move()
+        if instrumentation is not None:
+            instrumentation.add_time("fire_fighter_move", started)
+            started = instrumentation.clock()
+        self.update_fire_fighter_positions()
+        if instrumentation is not None:
+            instrumentation.add_time("update_fire_fighter_positions", started)
+
+    def run_simulation(self, update_steps:int, probability_spread_fire=0.3, visualise=True, synchronous=False,
+                       active_frontier=False, rock_events=False, dispatch_fire_fighters=False, target_fps=5,
+                       snapshot_every=None, snapshot_file="generic_graph_step_{step}.png", final_snapshot_file="generic_graph_1.pdf",
+                       record_frames=None, telemetry=None, checkpoint_every=None, checkpoint_dir="checkpoints", resume=False,
+                       instrument=False, profile=False, backend=None):
+        """
+        Runs a simulation on the graph for a specified number of update steps.
+
+        With visualise set to False no Visualiser is created, so the simulation can run without a display.
+        Otherwise the frames are drawn by a separate render process at most target_fps times per second, without slowing
+        down the simulation. Every snapshot_every steps a frame is saved to snapshot_file (formatted with the step),
+        and the final frame is saved to final_snapshot_file, if they are not None.
+        With synchronous set to True every land patch is updated from the state at the start of the step,
+        so the result does not depend on the order the nodes are updated in.
+        With active_frontier set to True only burning patches, regrowing trees, rocks and patches with fire fighters
+        are updated, and nodes are updated in increasing order of their ID. This gives the same result as updating
+        every patch only when synchronous is also set.
+        With rock_events set to True the step at which every rock becomes a tree is drawn once when the rock is created,
+        and with an active frontier only the rocks due in a step are updated.
+        With dispatch_fire_fighters set to True fire fighters walk toward the nearest unclaimed fire in the whole graph,
+        instead of only looking at their neighbors.
+        With record_frames set to a file name every frame is recorded to that file, to be exported with frame_capture.export_frames.
+        With telemetry set to a directory name (or a telemetry.ColumnarSink) the statistics of every step are streamed there
+        instead of kept in the statistics lists, so memory use does not grow with the number of steps.
+        With checkpoint_every set, the complete state is saved to checkpoint_dir every checkpoint_every steps
+        by a background writer, see checkpoint.py.
+        With resume set to True the simulation continues for update_steps more steps from the current state and with the
+        current settings, such as a graph loaded with checkpoint.load_checkpoint, instead of starting again at step 0.
+        With instrument set to True the time of every phase and the count of every event is recorded per step, and the
+        instrumentation.Instrumentation holding them is returned. With profile also set to True the run is wrapped in cProfile.
+        backend is the name of the compute backend (see backends.py), the backend of the graph by default. The array backends
+        always update synchronously, only show frames and the final snapshot, and record the amount of trees, rocks and fires.
+        """
+        backend = backends.get_backend(backend if backend is not None else self.backend)
+        if backend.forest_class is not None:
+            options = {"synchronous": synchronous, "active_frontier": active_frontier, "rock_events": rock_events,
+                       "dispatch_fire_fighters": dispatch_fire_fighters, "snapshot_every": snapshot_every,
+                       "record_frames": record_frames, "telemetry": telemetry, "checkpoint_every": checkpoint_every,
+                       "resume": resume, "instrument": instrument}
+            unsupported = [name for name, value in options.items() if value]
+            if unsupported:
+                raise ValueError(f"{', '.join(unsupported)} can only be used with the object backend, not {backend.name}")
+            self.run_forest(backend, update_steps, probability_spread_fire, visualise, target_fps, final_snapshot_file)
+            return None
+        if not resume:
+            self.probability_spread_fire = probability_spread_fire
+            self.synchronous = synchronous
+            self.active_frontier = active_frontier
+            self.current_step = 0
+            self.rock_events = None
+            if rock_events:
+                self.initialise_rock_events()
+            if active_frontier:
+                self.initialise_active_frontier()
+            self.dispatcher = dispatch.FireDispatcher(self) if dispatch_fire_fighters else None
+            #Get initial amount of trees, rocks and fires, after which the counters are updated on every transition
             self.update_fire_fighter_positions()
-            self.generate_colormap()
-            
-            visual.update_node_colours(self.get_colormap())
-            visual.update_node_edges(self.get_fire_fighter_positions())
+            self.recount()
+        first_step = self.current_step
+        last_step = first_step + update_steps
+        if not resume:
+            self.telemetry_rows = 0
+        #Everything opened for the run is closed when it ends, also when a step fails, so queued checkpoints,
+        #buffered telemetry rows and recorded frames are written and the render process is stopped
+        with contextlib.ExitStack() as outputs:
+            own_sink = isinstance(telemetry, str)
+            #A resumed simulation continues its telemetry from the rows it had, dropping rows written after its checkpoint
+            self.telemetry = telemetry_module.ColumnarSink(telemetry, rows=self.telemetry_rows if resume else None) if own_sink else telemetry
+            self.telemetry_path = telemetry if own_sink else getattr(telemetry, "path", None)
+            if self.telemetry is not None:
+                outputs.callback(self.close_telemetry, own_sink)
+            if not resume:
+                self.record_statistics(0)
+            writer = checkpoint.CheckpointWriter(checkpoint_dir) if checkpoint_every else None
+            if writer is not None:
+                outputs.callback(writer.close)
+
+            renderer = render_loop.RenderProcess(self.get_edges(), self.get_positions(), target_fps, nodes=sorted(self.get_nodes())) if visualise else None
+            if renderer is not None:
+                outputs.callback(renderer.close)
+            recorder = frame_capture.FrameRecorder.for_graph(record_frames, self) if record_frames else None
+            if recorder is not None:
+                outputs.callback(recorder.close)
+                self.track_colours() #Recorded frames are copied from the colours array
+                outputs.callback(self.track_colours, False)
+            if renderer is not None:
+                self.generate_colormap()
+            if recorder is not None:
+                recorder.record_graph(first_step, self)
+            if renderer is not None:
+                renderer.publish(first_step, self.get_colormap(), self.get_fire_fighter_positions())
 
-        visual.wait_close()
+            instrumentation = instrumentation_module.Instrumentation(profile) if instrument else None
+            if instrumentation is not None:
+                instrumentation.start(self)
+                outputs.callback(instrumentation.stop, self) #Also gives the graph back its rng and disables the profiler
+            for step in range(first_step + 1, last_step + 1):
+                self.update_step(step)
+                if writer is not None and step % checkpoint_every == 0:
+                    if self.telemetry is not None:
+                        self.telemetry.flush() #The checkpoint can only be resumed from rows that are on disk
+                    writer.submit(self)
+                snapshot = None
+                if snapshot_every and snapshot_file is not None and step % snapshot_every == 0:
+                    snapshot = snapshot_file.format(step=step)
+                if step == last_step and final_snapshot_file is not None:
+                    snapshot = final_snapshot_file
+                #A frame that would be dropped by the renderer does not need a color map
+                draw = renderer is not None and (snapshot is not None or renderer.wants_frame())
+                started = instrumentation.clock() if instrumentation is not None else 0
+                if draw:
+                    self.generate_colormap()
+                if instrumentation is not None:
+                    instrumentation.add_time("generate_colormap", started)
+                    started = instrumentation.clock()
+                if recorder is not None:
+                    recorder.record_graph(step, self)
+                if draw:
+                    renderer.publish(step, self.get_colormap(), self.get_fire_fighter_positions(), snapshot)
+                if instrumentation is not None:
+                    instrumentation.add_time("render", started)
+                    instrumentation.end_step(step)
+        return instrumentation
+
+    def close_telemetry(self, own_sink:bool):
+        """Closes the telemetry sink of a simulation if it was opened by it, or flushes it otherwise, and detaches it."""
+        if own_sink:
+            self.telemetry.close()
+        else:
+            self.telemetry.flush()
+        self.telemetry = None
     
-    def show_plot(self):
-        """Shows the reporting part of the simulation, where statistics are shown."""
-        plt.plot(self.updates, self.tree_patches, label="Tree Patches", color="green")
-        plt.plot(self.updates, self.rock_patches, label="Rock Patches", color="gray")
-        plt.plot(self.updates, self.wild_fires, label="Wild Fires", color="red")
+    def run_forest(self, backend, update_steps:int, probability_spread_fire=0.3, visualise=True, target_fps=5,
+                   final_snapshot_file="generic_graph_1.pdf"):
+        """
+        Runs a simulation with an array backend (a backends.Backend) for a specified number of update steps,
+        and writes the final state back to the land patches and fire fighters of the graph.
+        """
+        self.probability_spread_fire = probability_spread_fire
+        self.update_fire_fighter_positions()
+        forest = backend.create_forest(self, probability_spread_fire)
+        forest.run(0) # Records the initial amount of trees, rocks and fires
+        renderer = render_loop.RenderProcess(self.get_edges(), self.get_positions(), target_fps, nodes=sorted(self.get_nodes())) if visualise else None
+        if renderer is not None:
+            renderer.publish(0, forest.generate_colormap(), forest.get_fire_fighter_positions())
+        try:
+            for step in range(1, update_steps + 1):
+                forest.step()
+                snapshot = final_snapshot_file if step == update_steps else None
+                if renderer is not None and (snapshot is not None or renderer.wants_frame()):
+                    renderer.publish(step, forest.generate_colormap(), forest.get_fire_fighter_positions(), snapshot)
+            if renderer is not None:
+                renderer.close()
+        finally:
+            forest.close() # Also stops the worker processes of the forest when a step fails or is interrupted
+
+        self.current_step = update_steps
+        self.updates = forest.updates
+        self.tree_patches = forest.tree_patches
+        self.rock_patches = forest.rock_patches
+        self.wild_fires = forest.wild_fires
+        self.burned_area = []
+        self.average_treestats = []
+        self.fire_fighter_utilisation = []
+        self.telemetry_path = None
+        backends.write_forest(forest, self)
+
+    def show_plot(self, max_points=2000):
+        """
+        Shows the reporting part of the simulation, where statistics are shown.
+        The statistics are read lazily from the telemetry of the last simulation if it was streamed to disk,
+        and every series is downsampled to about max_points points keeping its minima and maxima.
+        """
+        if self.telemetry_path is not None:
+            columns = telemetry_module.load_telemetry(self.telemetry_path)
+        else:
+            columns = {"step": self.updates, "tree_patches": self.tree_patches, "rock_patches": self.rock_patches, "wild_fires": self.wild_fires}
+        for name, label, color in (("tree_patches", "Tree Patches", "green"), ("rock_patches", "Rock Patches", "gray"), ("wild_fires", "Wild Fires", "red")):
+            steps, values = telemetry_module.downsample_minmax(columns["step"], columns[name], max_points)
+            plt.plot(steps, values, label=label, color=color)
         plt.xlabel("Update Steps")
         plt.ylabel("Count")
         plt.title("Simulation Over Time")
@@ -309,11 +856,19 @@ class Graph:
         plt.show()
 
 class Landpatch:
-    """The base class for the tree and rock patch, with basic functionality."""
+    """
+    The base class for the tree and rock patch, with basic functionality.
+
+    Every node keeps one land patch object for the whole simulation: when a tree burns out or a rock regrows,
+    the class of the object is switched in place by Graph.convert_landpatch. All slots of both kinds are therefore
+    declared here, so trees and rocks have the same layout; the tree state of a rock is None.
+    """
+    __slots__ = ("id", "graph", "neighbors", "treestats", "is_on_fire", "has_fire_fighter", "local_fire_fighter", "convert_step")
+
     def __init__(self, id: int, graph: Graph):
         self.id = id
         self.graph = graph
-        self.neighbors = graph.search_adj_list_neighbors(id) # This should be a list of neighbor IDs
+        self.neighbors = graph.search_adj_list_neighbors(id) # The list of neighbor IDs in the adjacency list, not a copy
 
     def get_neighbors(self):
         """Return the ID of the next neighbors to the present patch."""
@@ -330,51 +885,70 @@ class Landpatch:
 
 class Rockpatch(Landpatch):
     """Create a rockpatch, a subclass of the landpatch class."""
+    __slots__ = ()
+
     def __init__(self, id: int, graph: Graph):
         super().__init__(id, graph)
+        self.reset(graph.schedule_rock(id))
+
+    def reset(self, convert_step=None):
+        """Sets the state of a new rockpatch, which becomes a tree at convert_step if rock regrowth is scheduled."""
+        self.treestats = None
+        self.is_on_fire = None
+        self.has_fire_fighter = None
+        self.local_fire_fighter = None
+        self.convert_step = convert_step #Step at which this rock becomes a tree, if rock regrowth is scheduled
 
     def mutate(self):
-        """Create a treepatch and replace it in the landpatches dictionary, where this rockpatch used to be."""
-        new_treepatch = Treepatch(self.id, self.graph)
-        self.graph.land_patches[self.id] = new_treepatch
+        """Turns this rockpatch into a new treepatch."""
+        self.graph.convert_landpatch(self.id, Treepatch)
     
     def update_land(self):
         """Updates the rockpatch, which means seeing if it should randomly become a treepatch with a chance of 1%"""
-        chance_to_convert = random.randint(1,100)
+        if self.graph.rock_events is not None:
+            if self.convert_step <= self.graph.current_step:
+                self.mutate()
+            return
+        chance_to_convert = self.graph.rng.integers(1,101)
         if chance_to_convert == 1:
             self.mutate()
 
 
 class Treepatch(Landpatch):
     """Creates a treepatch, which has special properties like tree stats, is on fire and has fire fighter."""
+    __slots__ = ()
+
     def __init__(self, id: int, graph:Graph, treestats=100):
         super().__init__(id, graph)
+        self.reset(treestats)
+
+    def reset(self, treestats=100):
+        """Sets the state of a new treepatch, which is not on fire and has no fire fighter."""
         self.treestats = treestats  # Health of the Treepatch, default value is 100
         self.is_on_fire = False
         self.has_fire_fighter = False
         self.local_fire_fighter = None
+        self.convert_step = None
 
     def update_land(self):
         """Updates the value of treestats due to fire or firefighter action, representing one step of time evolution."""
         if self.is_on_fire == False and self.treestats <= 246:
-            self.treestats += 10
+            self.set_treestats(self.treestats + 10)
 
         elif self.is_on_fire == True and self.has_fire_fighter == False:
-            self.treestats -= 20
-            self.spread_fire()
+            self.set_treestats(self.treestats - 20)
+            self.spread_fire(self.graph.probability_spread_fire)
 
         elif self.is_on_fire == True and self.has_fire_fighter == True:
             if self.local_fire_fighter is None:
-                for fire_fighter_id in self.graph.get_fire_fighters():
-                    current_fire_fighter = self.graph.search_fire_fighters(fire_fighter_id)
-                    if current_fire_fighter.get_current_position() == self.get_id():
-                        self.set_local_fire_fighter(current_fire_fighter)
-                        break
+                fire_fighters_here = self.graph.get_fire_fighters_at(self.get_id())
+                if fire_fighters_here:
+                    self.set_local_fire_fighter(min(fire_fighters_here, key=FireFighter.get_id))
             if self.local_fire_fighter:
                 skill_boost = self.local_fire_fighter.get_skill_level() * 100
-                self.treestats += skill_boost
+                self.set_treestats(self.treestats + skill_boost)
                 if self.treestats >= 150:
-                    self.set_is_on_fire(False)
+                    self.graph.set_fire_status(self.id, False)
                     self.set_local_fire_fighter(None)
                     self.set_has_fire_fighter(False)
         
@@ -383,9 +957,8 @@ class Treepatch(Landpatch):
             
 
     def mutate(self):
-        """Create a rockpatch and replace it in the landpatches dictionary, where this treepatch used to be."""
-        new_rockpatch = Rockpatch(self.id, self.graph)
-        self.graph.land_patches[self.id] = new_rockpatch
+        """Turns this treepatch into a new rockpatch. Its regrowth is scheduled now, like for a rockpatch created now."""
+        self.graph.convert_landpatch(self.id, Rockpatch, self.graph.schedule_rock(self.id))
         
     def get_is_on_fire(self):
         """Retrieves the boolean value of whether this treepatch is on fire."""
@@ -405,28 +978,49 @@ class Treepatch(Landpatch):
 
     def set_is_on_fire(self, status:bool):
         """Sets the status of the treepatch to be on fire"""
+        if status != self.is_on_fire and self.graph.search_landpatches(self.id) is self:
+            self.graph.fire_status_changed(self.id, status)
         self.is_on_fire = status
+        self.graph.landpatch_changed(self.id)
+
+    def set_treestats(self, treestats):
+        """Sets the treestats of this treepatch"""
+        if self.graph.search_landpatches(self.id) is self:
+            self.graph.treestats_total += treestats - self.treestats
+        self.treestats = treestats
+        if self.graph.colours is not None:
+            self.graph.update_colour(self.id)
     
     def set_has_fire_fighter(self, status:bool):
         """Sets the status of the treepatch to be true that it has a fire fighter"""
         self.has_fire_fighter = status
+        if self.graph.dispatcher is not None:
+            self.graph.dispatcher.update_node(self.id)
     
     def set_local_fire_fighter(self, local_fire_fighter):
         """Sets the local fire fighter to be the fire fighter given as argument"""
         self.local_fire_fighter = local_fire_fighter
 
     def spread_fire(self, probability_spread_fire=0.3):
-        """Spreads fire to neighbor patches with a 30% chance"""
+        """Spreads fire to neighbor patches with a chance given by probability_spread_fire, 30% by default"""
+        instrumentation = self.graph.instrumentation
+        started = instrumentation.clock() if instrumentation is not None else 0
         for neighbor_id in self.get_neighbors():
             neighbor_land = self.graph.search_landpatches(neighbor_id)
             if isinstance(neighbor_land, Treepatch) and neighbor_land.get_is_on_fire() == False:
-                fire_spread = random.choices([True, False], weights=[probability_spread_fire,1-probability_spread_fire],k=1)[0]
+                fire_spread = self.graph.rng.random() < probability_spread_fire
+                if instrumentation is not None:
+                    instrumentation.count("spread_attempts")
                 if fire_spread:
-                    neighbor_land.set_is_on_fire(True)
+                    self.graph.set_fire_status(neighbor_id, True)
+        if instrumentation is not None:
+            instrumentation.add_time("spread_fire", started)
             
 
 class FireFighter:
     """Creates a new fire fighter and gives it a starting position in the graph"""
+    __slots__ = ("id", "graph", "current_position", "skill_level")
+
     def __init__(self, id:int, graph:Graph, start_node_id:int, skill_level=0.5):
         self.id = id
         self.graph = graph
@@ -442,8 +1036,8 @@ class FireFighter:
         return self.current_position
     
     def set_current_position(self, new_position_id:int):
-        """Sets the current position of this fire fighter"""
-        self.current_position = new_position_id
+        """Sets the current position of this fire fighter, and updates the position index of the graph"""
+        self.graph.move_fire_fighter(self, new_position_id)
     
     def get_skill_level(self):
         """Sets the skill level of this fire fighter"""
@@ -455,16 +1049,31 @@ class FireFighter:
         neighbors = self.graph.search_adj_list_neighbors(self.get_current_position())
         if isinstance(current_land,Treepatch) and current_land.get_is_on_fire():
             current_land.set_has_fire_fighter(True)
+        elif not neighbors:
+            return # A node without neighbors, such as an isolated raster cell, cannot be left
+        elif self.graph.dispatcher is not None:
+            self.move_toward_fire(neighbors)
         else:
             found_new_position = False
             for neighbor in neighbors:
                 landpatch = self.graph.search_landpatches(neighbor)
                 if isinstance(landpatch, Treepatch) and landpatch.get_is_on_fire() and landpatch.get_has_fire_fighter() == False and found_new_position == False:
-                    self.current_position = landpatch.get_id()
+                    self.set_current_position(landpatch.get_id())
                     found_new_position = True
                     break
                 else:
                     continue
             if found_new_position == False:
-                next_position = random.choices(neighbors)[0]
-                self.current_position = next_position
+                next_position = neighbors[self.graph.rng.integers(len(neighbors))]
+                self.set_current_position(next_position)
+
+    def move_toward_fire(self, neighbors):
+        """Moves this fire fighter one hop toward the nearest unclaimed fire given by the dispatcher, or randomly if there is none."""
+        dispatcher = self.graph.dispatcher
+        next_position = dispatcher.get_next_hop(self.get_current_position())
+        if next_position is None or next_position == self.get_current_position():
+            if not neighbors:
+                return
+            next_position = neighbors[self.graph.rng.integers(len(neighbors))]
+        self.set_current_position(next_position)
+        dispatcher.claim(next_position)
@@ -0,0 +1,242 @@
+"""
+This module provides ArrayForest, an array-backed alternative to the object model in Classes.py.
+
+The whole forest is stored as NumPy arrays (a CSR adjacency built from the adjacency list,
+the treestats of every patch, the patch type, a burning mask and a has-fire-fighter mask),
+and every update step is advanced with vectorized operations following the same rules as
+Treepatch.update_land and Rockpatch.update_land.
+
+Notes
+-----
+All patches are updated from the state at the start of the step (synchronous update),
+so a patch ignited during a step only starts burning on the next step.
+Treestats are stored as int16, so the skill boost of a fire fighter is truncated to an integer.
+"""
+
+import numpy as np
+
+ROCK = 0
+TREE = 1
+
+MAX_TREESTATS = 256 # Maximum treestat, used for the colors of burning patches
+GROWTH_LIMIT = 246 # Trees grow as long as their treestats are at or below this value
+GROWTH = 10
+BURN_DAMAGE = 20
+EXTINGUISH_LIMIT = 150
+NEW_TREE_TREESTATS = 100
+PROBABILITY_ROCK_TO_TREE = 0.01
+
+
+def build_csr(node_ids, adj_list):
+    """Builds CSR offsets and indices (in node index space) from an adjacency list dictionary."""
+    index_of = {node: i for i, node in enumerate(node_ids.tolist())}
+    degrees = np.fromiter((len(adj_list.get(node, [])) for node in node_ids.tolist()), dtype=np.int64, count=len(node_ids))
+    offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=offsets[1:])
+    indices = np.fromiter((index_of[neighbor] for node in node_ids.tolist() for neighbor in adj_list.get(node, [])),
+                          dtype=np.int64, count=int(offsets[-1]))
+    return offsets, indices
+
+
+class ArrayForest:
+    """Keeps the state of a forest as NumPy arrays and advances it with vectorized update steps."""
+    def __init__(self, node_ids, offsets, indices, patch_type, treestats, burning,
+                 fire_fighter_positions=None, fire_fighter_skills=None, rng=None, probability_spread_fire=0.3):
+        """
+        Parameters
+        ----------
+        node_ids: np.ndarray
+            Node ID of every node index, sorted.
+        offsets, indices: np.ndarray
+            CSR adjacency, the neighbors of node index i are indices[offsets[i]:offsets[i+1]].
+        patch_type: np.ndarray
+            TREE or ROCK for every node index.
+        treestats: np.ndarray
+            Treestats of every node index (ignored for rocks).
+        burning: np.ndarray
+            Boolean mask of the trees that are on fire.
+        fire_fighter_positions, fire_fighter_skills: np.ndarray, optional
+            Node index and skill level of every fire fighter.
+        rng: np.random.Generator, optional
+            Random generator used for all random draws.
+        probability_spread_fire: float, default 0.3
+            Chance that a burning patch without a fire fighter sets a neighboring tree on fire.
+        """
+        self.node_ids = np.asarray(node_ids)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.patch_type = np.asarray(patch_type, dtype=np.int8).copy()
+        self.treestats = np.asarray(treestats, dtype=np.int16).copy()
+        self.burning = np.asarray(burning, dtype=bool).copy()
+        self.has_fire_fighter = np.zeros(len(self.node_ids), dtype=bool)
+        self.fire_fighter_positions = np.asarray(fire_fighter_positions if fire_fighter_positions is not None else [], dtype=np.int64).copy()
+        self.fire_fighter_skills = np.asarray(fire_fighter_skills if fire_fighter_skills is not None else [], dtype=np.float64).copy()
+        self.degrees = np.diff(self.offsets)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.probability_spread_fire = probability_spread_fire
+
+        self.updates = [0]
+        self.tree_patches = []
+        self.rock_patches = []
+        self.wild_fires = []
+
+    @classmethod
+    def from_graph(cls, graph, rng=None, probability_spread_fire=0.3):
+        """Creates an ArrayForest from the nodes, land patches and fire fighters of a Classes.Graph, drawing from its rng by default."""
+        import Classes
+
+        node_ids = np.array(sorted(graph.get_nodes()), dtype=np.int64)
+        index_of = {node: i for i, node in enumerate(node_ids.tolist())}
+        arrays = graph.graph_arrays
+        if arrays is not None and np.array_equal(arrays.node_ids, node_ids):
+            offsets, indices = arrays.offsets, arrays.indices # Same neighbor order as the adjacency list
+        else:
+            offsets, indices = build_csr(node_ids, graph.get_adj_list())
+
+        patch_type = np.full(len(node_ids), ROCK, dtype=np.int8)
+        treestats = np.zeros(len(node_ids), dtype=np.int16)
+        burning = np.zeros(len(node_ids), dtype=bool)
+        for node, i in index_of.items():
+            land = graph.search_landpatches(node)
+            if isinstance(land, Classes.Treepatch):
+                patch_type[i] = TREE
+                treestats[i] = int(land.get_treestats())
+                burning[i] = land.get_is_on_fire()
+
+        fire_fighters = [graph.search_fire_fighters(fire_fighter_id) for fire_fighter_id in graph.get_fire_fighters()]
+        positions = [index_of[fire_fighter.get_current_position()] for fire_fighter in fire_fighters]
+        skills = [fire_fighter.get_skill_level() for fire_fighter in fire_fighters]
+
+        forest = cls(node_ids, offsets, indices, patch_type, treestats, burning, positions, skills,
+                     rng=rng if rng is not None else graph.rng,
+                     probability_spread_fire=probability_spread_fire)
+        forest.update_has_fire_fighter()
+        return forest
+
+    def get_neighbors(self, index):
+        """Retrieves the node indices of the neighbors of a node index."""
+        return self.indices[self.offsets[index]:self.offsets[index + 1]]
+
+    def count_patches(self):
+        """Counts and returns the number of trees, rocks and fires in the forest."""
+        trees = int(np.count_nonzero(self.patch_type == TREE))
+        return trees, len(self.patch_type) - trees, int(np.count_nonzero(self.burning))
+
+    def update_has_fire_fighter(self):
+        """Marks the burning trees that have a fire fighter standing on them."""
+        self.has_fire_fighter[:] = False
+        self.has_fire_fighter[self.fire_fighter_positions] = True
+        self.has_fire_fighter &= self.burning
+
+    def local_skill_levels(self):
+        """Returns the skill level of the first fire fighter standing on every node index, 0 where there is none."""
+        skills = np.zeros(len(self.node_ids), dtype=np.float64)
+        positions, first = np.unique(self.fire_fighter_positions, return_index=True)
+        skills[positions] = self.fire_fighter_skills[first]
+        return skills
+
+    def gather_edges(self, sources):
+        """Returns the positions in indices of all outgoing edges of the given node indices."""
+        counts = self.degrees[sources]
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        # Every edge position is its source offset plus its rank among the edges of that source
+        starts = np.repeat(self.offsets[sources] - np.cumsum(counts) + counts, counts)
+        return starts + np.arange(total, dtype=np.int64)
+
+    def spread_fire(self, sources):
+        """
+        Returns a mask of the trees ignited by the given burning node indices.
+
+        All outgoing edges of the sources are collected at once, one Bernoulli trial is drawn per edge
+        to a tree that is not on fire, and the ignited targets are scattered into the mask.
+        """
+        ignited = np.zeros(len(self.node_ids), dtype=bool)
+        targets = self.indices[self.gather_edges(sources)]
+        targets = targets[(self.patch_type[targets] == TREE) & ~self.burning[targets]]
+        spread = self.rng.random(len(targets)) < self.probability_spread_fire
+        ignited[targets[spread]] = True
+        return ignited
+
+    def update_land(self):
+        """Updates every patch of the forest one step, following the rules of Treepatch and Rockpatch."""
+        tree = self.patch_type == TREE
+        rock = ~tree
+        burning = self.burning
+        protected = burning & self.has_fire_fighter
+        unprotected = burning & ~self.has_fire_fighter
+        # Drawn before any state changes, so every rock gets exactly one chance to convert
+        convert = rock & (self.rng.random(len(self.node_ids)) < PROBABILITY_ROCK_TO_TREE)
+
+        ignited = self.spread_fire(np.flatnonzero(unprotected))
+
+        growing = tree & ~burning & (self.treestats <= GROWTH_LIMIT)
+        self.treestats[growing] += GROWTH
+        self.treestats[unprotected] -= BURN_DAMAGE
+
+        boost = (self.local_skill_levels()[protected] * 100).astype(np.int16)
+        self.treestats[protected] += boost
+        extinguished = protected & (self.treestats >= EXTINGUISH_LIMIT)
+        self.burning[extinguished] = False
+
+        burnt_out = tree & (self.treestats <= 0)
+        self.patch_type[burnt_out] = ROCK
+        self.burning[burnt_out] = False
+
+        self.patch_type[convert] = TREE
+        self.treestats[convert] = NEW_TREE_TREESTATS
+
+        self.burning |= ignited
+        self.update_has_fire_fighter()
+
+    def move_fire_fighters(self):
+        """Moves every fire fighter to a neighboring burning patch without a fire fighter, or else randomly."""
+        for fire_fighter, position in enumerate(self.fire_fighter_positions.tolist()):
+            if self.burning[position]:
+                self.has_fire_fighter[position] = True
+                continue
+            neighbors = self.get_neighbors(position)
+            if len(neighbors) == 0:
+                continue
+            targets = neighbors[self.burning[neighbors] & ~self.has_fire_fighter[neighbors]]
+            if len(targets):
+                self.fire_fighter_positions[fire_fighter] = targets[0]
+            else:
+                self.fire_fighter_positions[fire_fighter] = neighbors[self.rng.integers(len(neighbors))]
+
+    def generate_colormap(self):
+        """Generates a color map for the trees in the same format as Graph.generate_colormap."""
+        trees = np.flatnonzero(self.patch_type == TREE)
+        colours = self.treestats[trees].astype(np.int64)
+        colours[self.burning[trees]] -= MAX_TREESTATS
+        return dict(zip(self.node_ids[trees].tolist(), colours.tolist()))
+
+    def get_fire_fighter_positions(self):
+        """Retrieves the node IDs of the positions of all fire fighters."""
+        return self.node_ids[self.fire_fighter_positions].tolist()
+
+    def step(self):
+        """Advances the forest one update step and records the statistics."""
+        self.update_land()
+        trees, rocks, fires = self.count_patches()
+        self.tree_patches.append(trees)
+        self.rock_patches.append(rocks)
+        self.wild_fires.append(fires)
+        self.updates.append(self.updates[-1] + 1)
+        self.move_fire_fighters()
+
+    def close(self):
+        """Releases the resources of the forest, which an ArrayForest does not have. The state can still be read afterwards."""
+
+    def run(self, update_steps:int, probability_spread_fire=None):
+        """Runs the simulation for a specified number of update steps, without visualisation."""
+        if probability_spread_fire is not None:
+            self.probability_spread_fire = probability_spread_fire
+        if not self.tree_patches:
+            trees, rocks, fires = self.count_patches()
+            self.tree_patches.append(trees)
+            self.rock_patches.append(rocks)
+            self.wild_fires.append(fires)
+        for _ in range(update_steps):
+            self.step()
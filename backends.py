@@ -0,0 +1,190 @@
+"""
+This module is the registry of compute backends, the ways the update steps of a simulation can be run.
+
+    object  The reference object model of Classes.py, a Graph stepping its Treepatch and Rockpatch objects.
+    numpy   array_engine.ArrayForest, stepping the whole forest with vectorized NumPy operations.
+    numba   JitForest, an ArrayForest whose land update, fire spreading and counting are fused into one
+            compiled pass over the CSR arrays. Without Numba installed it falls back to the numpy backend.
+    domains domain_decomposition.DomainForest, stepping spatial domains of the forest in parallel worker processes.
+
+A backend is selected by name, with Graph(backend=...) or Graph.run_simulation(backend=...).
+The array backends update all patches synchronously and follow the rules of array_engine, so their statistics
+match those of the object model with synchronous updates, though not draw for draw.
+
+Example:
+    >>> graph.run_simulation(500, visualise=False, backend="numba")
+    >>> get_backend("numba").name   # "numpy" if Numba is not installed
+"""
+
+import warnings
+import numpy as np
+from array_engine import ArrayForest, ROCK, TREE, GROWTH_LIMIT, GROWTH, BURN_DAMAGE, EXTINGUISH_LIMIT, \
+    NEW_TREE_TREESTATS, PROBABILITY_ROCK_TO_TREE
+from domain_decomposition import DomainForest
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _fused_step(offsets, indices, patch_type, treestats, burning, has_fire_fighter, local_skills, convert_draws,
+                spread_draws, probability_spread_fire, next_patch_type, next_burning):
+    """
+    Updates every patch one step in a single pass over the nodes and returns the number of trees and fires after it.
+
+    The state at the start of the step is read from patch_type and burning, and the next state is written
+    to next_patch_type and next_burning, so the result does not depend on the order of the nodes.
+    Treestats are only read and written for the node itself, so they are updated in place.
+    A rock becomes a tree if its convert draw is below PROBABILITY_ROCK_TO_TREE, and the k-th burning patch without
+    a fire fighter sets its j-th neighbor on fire if spread_draws[k, j] is below probability_spread_fire.
+    """
+    next_burning[:] = False
+    trees = 0
+    fires = 0
+    source = 0
+    for i in range(len(patch_type)):
+        if patch_type[i] == ROCK:
+            if convert_draws[i] < PROBABILITY_ROCK_TO_TREE:
+                next_patch_type[i] = TREE
+                treestats[i] = NEW_TREE_TREESTATS
+                trees += 1
+            else:
+                next_patch_type[i] = ROCK
+            continue
+        if not burning[i]:
+            if treestats[i] <= GROWTH_LIMIT:
+                treestats[i] += GROWTH
+            next_patch_type[i] = TREE
+            trees += 1
+            continue # A tree set on fire by a neighbor was counted when it was set on fire
+        still_burning = True
+        if has_fire_fighter[i]:
+            treestats[i] += int(local_skills[i] * 100)
+            still_burning = treestats[i] < EXTINGUISH_LIMIT
+        else:
+            treestats[i] -= BURN_DAMAGE
+            for k in range(offsets[i], offsets[i + 1]):
+                j = indices[k]
+                if patch_type[j] == TREE and not burning[j] and not next_burning[j] \
+                        and spread_draws[source, k - offsets[i]] < probability_spread_fire:
+                    next_burning[j] = True
+                    fires += 1
+            source += 1
+        if treestats[i] <= 0:
+            next_patch_type[i] = ROCK
+        else:
+            next_patch_type[i] = TREE
+            trees += 1
+            if still_burning:
+                next_burning[i] = True
+                fires += 1
+    return trees, fires
+
+
+fused_step = numba.njit(cache=True, nogil=True)(_fused_step) if numba is not None else _fused_step
+
+
+class JitForest(ArrayForest):
+    """An ArrayForest whose land update, fire spreading and counting run as one fused, compiled pass."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.next_patch_type = np.empty_like(self.patch_type)
+        self.next_burning = np.empty_like(self.burning)
+        self.max_degree = int(self.degrees.max(initial=0))
+        self.counts = None #Trees and fires after the last update, counted by the fused pass
+
+    def count_patches(self):
+        """Counts and returns the number of trees, rocks and fires in the forest, from the last fused pass if there was one."""
+        if self.counts is None:
+            return super().count_patches()
+        trees, fires = self.counts
+        return trees, len(self.patch_type) - trees, fires
+
+    def update_land(self):
+        """
+        Updates every patch of the forest one step with the fused pass, following the rules of ArrayForest.update_land.
+
+        The spread draws are a sources x max_degree array, one row for every burning patch without a fire fighter,
+        so a step allocates that many numbers even for sources with fewer neighbors. On graphs with a few nodes of
+        very high degree this is far more than the number of edges the fire can cross.
+        """
+        sources = int(np.count_nonzero(self.burning & ~self.has_fire_fighter))
+        convert_draws = self.rng.random(len(self.node_ids))
+        spread_draws = self.rng.random((sources, self.max_degree))
+        self.counts = fused_step(self.offsets, self.indices, self.patch_type, self.treestats, self.burning,
+                                 self.has_fire_fighter, self.local_skill_levels(), convert_draws, spread_draws,
+                                 float(self.probability_spread_fire), self.next_patch_type, self.next_burning)
+        self.patch_type, self.next_patch_type = self.next_patch_type, self.patch_type
+        self.burning, self.next_burning = self.next_burning, self.burning
+        self.update_has_fire_fighter()
+
+
+class Backend:
+    """A registered backend: the class of forest it steps (None for the object model) and whether it can run here."""
+    def __init__(self, name:str, forest_class=None, available=True, fallback=None, description=""):
+        self.name = name
+        self.forest_class = forest_class
+        self.available = available
+        self.fallback = fallback #Name of the backend used instead when this one is not available
+        self.description = description
+
+    def create_forest(self, graph, probability_spread_fire=0.3):
+        """Creates the forest of this backend from the current state of a graph, drawing from its rng."""
+        return self.forest_class.from_graph(graph, probability_spread_fire=probability_spread_fire)
+
+
+BACKENDS = {}
+
+
+def register_backend(backend:Backend):
+    """Adds a backend to the registry, replacing any backend with the same name."""
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def available_backends():
+    """Returns the names of the registered backends that can run here."""
+    return [name for name, backend in BACKENDS.items() if backend.available]
+
+
+def get_backend(name:str):
+    """
+    Returns the backend registered under a name. A backend that cannot run here is replaced by its fallback,
+    with a warning. Raises ValueError for an unknown name.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}, the backends are {', '.join(BACKENDS)}")
+    backend = BACKENDS[name]
+    if not backend.available:
+        if backend.fallback is None:
+            raise ValueError(f"The {name} backend is not available")
+        warnings.warn(f"The {name} backend is not available, using the {backend.fallback} backend instead", RuntimeWarning, stacklevel=2)
+        return get_backend(backend.fallback)
+    return backend
+
+
+def write_forest(forest:ArrayForest, graph):
+    """Writes the state of a forest back to the land patches and fire fighters of the graph it was created from."""
+    import Classes
+
+    for i, node in enumerate(forest.node_ids.tolist()):
+        if forest.patch_type[i] == TREE:
+            graph.set_landpatch_kind(node, Classes.Treepatch, int(forest.treestats[i]))
+            land = graph.search_landpatches(node)
+            land.is_on_fire = bool(forest.burning[i])
+            land.has_fire_fighter = bool(forest.has_fire_fighter[i])
+        else:
+            graph.set_landpatch_kind(node, Classes.Rockpatch)
+    positions = forest.get_fire_fighter_positions()
+    for fire_fighter_id, position in zip(graph.get_fire_fighters(), positions):
+        graph.move_fire_fighter(graph.search_fire_fighters(fire_fighter_id), position)
+    graph.update_fire_fighter_positions()
+    graph.recount()
+
+
+register_backend(Backend("object", description="Classes.Graph stepping its land patch objects"))
+register_backend(Backend("numpy", ArrayForest, description="array_engine.ArrayForest with vectorized NumPy steps"))
+register_backend(Backend("numba", JitForest, available=numba is not None, fallback="numpy",
+                         description="JitForest with a fused land update compiled by Numba"))
+register_backend(Backend("domains", DomainForest, description="domain_decomposition.DomainForest with a worker process per domain"))
@@ -0,0 +1,204 @@
+"""
+This module is a benchmark suite for the simulator, with fixed seeds, JSON results and regression checks.
+
+It times graph generation (voronoi_to_edges), load_graph, generate_adjacency_list, generate_land_patches,
+a headless run_simulation step loop, a spread-heavy and a fire fighter-heavy scenario and the cost of a Visualiser frame,
+over a ladder of graph sizes and fire fighter counts. Every benchmark is repeated and the fastest time is kept,
+which is the least disturbed by other processes.
+
+Results are saved as JSON and can be compared with a stored baseline: a benchmark regresses when it is slower than
+the baseline by more than its limit (max_regression by default, or a limit per benchmark name).
+
+    python benchmarks.py --output results.json
+    python benchmarks.py --nodes 100 1000 10000 100000 1000000 --fire-fighters 1 100 10000 --output results.json
+    python benchmarks.py --baseline baseline.json --max-regression 0.25 --limit visualiser_frame=0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+import graph_helper as gh
+import Classes
+
+DEFAULT_NODES = (100, 1000, 10000)
+DEFAULT_FIRE_FIGHTERS = (1, 100)
+SEED = 1234
+STEPS = 10 # Update steps of the simulation benchmarks
+VISUALISER_MAX_NODES = 10000 # Drawing larger graphs takes minutes and says little about the simulator
+
+
+def measure(function, repeats=3, setup=None):
+    """Returns the fastest of repeats timings of function(), or of function(setup()) with a setup that is not timed."""
+    best = float("inf")
+    for _ in range(repeats):
+        arguments = () if setup is None else (setup(),)
+        started = time.perf_counter()
+        function(*arguments)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def build_graph(nodes:int, fire_fighters=0, tree_probability=0.8, ignition_probability=0.05, seed=SEED):
+    """Builds a seeded graph with land patches, fire fighters and initial fires, like the headless runner."""
+    graph = Classes.Graph(seed=seed)
+    graph.generate_graph(nodes)
+    graph.create_node_list()
+    graph.generate_adjacency_list()
+    graph.generate_fire_fighters(min(fire_fighters, len(graph.get_nodes())))
+    graph.generate_land_patches(tree_probability)
+    graph.initial_ignition(ignition_probability)
+    return graph
+
+
+def bench_graph_construction(nodes:int, repeats:int):
+    """Times generating, loading, indexing and populating a graph of about the given number of nodes."""
+    results = {"generate_graph": measure(lambda: gh.voronoi_to_edges(nodes, rng=np.random.default_rng(SEED)), repeats)}
+    edges, positions = gh.voronoi_to_edges(nodes, rng=np.random.default_rng(SEED))
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = os.path.join(directory, "graph.dat")
+        with open(data_file, "w") as data:
+            data.writelines(f"{a},{b}\n" for a, b in edges)
+        results["load_graph"] = measure(lambda: Classes.Graph().load_graph(data_file), repeats)
+
+    def adjacency():
+        graph = Classes.Graph(list(edges))
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        return graph
+    results["generate_adjacency_list"] = measure(adjacency, repeats)
+    results["generate_land_patches"] = measure(lambda graph: graph.generate_land_patches(0.8), repeats, setup=adjacency)
+    return results
+
+
+def bench_simulation(name:str, nodes:int, fire_fighters:int, repeats:int, **scenario):
+    """Times STEPS headless update steps of a seeded scenario, building the graph outside the timing."""
+    probability_spread_fire = scenario.pop("probability_spread_fire", 0.3)
+    seconds = measure(lambda graph: graph.run_simulation(STEPS, probability_spread_fire, visualise=False), repeats,
+                      setup=lambda: build_graph(nodes, fire_fighters, **scenario))
+    return {name: seconds / STEPS}
+
+
+def bench_visualiser(nodes:int, repeats:int, frames=5):
+    """Times drawing one Visualiser frame of a graph, after the graph itself has been drawn once."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import visualiser_random_forest_graph as vis
+
+    graph = build_graph(nodes, 10)
+    graph.generate_colormap()
+    visual = vis.Visualiser(graph.get_edges(), pos_nodes=graph.get_positions(), frame_pause=0, nodes=sorted(graph.get_nodes()))
+    visual.update_frame(graph.get_colormap(), graph.get_fire_fighter_positions())
+
+    def draw():
+        for _ in range(frames):
+            visual.update_frame(graph.get_colormap(), graph.get_fire_fighter_positions())
+    seconds = measure(draw, repeats) / frames
+    visual.close()
+    return {"visualiser_frame": seconds}
+
+
+def run_suite(nodes=DEFAULT_NODES, fire_fighters=DEFAULT_FIRE_FIGHTERS, repeats=3, visualiser=True, progress=None):
+    """
+    Runs every benchmark over the size ladder and returns the results as a dictionary
+    with the environment and a list of {"name", "nodes", "fire_fighters", "seconds"} entries.
+    """
+    entries = []
+
+    def add(results, size, fire_fighter_count=0):
+        for name, seconds in results.items():
+            entries.append({"name": name, "nodes": size, "fire_fighters": fire_fighter_count, "seconds": seconds})
+            if progress is not None:
+                progress(entries[-1])
+
+    for size in nodes:
+        add(bench_graph_construction(size, repeats), size)
+        for count in fire_fighters:
+            if count > size:
+                continue
+            add(bench_simulation("run_simulation_step", size, count, repeats), size, count)
+        crowd = max(size // 2, 1) # A fire fighter on every other node
+        add(bench_simulation("fire_fighter_heavy_step", size, crowd, repeats, ignition_probability=0.2), size, crowd)
+        add(bench_simulation("spread_heavy_step", size, 1, repeats, tree_probability=1.0, ignition_probability=0.3,
+                             probability_spread_fire=0.9), size, 1)
+        if visualiser and size <= VISUALISER_MAX_NODES:
+            add(bench_visualiser(size, repeats), size)
+
+    return {
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                        "processor": platform.processor(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "seed": SEED,
+        "results": entries,
+    }
+
+
+def _key(entry):
+    """Returns the key identifying a benchmark across result files."""
+    return entry["name"], entry["nodes"], entry["fire_fighters"]
+
+
+def compare(results, baseline, max_regression=0.25, limits=None):
+    """
+    Compares results with a baseline and returns the regressions, as a list of dictionaries with the benchmark,
+    the baseline and current seconds and the ratio between them. A benchmark regresses when
+    seconds > baseline seconds * (1 + limit), with the limit from limits for its name, or max_regression.
+    Benchmarks missing from the baseline are not compared.
+    """
+    limits = limits or {}
+    reference = {_key(entry): entry["seconds"] for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        before = reference.get(_key(entry))
+        if before is None or before <= 0:
+            continue
+        ratio = entry["seconds"] / before
+        if ratio > 1 + limits.get(entry["name"], max_regression):
+            regressions.append(dict(entry, baseline=before, ratio=ratio))
+    return regressions
+
+
+def parse_limit(text:str):
+    """Parses a NAME=FRACTION command line limit."""
+    name, _, value = text.partition("=")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"A limit must look like NAME=FRACTION, not {text}")
+
+
+def main(argv=None):
+    """Runs the benchmark suite from the command line, and returns 1 if a benchmark regressed against the baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark the forest fire simulator.")
+    parser.add_argument("--nodes", type=int, nargs="+", default=list(DEFAULT_NODES), help="ladder of graph sizes")
+    parser.add_argument("--fire-fighters", type=int, nargs="+", default=list(DEFAULT_FIRE_FIGHTERS), help="ladder of fire fighter counts")
+    parser.add_argument("--repeats", type=int, default=3, help="timings per benchmark, the fastest is kept")
+    parser.add_argument("--no-visualiser", action="store_true", help="skip the Visualiser frame benchmark")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed slowdown as a fraction, 0.25 by default")
+    parser.add_argument("--limit", type=parse_limit, action="append", default=[], help="allowed slowdown of one benchmark, as NAME=FRACTION")
+    arguments = parser.parse_args(argv)
+
+    def progress(entry):
+        print(f"{entry['name']:<28}{entry['nodes']:>10}{entry['fire_fighters']:>8}{1000 * entry['seconds']:>14.3f} ms")
+
+    results = run_suite(arguments.nodes, arguments.fire_fighters, arguments.repeats, not arguments.no_visualiser, progress)
+    with open(arguments.output, "w") as output:
+        json.dump(results, output, indent=2)
+    if arguments.baseline is None:
+        return 0
+    with open(arguments.baseline, "r") as data:
+        baseline = json.load(data)
+    regressions = compare(results, baseline, arguments.max_regression, dict(arguments.limit))
+    for entry in regressions:
+        print(f"Regression: {entry['name']} with {entry['nodes']} nodes and {entry['fire_fighters']} fire fighters "
+              f"took {entry['ratio']:.2f} times as long as the baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
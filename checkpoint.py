@@ -0,0 +1,255 @@
+"""
+This module saves the complete state of a simulation to compact binary checkpoints and restores it bit-exactly.
+
+A checkpoint is a compressed .npz file with the state of every node as arrays (patch type, treestats, fire and
+fire fighter flags, scheduled rock regrowth), the fire fighters, the fire dispatcher field, the settings of the
+simulation, the state of the random generator and the statistics so far, or the number of rows of the telemetry
+the statistics were streamed to. The topology (edges and positions) does not change during a simulation,
+so it is saved once per checkpoint directory and referenced by its hash.
+
+Checkpoints are written by a CheckpointWriter on a background thread: the state is copied into arrays between two
+steps, and compressing and writing them happens while the simulation continues.
+
+Example:
+    >>> graph.run_simulation(100_000, visualise=False, checkpoint_every=1000, checkpoint_dir="checkpoints")
+    >>> graph = load_checkpoint(latest_checkpoint("checkpoints"))   # after a crash
+    >>> graph.run_simulation(100_000 - graph.current_step, visualise=False, resume=True)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import queue
+import threading
+import numpy as np
+import dispatch
+
+TOPOLOGY_FILE = "topology_{digest}.npz"
+CHECKPOINT_FILE = "checkpoint_{step:09d}.npz"
+STATISTICS = ("updates", "tree_patches", "rock_patches", "wild_fires", "burned_area", "average_treestats", "fire_fighter_utilisation")
+
+ROCK = 0
+TREE = 1
+NONE = -1 # Value of missing node indices, fire fighters and steps
+
+
+def topology_arrays(graph):
+    """Returns the edges and positions of a graph as arrays, and the SHA-256 hex digest identifying them."""
+    edges = np.asarray(graph.get_edges(), dtype=np.int64).reshape(-1, 2)
+    nodes = sorted(graph.get_nodes())
+    positions = graph.get_positions()
+    coordinates = np.array([positions[node] for node in nodes], dtype=np.float64) if positions and all(node in positions for node in nodes) else np.zeros((0, 2))
+    digest = hashlib.sha256(edges.tobytes() + coordinates.tobytes()).hexdigest()
+    return {"edges": edges, "position_nodes": np.array(nodes, dtype=np.int64), "positions": coordinates}, digest
+
+
+def capture_state(graph):
+    """Copies the complete state of a graph between two steps into a dictionary of arrays."""
+    import Classes
+
+    nodes = list(graph.get_nodes()) # In iteration order, which is the order a full step updates them in
+    index_of = {node: i for i, node in enumerate(nodes)}
+    count = len(nodes)
+    patch_type = np.zeros(count, dtype=np.int8)
+    treestats = np.zeros(count, dtype=np.float64)
+    treestats_is_int = np.zeros(count, dtype=bool)
+    burning = np.zeros(count, dtype=bool)
+    has_fire_fighter = np.zeros(count, dtype=bool)
+    local_fire_fighter = np.full(count, NONE, dtype=np.int64)
+    convert_step = np.full(count, NONE, dtype=np.int64)
+    for i, node in enumerate(nodes):
+        land = graph.search_landpatches(node)
+        if isinstance(land, Classes.Treepatch):
+            patch_type[i] = TREE
+            treestats[i] = land.get_treestats()
+            treestats_is_int[i] = isinstance(land.get_treestats(), int)
+            burning[i] = land.get_is_on_fire()
+            has_fire_fighter[i] = land.get_has_fire_fighter()
+            if land.get_local_fire_fighter() is not None:
+                local_fire_fighter[i] = land.get_local_fire_fighter().get_id()
+        elif land.convert_step is not None:
+            convert_step[i] = land.convert_step
+
+    fire_fighters = [graph.search_fire_fighters(fire_fighter_id) for fire_fighter_id in graph.get_fire_fighters()]
+    state = {
+        "nodes": np.array(nodes, dtype=np.int64),
+        "patch_type": patch_type, "treestats": treestats, "treestats_is_int": treestats_is_int, "burning": burning,
+        "has_fire_fighter": has_fire_fighter, "local_fire_fighter": local_fire_fighter, "convert_step": convert_step,
+        "active": np.array([node in graph.active_patches for node in nodes], dtype=bool),
+        "burned": np.array([node in graph.burned_nodes for node in nodes], dtype=bool),
+        "fire_fighter_ids": np.array([fire_fighter.get_id() for fire_fighter in fire_fighters], dtype=np.int64),
+        "fire_fighter_positions": np.array([fire_fighter.get_current_position() for fire_fighter in fire_fighters], dtype=np.int64),
+        "fire_fighter_skills": np.array([fire_fighter.get_skill_level() for fire_fighter in fire_fighters], dtype=np.float64),
+    }
+    for name in STATISTICS:
+        state[name] = np.array(getattr(graph, name), dtype=np.float64 if name in ("average_treestats", "fire_fighter_utilisation") else np.int64)
+    if graph.dispatcher is not None:
+        field = graph.dispatcher
+        state["dispatch_distance"] = np.array([field.distance.get(node, NONE) for node in nodes], dtype=np.int64)
+        state["dispatch_next_hop"] = np.array([index_of[field.next_hop[node]] if node in field.next_hop else NONE for node in nodes], dtype=np.int64)
+        state["dispatch_owner"] = np.array([index_of[field.owner[node]] if node in field.owner else NONE for node in nodes], dtype=np.int64)
+        state["dispatch_claimed"] = np.array([node in field.claimed for node in nodes], dtype=bool)
+
+    topology, digest = topology_arrays(graph)
+    meta = {
+        "current_step": graph.current_step,
+        "probability_spread_fire": graph.probability_spread_fire,
+        "synchronous": graph.synchronous,
+        "active_frontier": graph.active_frontier,
+        "rock_events": graph.rock_events is not None,
+        "dispatch_fire_fighters": graph.dispatcher is not None,
+        "treestats_total": graph.treestats_total,
+        "telemetry_path": graph.telemetry_path,
+        "telemetry_rows": graph.telemetry_rows if graph.telemetry is not None else 0,
+        "rng_state": graph.rng.bit_generator.state,
+        "topology": digest,
+    }
+    state["meta"] = np.array(json.dumps(meta))
+    return state, topology
+
+
+def save_checkpoint(path:str, state, topology):
+    """Writes a captured state to path, and its topology next to it if it is not there yet."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    topology_file = os.path.join(directory, TOPOLOGY_FILE.format(digest=json.loads(str(state["meta"]))["topology"]))
+    if not os.path.exists(topology_file):
+        _write_atomically(topology_file, topology)
+    _write_atomically(path, state)
+
+
+def _write_atomically(path:str, arrays):
+    """Writes a compressed .npz file under a temporary name first, so a crash never leaves a half-written file."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(temporary, path)
+
+
+class CheckpointWriter:
+    """Writes checkpoints on a background thread, so the simulation does not wait for compression and disk writes."""
+    def __init__(self, directory:str, queue_size=2):
+        """
+        Parameters
+        ----------
+        directory: str
+            Directory the checkpoints are written to, as checkpoint_<step>.npz.
+        queue_size: int, default 2
+            Number of captured checkpoints that can wait to be written before the simulation waits for the writer.
+        """
+        self.directory = directory
+        self.pending = queue.Queue(queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    def _write(self):
+        """Writes the captured checkpoints of the queue until the closing sentinel (None) arrives."""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            path, state, topology = item
+            try:
+                save_checkpoint(path, state, topology)
+            except OSError as error:
+                self.error = error
+
+    def submit(self, graph):
+        """Captures the state of a graph and queues it to be written, returning the file name of the checkpoint."""
+        state, topology = capture_state(graph)
+        path = os.path.join(self.directory, CHECKPOINT_FILE.format(step=graph.current_step))
+        self.pending.put((path, state, topology))
+        return path
+
+    def close(self):
+        """Waits until every queued checkpoint is written, and raises the error of a failed write if there was one."""
+        self.pending.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def latest_checkpoint(directory:str):
+    """Returns the file name of the checkpoint with the highest step in a directory, or None if there is none."""
+    checkpoints = sorted(glob.glob(os.path.join(directory, CHECKPOINT_FILE.replace("{step:09d}", "*"))))
+    return checkpoints[-1] if checkpoints else None
+
+
+def _restore_nodes(graph, nodes):
+    """
+    Restores the node set of a graph so it iterates in the saved order. A set of integers iterates in an order
+    that depends on how it was built, so the ways Graph builds it are tried: from the edges and from sorted node ID's.
+    """
+    graph.create_node_list()
+    if list(graph.nodes) != nodes:
+        graph.nodes = set(sorted(nodes))
+    if list(graph.nodes) != nodes:
+        raise ValueError("The order of the nodes of the checkpoint cannot be reproduced, so it cannot be resumed exactly")
+    graph.node_list = list(graph.nodes)
+
+
+def load_checkpoint(path:str):
+    """Creates a Classes.Graph in exactly the state saved in a checkpoint, ready to continue with run_simulation(resume=True)."""
+    import Classes
+
+    with np.load(path) as data:
+        state = {name: data[name] for name in data.files}
+    meta = json.loads(str(state["meta"]))
+    with np.load(os.path.join(os.path.dirname(os.path.abspath(path)), TOPOLOGY_FILE.format(digest=meta["topology"]))) as data:
+        topology = {name: data[name] for name in data.files}
+
+    rng = np.random.Generator(getattr(np.random, meta["rng_state"]["bit_generator"])())
+    edges = list(map(tuple, topology["edges"].tolist()))
+    positions = dict(zip(topology["position_nodes"].tolist(), map(tuple, topology["positions"].tolist()))) if len(topology["positions"]) else None
+    graph = Classes.Graph(edges, positions, rng=rng)
+    nodes = state["nodes"].tolist()
+    _restore_nodes(graph, nodes)
+    graph.generate_adjacency_list()
+    graph.current_step = meta["current_step"]
+    graph.probability_spread_fire = meta["probability_spread_fire"]
+    graph.synchronous = meta["synchronous"]
+    graph.active_frontier = meta["active_frontier"]
+    rock_events = []
+
+    fire_fighter_ids = state["fire_fighter_ids"].tolist()
+    fire_fighters = {fire_fighter_id: Classes.FireFighter(fire_fighter_id, graph, position, skill)
+                     for fire_fighter_id, position, skill in zip(fire_fighter_ids, state["fire_fighter_positions"].tolist(), state["fire_fighter_skills"].tolist())}
+    for i, node in enumerate(nodes):
+        if state["patch_type"][i] == TREE:
+            treestats = state["treestats"][i].item()
+            land = Classes.Treepatch(node, graph, int(treestats) if state["treestats_is_int"][i] else treestats)
+            land.is_on_fire = bool(state["burning"][i])
+            land.has_fire_fighter = bool(state["has_fire_fighter"][i])
+            if state["local_fire_fighter"][i] != NONE:
+                land.local_fire_fighter = fire_fighters[int(state["local_fire_fighter"][i])]
+        else:
+            land = Classes.Rockpatch(node, graph) # rock_events is still None, so nothing is drawn or scheduled
+            if state["convert_step"][i] != NONE:
+                land.convert_step = int(state["convert_step"][i])
+                rock_events.append((land.convert_step, node))
+        graph.land_patches[node] = land
+    graph.rock_events = sorted(rock_events) if meta["rock_events"] else None # A sorted list is a valid heap
+    for fire_fighter_id in fire_fighter_ids:
+        graph.add_fire_fighter(fire_fighters[fire_fighter_id])
+
+    if meta["dispatch_fire_fighters"]:
+        field = dispatch.FireDispatcher.__new__(dispatch.FireDispatcher)
+        field.graph = graph
+        field.distance = {node: distance for node, distance in zip(nodes, state["dispatch_distance"].tolist()) if distance != NONE}
+        field.next_hop = {node: nodes[hop] for node, hop in zip(nodes, state["dispatch_next_hop"].tolist()) if hop != NONE}
+        field.owner = {node: nodes[owner] for node, owner in zip(nodes, state["dispatch_owner"].tolist()) if owner != NONE}
+        field.claimed = {node for node, claimed in zip(nodes, state["dispatch_claimed"].tolist()) if claimed}
+        graph.dispatcher = field
+
+    graph.active_patches = {node for node, active in zip(nodes, state["active"].tolist()) if active}
+    for name in STATISTICS:
+        setattr(graph, name, state[name].tolist())
+    graph.recount()
+    graph.burned_nodes = {node for node, burned in zip(nodes, state["burned"].tolist()) if burned}
+    graph.treestats_total = meta["treestats_total"] # The running sum, which can differ from a recount in the last bits
+    graph.telemetry_path = meta.get("telemetry_path")
+    graph.telemetry_rows = meta.get("telemetry_rows", 0) # The statistics before the checkpoint are in these rows of the telemetry
+    graph.rng.bit_generator.state = meta["rng_state"]
+    return graph
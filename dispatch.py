@@ -0,0 +1,95 @@
+"""
+This module provides FireDispatcher, which guides fire fighters toward the nearest unclaimed fire.
+
+The dispatcher keeps a multi-source BFS field over the adjacency list of a graph: for every node the distance
+to the nearest burning patch without a fire fighter (a source), the source itself and the next hop toward it.
+The field is updated incrementally: a new source relaxes the nodes it is closer to, and a removed source only
+recomputes the region of nodes that were closest to it, starting from the border of that region.
+A fire fighter then moves one hop toward the nearest fire with a single dictionary lookup.
+"""
+
+import heapq
+from collections import deque
+
+
+class FireDispatcher:
+    """Maintains the distance and next-hop field from all unclaimed fires of a graph."""
+    def __init__(self, graph):
+        self.graph = graph
+        self.distance = {} #Dictionary mapping node ID's to the distance to the nearest source
+        self.next_hop = {} #Dictionary mapping node ID's to the neighbor on a shortest path to the nearest source
+        self.owner = {} #Dictionary mapping node ID's to the nearest source
+        self.claimed = set() #Burning node ID's a fire fighter has arrived at
+        for node_id in graph.get_nodes():
+            self.update_node(node_id)
+
+    def is_source(self, node_id):
+        """Returns whether a node is a source of the field, a burning patch no fire fighter has claimed."""
+        return node_id in self.owner and self.owner[node_id] == node_id
+
+    def update_node(self, node_id):
+        """Adds or removes a node as a source, after its land patch, fire or fire fighter status changed."""
+        if not self.graph.is_on_fire(node_id):
+            self.claimed.discard(node_id)
+        should_be_source = self.graph.is_unclaimed_fire(node_id) and node_id not in self.claimed
+        if should_be_source and not self.is_source(node_id):
+            self.add_source(node_id)
+        elif not should_be_source and self.is_source(node_id):
+            self.remove_source(node_id)
+
+    def claim(self, node_id):
+        """Marks a burning node as claimed by a fire fighter, so other fire fighters are sent elsewhere."""
+        if self.graph.is_on_fire(node_id):
+            self.claimed.add(node_id)
+            self.update_node(node_id)
+
+    def add_source(self, source):
+        """Adds a source and relaxes every node that is now closer to a fire, with a BFS from the source."""
+        self.distance[source] = 0
+        self.next_hop[source] = source
+        self.owner[source] = source
+        queue = deque([source])
+        while queue:
+            node_id = queue.popleft()
+            distance = self.distance[node_id] + 1
+            for neighbor in self.graph.search_adj_list_neighbors(node_id):
+                if distance < self.distance.get(neighbor, float("inf")):
+                    self.distance[neighbor] = distance
+                    self.next_hop[neighbor] = node_id
+                    self.owner[neighbor] = source
+                    queue.append(neighbor)
+
+    def remove_source(self, source):
+        """Removes a source and recomputes the distances of the nodes it was the nearest source of."""
+        region = [source]
+        seen = {source}
+        for node_id in region:
+            for neighbor in self.graph.search_adj_list_neighbors(node_id):
+                if neighbor not in seen and self.owner.get(neighbor) == source:
+                    seen.add(neighbor)
+                    region.append(neighbor)
+        for node_id in region:
+            del self.distance[node_id]
+            del self.next_hop[node_id]
+            del self.owner[node_id]
+
+        # The border of the region is still correct, so the region is filled in from there
+        heap = []
+        for node_id in region:
+            for neighbor in self.graph.search_adj_list_neighbors(node_id):
+                if neighbor in self.distance:
+                    heapq.heappush(heap, (self.distance[neighbor] + 1, node_id, neighbor))
+        while heap:
+            distance, node_id, via = heapq.heappop(heap)
+            if distance >= self.distance.get(node_id, float("inf")):
+                continue
+            self.distance[node_id] = distance
+            self.next_hop[node_id] = via
+            self.owner[node_id] = self.owner[via]
+            for neighbor in self.graph.search_adj_list_neighbors(node_id):
+                if distance + 1 < self.distance.get(neighbor, float("inf")):
+                    heapq.heappush(heap, (distance + 1, neighbor, node_id))
+
+    def get_next_hop(self, node_id):
+        """Returns the neighbor to move to toward the nearest unclaimed fire, the node itself on a fire, or None if no fire can be reached."""
+        return self.next_hop.get(node_id)
@@ -0,0 +1,379 @@
+"""
+This module steps a single simulation on several cores, by splitting the forest into spatial domains.
+
+The nodes are partitioned into domains by recursive coordinate bisection of their positions, or, for graphs without
+positions, by cutting a reverse Cuthill-McKee order of the nodes (a breadth-first order keeping neighbors close)
+into consecutive pieces. The state of the forest lives in shared memory, and every domain is updated by its own worker
+process with the rules of array_engine.ArrayForest. A step has three phases, separated by barriers:
+
+    1. Every worker updates the patches of its domain from the state at the start of the step into the next state.
+       Fire spreading over a boundary edge to a node of another domain is written to the halo buffer instead.
+    2. Every worker applies the ignitions left in the halo buffer for its nodes (the halo exchange),
+       marks its burning patches with a fire fighter and counts its trees and fires.
+    3. Every worker moves the fire fighters standing in its domain. A fire fighter migrates to another domain
+       by stepping onto one of its nodes, and is moved by the worker of that domain from the next step on.
+
+The state at the start of a step is only read, and every node of the next state is only written by the worker of its
+domain, so the result does not depend on the timing of the workers. Every worker draws from its own random generator,
+seeded from the rng of the forest: a run is reproducible for a given seed and number of domains, and statistically
+equivalent to a serial ArrayForest run, but not draw for draw.
+
+Example:
+    >>> with DomainForest.from_graph(graph, num_domains=16) as forest:
+    ...     forest.run(1000)
+    >>> graph.run_simulation(1000, visualise=False, backend="domains")
+"""
+
+import multiprocessing
+import os
+import time
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import scipy.sparse
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from array_engine import ArrayForest, ROCK, TREE, GROWTH_LIMIT, GROWTH, BURN_DAMAGE, EXTINGUISH_LIMIT, \
+    NEW_TREE_TREESTATS, PROBABILITY_ROCK_TO_TREE
+
+RUN = 1
+STOP = 0
+BARRIERS_PER_STEP = 4 # The start of the step and the end of every phase
+WATCH_INTERVAL = 0.1 # Seconds between two checks that the processes waiting for each other are alive
+JOIN_TIMEOUT = 5 # Seconds a stopping worker gets to exit before it is killed
+
+
+class DomainError(RuntimeError):
+    """Raised when a worker process of a DomainForest died or did not reach a barrier in time."""
+
+
+class PhaseBarrier:
+    """
+    The barrier between a DomainForest and its workers. Every worker reports its arrival and waits for its own signal
+    to go on, which the forest gives once all workers arrived. Unlike multiprocessing.Barrier it never waits forever
+    for a process that died or hangs: the forest checks its workers and a deadline while it waits,
+    and the workers check that the forest is still alive.
+    """
+    def __init__(self, context, parties:int):
+        self.arrived = context.Semaphore(0)
+        self.go = [context.Semaphore(0) for _ in range(parties)]
+
+    def wait(self, party:int):
+        """Waits at the barrier in worker party, and raises DomainError if the forest process died."""
+        self.arrived.release()
+        while not self.go[party].acquire(timeout=WATCH_INTERVAL):
+            if not multiprocessing.parent_process().is_alive():
+                raise DomainError("The forest process died")
+
+    def gather(self, workers, timeout:float):
+        """
+        Waits in the forest until all workers arrived and lets them go on. Raises DomainError if a worker died,
+        or if the workers did not all arrive within timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        for _ in workers:
+            while not self.arrived.acquire(timeout=WATCH_INTERVAL):
+                dead = [domain for domain, worker in enumerate(workers) if not worker.is_alive()]
+                if dead:
+                    raise DomainError(f"The worker process of domain {dead[0]} died, the state of the forest is incomplete")
+                if time.monotonic() > deadline:
+                    raise DomainError(f"The worker processes did not finish a phase within {timeout} seconds")
+        for go in self.go:
+            go.release()
+
+
+def spatial_partition(positions, num_domains:int):
+    """
+    Returns the domain of every node by recursive coordinate bisection: the nodes are split across the widest axis
+    of their positions, in parts proportional to the number of domains on either side, until every part is one domain.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    domain_of = np.empty(len(positions), dtype=np.int64)
+    parts = [(np.arange(len(positions)), 0, num_domains)]
+    while parts:
+        nodes, first_domain, count = parts.pop()
+        if count == 1:
+            domain_of[nodes] = first_domain
+            continue
+        left = count // 2
+        coordinates = positions[nodes]
+        axis = int(np.argmax(np.ptp(coordinates, axis=0))) if len(nodes) else 0
+        order = np.argsort(coordinates[:, axis], kind="stable")
+        cut = len(nodes) * left // count
+        parts.append((nodes[order[:cut]], first_domain, left))
+        parts.append((nodes[order[cut:]], first_domain + left, count - left))
+    return domain_of
+
+
+def graph_partition(offsets, indices, num_domains:int):
+    """Returns the domain of every node by cutting a reverse Cuthill-McKee order of the nodes into equal consecutive pieces."""
+    num_nodes = len(offsets) - 1
+    adjacency = scipy.sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, offsets), shape=(num_nodes, num_nodes))
+    order = reverse_cuthill_mckee(adjacency, symmetric_mode=True)
+    domain_of = np.empty(num_nodes, dtype=np.int64)
+    domain_of[order] = np.arange(num_nodes) * num_domains // max(num_nodes, 1)
+    return domain_of
+
+
+def partition(offsets, indices, num_domains:int, positions=None):
+    """Returns the domain of every node index, from the positions of the nodes if there are any, and from the edges otherwise."""
+    if positions is not None and len(positions):
+        return spatial_partition(positions, num_domains)
+    return graph_partition(offsets, indices, num_domains)
+
+
+def cut_edges(offsets, indices, domain_of):
+    """Returns the number of edges between nodes of different domains, whose fires have to cross the halo."""
+    sources = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return int(np.count_nonzero(domain_of[sources] != domain_of[indices])) // 2
+
+
+def _attach(specs):
+    """Attaches to the shared memory blocks of a forest and returns them with NumPy views of their arrays."""
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        blocks[name] = SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+    return blocks, arrays
+
+
+def _gather_edges(offsets, sources):
+    """Returns the positions in indices of all outgoing edges of the given node indices, like ArrayForest.gather_edges."""
+    counts = offsets[sources + 1] - offsets[sources]
+    total = int(counts.sum())
+    starts = np.repeat(offsets[sources] - np.cumsum(counts) + counts, counts)
+    return starts + np.arange(total, dtype=np.int64)
+
+
+def _run_domain(specs, domain:int, seed, barrier):
+    """
+    Steps the patches and fire fighters of one domain until the forest is closed, or until the forest process died.
+    This runs in a worker process.
+    """
+    blocks, arrays = _attach(specs)
+    try:
+        _step_domain(arrays, domain, seed, barrier)
+    except DomainError:
+        pass
+    del arrays # The views must be released before the blocks are closed
+    for block in blocks.values():
+        block.close()
+
+
+def _step_domain(arrays, domain:int, seed, barrier):
+    """Runs the steps of one domain on the shared arrays, until the forest sends STOP."""
+    offsets, indices, domain_of = arrays["offsets"], arrays["indices"], arrays["domain_of"]
+    patch_types, treestats, burning_states = arrays["patch_type"], arrays["treestats"], arrays["burning"]
+    has_fire_fighter, halo, counts, control = arrays["has_fire_fighter"], arrays["halo"], arrays["counts"], arrays["control"]
+    positions, skills = arrays["fire_fighter_positions"], arrays["fire_fighter_skills"]
+    rng = np.random.default_rng(seed)
+    own = np.flatnonzero(domain_of == domain)
+
+    while True:
+        barrier.wait(domain)
+        command, parity, probability_spread_fire = control.tolist()
+        if command == STOP:
+            return
+        patch_type, next_patch_type = patch_types[int(parity)], patch_types[1 - int(parity)]
+        burning, next_burning = burning_states[int(parity)], burning_states[1 - int(parity)]
+
+        # Phase 1: the rules of ArrayForest.update_land for the own nodes
+        patch = patch_type[own]
+        tree = patch == TREE
+        burning_now = burning[own]
+        protected = burning_now & has_fire_fighter[own]
+        unprotected = burning_now & ~protected
+        convert = ~tree & (rng.random(len(own)) < PROBABILITY_ROCK_TO_TREE)
+
+        targets = indices[_gather_edges(offsets, own[unprotected])]
+        targets = targets[(patch_type[targets] == TREE) & ~burning[targets]]
+        targets = targets[rng.random(len(targets)) < probability_spread_fire]
+
+        stats = treestats[own]
+        stats[tree & ~burning_now & (stats <= GROWTH_LIMIT)] += GROWTH
+        stats[unprotected] -= BURN_DAMAGE
+        # The skill of the first fire fighter standing on every protected node, 0 if it has left
+        standing, first = np.unique(positions, return_index=True)
+        protected_nodes = own[protected]
+        found = np.minimum(np.searchsorted(standing, protected_nodes), max(len(standing) - 1, 0))
+        local_skills = np.where(standing[found] == protected_nodes, skills[first[found]], 0.0) if len(standing) else np.zeros(len(protected_nodes))
+        stats[protected] += (local_skills * 100).astype(np.int16)
+        next_burning_own = burning_now & ~(protected & (stats >= EXTINGUISH_LIMIT))
+        burnt_out = tree & (stats <= 0)
+        patch[burnt_out] = ROCK
+        next_burning_own[burnt_out] = False
+        patch[convert] = TREE
+        stats[convert] = NEW_TREE_TREESTATS
+
+        treestats[own] = stats
+        next_patch_type[own] = patch
+        next_burning[own] = next_burning_own
+        inside = domain_of[targets] == domain
+        next_burning[targets[inside]] = True
+        halo[targets[~inside]] = True
+        barrier.wait(domain)
+
+        # Phase 2: the halo exchange, the fire fighter marks and the counts of the own nodes
+        ignited = own[halo[own]]
+        next_burning[ignited] = True
+        halo[ignited] = False
+        mine = np.flatnonzero(domain_of[positions] == domain) # Fire fighters moved by this domain, before any of them moves
+        has_fire_fighter[own] = False
+        has_fire_fighter[positions[mine]] = True
+        has_fire_fighter[own] &= next_burning[own]
+        counts[domain] = (np.count_nonzero(next_patch_type[own] == TREE), np.count_nonzero(next_burning[own]))
+        barrier.wait(domain)
+
+        # Phase 3: the rules of ArrayForest.move_fire_fighters for the fire fighters of this domain
+        for fire_fighter in mine.tolist():
+            position = positions[fire_fighter]
+            if next_burning[position]:
+                continue # Already marked in phase 2
+            neighbors = indices[offsets[position]:offsets[position + 1]]
+            if len(neighbors) == 0:
+                continue
+            free_fires = neighbors[next_burning[neighbors] & ~has_fire_fighter[neighbors]]
+            positions[fire_fighter] = free_fires[0] if len(free_fires) else neighbors[rng.integers(len(neighbors))]
+        barrier.wait(domain)
+
+
+class DomainForest(ArrayForest):
+    """
+    An ArrayForest split into spatial domains that are stepped in parallel by worker processes on shared-memory state.
+    The workers are started by the first step and stopped by close, which keeps the final state in the forest.
+    """
+    def __init__(self, *args, positions=None, num_domains=None, timeout=300, **kwargs):
+        """
+        Takes the parameters of ArrayForest, and
+
+        positions: np.ndarray, optional
+            Position of every node index, used to partition the nodes into spatial domains.
+        num_domains: int, optional
+            Number of domains and worker processes, the number of processors by default.
+        timeout: float, default 300
+            Seconds to wait for the workers to finish one phase of a step, after which they are stopped
+            and DomainError is raised. A dead worker is noticed within WATCH_INTERVAL seconds.
+        """
+        super().__init__(*args, **kwargs)
+        self.positions = positions
+        self.timeout = timeout
+        self.num_domains = max(1, min(num_domains or os.cpu_count() or 1, len(self.node_ids)))
+        self.domain_of = None
+        self.blocks = {}
+        self.views = {}
+        self.workers = []
+        self.barrier = None
+        self.broken = False #Whether a worker died or timed out, so the workers can only be killed
+        self.parity = 0
+
+    @classmethod
+    def from_graph(cls, graph, rng=None, probability_spread_fire=0.3, num_domains=None, timeout=300):
+        """Creates a DomainForest from a Classes.Graph like ArrayForest.from_graph, partitioned with the positions of the graph."""
+        forest = super().from_graph(graph, rng, probability_spread_fire)
+        graph_positions = graph.get_positions()
+        if graph_positions and all(node in graph_positions for node in forest.node_ids.tolist()):
+            forest.positions = np.array([graph_positions[node] for node in forest.node_ids.tolist()], dtype=np.float64)
+        if num_domains is not None:
+            forest.num_domains = max(1, min(num_domains, len(forest.node_ids)))
+        forest.timeout = timeout
+        return forest
+
+    def share(self, name:str, values):
+        """Copies an array into a new shared memory block and returns the view of the block."""
+        values = np.ascontiguousarray(values)
+        block = SharedMemory(create=True, size=max(values.nbytes, 1))
+        self.blocks[name] = block
+        self.views[name] = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+        self.views[name][...] = values
+        return self.views[name]
+
+    def use_parity(self, parity:int):
+        """Points patch_type and burning at the shared buffers holding the current state."""
+        self.parity = parity
+        self.patch_type = self.views["patch_type"][parity]
+        self.burning = self.views["burning"][parity]
+
+    def start(self):
+        """Partitions the nodes, moves the state into shared memory and starts a worker process for every domain."""
+        self.domain_of = partition(self.offsets, self.indices, self.num_domains, self.positions)
+        self.offsets = self.share("offsets", self.offsets)
+        self.indices = self.share("indices", self.indices)
+        self.share("domain_of", self.domain_of)
+        self.share("patch_type", np.stack((self.patch_type, self.patch_type)))
+        self.treestats = self.share("treestats", self.treestats)
+        self.share("burning", np.stack((self.burning, self.burning)))
+        self.has_fire_fighter = self.share("has_fire_fighter", self.has_fire_fighter)
+        self.share("halo", np.zeros(len(self.node_ids), dtype=bool))
+        self.fire_fighter_positions = self.share("fire_fighter_positions", self.fire_fighter_positions)
+        self.fire_fighter_skills = self.share("fire_fighter_skills", self.fire_fighter_skills)
+        self.share("counts", np.zeros((self.num_domains, 2), dtype=np.int64))
+        self.share("control", np.zeros(3, dtype=np.float64))
+        self.use_parity(0)
+
+        specs = {name: (block.name, self.views[name].shape, self.views[name].dtype.str) for name, block in self.blocks.items()}
+        seeds = np.random.SeedSequence(int(self.rng.integers(2 ** 63))).spawn(self.num_domains)
+        context = multiprocessing.get_context()
+        self.barrier = PhaseBarrier(context, self.num_domains)
+        self.broken = False
+        self.workers = [context.Process(target=_run_domain, args=(specs, domain, seeds[domain], self.barrier), daemon=True)
+                        for domain in range(self.num_domains)]
+        for worker in self.workers:
+            worker.start()
+
+    def wait(self):
+        """Waits for the workers at the barrier, and kills them and raises DomainError if one died or timed out."""
+        try:
+            self.barrier.gather(self.workers, self.timeout)
+        except DomainError:
+            self.broken = True
+            self.close()
+            raise
+
+    def step(self):
+        """Advances the forest one update step on all domains in parallel and records the statistics."""
+        if not self.workers:
+            self.start()
+        self.views["control"][:] = (RUN, self.parity, self.probability_spread_fire)
+        for _ in range(BARRIERS_PER_STEP):
+            self.wait()
+        self.use_parity(1 - self.parity)
+        trees, fires = self.views["counts"].sum(axis=0).tolist()
+        self.tree_patches.append(trees)
+        self.rock_patches.append(len(self.node_ids) - trees)
+        self.wild_fires.append(fires)
+        self.updates.append(self.updates[-1] + 1)
+
+    def close(self):
+        """
+        Stops the workers and copies the state out of shared memory, so the forest can still be read.
+        Workers that do not stop in time are killed.
+        """
+        if not self.workers:
+            return
+        if not self.broken:
+            self.views["control"][0] = STOP
+            try:
+                self.barrier.gather(self.workers, self.timeout)
+            except DomainError:
+                self.broken = True
+        for worker in self.workers:
+            if not self.broken:
+                worker.join(JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.kill()
+            worker.join()
+        self.workers = []
+        for name in ("offsets", "indices", "treestats", "has_fire_fighter", "fire_fighter_positions", "fire_fighter_skills"):
+            setattr(self, name, self.views[name].copy())
+        self.patch_type = self.patch_type.copy()
+        self.burning = self.burning.copy()
+        self.views = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
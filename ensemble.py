@@ -0,0 +1,177 @@
+"""
+This module runs Monte Carlo ensembles of a scenario (see headless.py) across a process pool.
+
+Every replica gets an independent random stream spawned from one seed, and the workers reduce the
+tree_patches, rock_patches and wild_fires of their replicas into streaming aggregates, so only the
+aggregates (and one time to extinction per replica) are sent back to the parent process.
+
+Example:
+    >>> result = run_ensemble(dict(headless.DEFAULT_SCENARIO, steps=200), replicas=64, seed=1)
+    >>> summary = result.summary()
+    >>> summary["wild_fires"]["mean"], summary["wild_fires"]["quantiles"][0.95]
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import headless
+
+SERIES = ("tree_patches", "rock_patches", "wild_fires")
+HISTOGRAM_BINS = 256
+
+
+class StreamingStatistics:
+    """
+    Per-step streaming mean, variance and histogram of one series over many replicas.
+
+    Mean and variance are accumulated with Welford's algorithm and merged with Chan's formula.
+    Quantiles are estimated from a histogram with bins of bin_width counts, which grows when larger values arrive.
+    """
+    def __init__(self, steps:int, bin_width=1, bins=HISTOGRAM_BINS):
+        self.count = np.zeros(steps, dtype=np.int64)
+        self.mean = np.zeros(steps, dtype=np.float64)
+        self.m2 = np.zeros(steps, dtype=np.float64)
+        self.bin_width = bin_width
+        self.histogram = np.zeros((steps, bins), dtype=np.int64)
+
+    def add(self, values):
+        """Adds the series of one replica, values[i] being the value at step i."""
+        values = np.asarray(values, dtype=np.float64)
+        length = len(values)
+        self.count[:length] += 1
+        delta = values - self.mean[:length]
+        self.mean[:length] += delta / self.count[:length]
+        self.m2[:length] += delta * (values - self.mean[:length])
+
+        bins = (values // self.bin_width).astype(np.int64)
+        self._grow(int(bins.max()) + 1 if length else 0)
+        self.histogram[np.arange(length), bins] += 1
+
+    def merge(self, other):
+        """Merges the statistics of another StreamingStatistics with the same steps and bin width into this one."""
+        count = self.count + other.count
+        safe = np.maximum(count, 1)
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / safe
+        self.mean += delta * other.count / safe
+        self.count = count
+        self._grow(other.histogram.shape[1])
+        self.histogram[:, :other.histogram.shape[1]] += other.histogram
+
+    def _grow(self, bins:int):
+        """Makes sure the histogram has at least the given amount of bins."""
+        if bins > self.histogram.shape[1]:
+            extra = max(bins - self.histogram.shape[1], self.histogram.shape[1])
+            self.histogram = np.pad(self.histogram, ((0, 0), (0, extra)))
+
+    def variance(self):
+        """Returns the sample variance at every step (0 where there are fewer than 2 replicas)."""
+        return np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), 0.0)
+
+    def quantile(self, q:float):
+        """Returns an estimate of the q-quantile at every step, interpolated inside the histogram bins."""
+        cumulative = np.cumsum(self.histogram, axis=1)
+        target = q * cumulative[:, -1]
+        bins = np.argmax(cumulative >= target[:, None], axis=1)
+        below = np.where(bins > 0, cumulative[np.arange(len(bins)), bins - 1], 0)
+        inside = self.histogram[np.arange(len(bins)), bins]
+        fraction = np.where(inside > 0, (target - below) / np.maximum(inside, 1), 0.0)
+        return (bins + fraction) * self.bin_width
+
+
+class EnsembleResult:
+    """Aggregated statistics of an ensemble of simulations of one scenario."""
+    def __init__(self, steps:int, bin_width=1):
+        self.replicas = 0
+        self.statistics = {name: StreamingStatistics(steps, bin_width) for name in SERIES}
+        self.extinction_steps = [] # First step without fires of every replica, None if the fire never went out
+
+    def add(self, graph):
+        """Adds the statistics of one simulated graph."""
+        self.replicas += 1
+        for name in SERIES:
+            self.statistics[name].add(getattr(graph, name))
+        self.extinction_steps.append(time_to_extinction(graph.wild_fires))
+
+    def merge(self, other):
+        """Merges another EnsembleResult of the same scenario into this one."""
+        self.replicas += other.replicas
+        for name in SERIES:
+            self.statistics[name].merge(other.statistics[name])
+        self.extinction_steps.extend(other.extinction_steps)
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        """Returns the mean, variance and quantiles of every series, and the distribution of the time to extinction."""
+        summary = {}
+        for name, statistics in self.statistics.items():
+            summary[name] = {
+                "mean": statistics.mean,
+                "variance": statistics.variance(),
+                "quantiles": {q: statistics.quantile(q) for q in quantiles},
+            }
+        extinct = np.array([step for step in self.extinction_steps if step is not None], dtype=np.float64)
+        summary["time_to_extinction"] = {
+            "extinct_fraction": len(extinct) / self.replicas if self.replicas else 0.0,
+            "mean": float(extinct.mean()) if len(extinct) else math.nan,
+            "quantiles": {q: float(np.quantile(extinct, q)) if len(extinct) else math.nan for q in quantiles},
+        }
+        return summary
+
+
+def time_to_extinction(wild_fires):
+    """Returns the first step with no wild fires, or None if there are fires at every step."""
+    for step, fires in enumerate(wild_fires):
+        if fires == 0:
+            return step
+    return None
+
+
+def _run_replicas(scenario, seed_sequences, bin_width):
+    """Runs the replicas of one worker and returns their aggregated EnsembleResult."""
+    result = EnsembleResult(scenario["steps"] + 1, bin_width)
+    for seed_sequence in seed_sequences:
+        result.add(headless.run_scenario(scenario, np.random.default_rng(seed_sequence)))
+    return result
+
+
+def scenario_nodes(scenario):
+    """Returns the number of nodes of the graph of a scenario, by building it once."""
+    return len(headless.build_graph(scenario, np.random.default_rng(0)).get_nodes())
+
+
+def run_ensemble(scenario, replicas:int, seed=None, max_workers=None, bin_width=None):
+    """
+    Runs replicas of a scenario across a process pool and returns the aggregated EnsembleResult.
+
+    Parameters
+    ----------
+    scenario: dict
+        Scenario as described in headless.py.
+    replicas: int
+        Number of independent simulations.
+    seed: int, optional
+        Seed the random streams of all replicas are spawned from, so an ensemble can be reproduced.
+    max_workers: int, optional
+        Number of worker processes, all cores by default. With 1 the replicas run in this process.
+    bin_width: int, optional
+        Width of the histogram bins used for the quantiles. By default it is chosen from the number of nodes
+        of the graph, which bounds every series, so that HISTOGRAM_BINS bins cover them.
+    """
+    headless.check_scenario(scenario)
+    if bin_width is None:
+        bin_width = max(1, math.ceil((scenario_nodes(scenario) + 1) / HISTOGRAM_BINS))
+    seed_sequences = np.random.SeedSequence(seed).spawn(replicas)
+    max_workers = max_workers or os.cpu_count() or 1
+    # A few batches per worker keeps the pool balanced without sending a task per replica
+    batches = [seed_sequences[i::max_workers * 4] for i in range(min(replicas, max_workers * 4))]
+
+    result = EnsembleResult(scenario["steps"] + 1, bin_width)
+    if max_workers == 1:
+        for batch in batches:
+            result.merge(_run_replicas(scenario, batch, bin_width))
+        return result
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for partial in executor.map(_run_replicas, [scenario] * len(batches), batches, [bin_width] * len(batches)):
+            result.merge(partial)
+    return result
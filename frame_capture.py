@@ -0,0 +1,175 @@
+"""
+This module records the frames of a simulation to disk and exports them to images or a video afterwards.
+
+Recording is cheap: every frame is one fixed-size record (the step, the colour value of every node as int16 and the
+node index of every fire fighter) appended to a binary file, which is read back as a memory-mapped array.
+The graph (node ID's, edges and positions) is stored once next to it, in a .npz file.
+
+Exporting renders the frames with the Visualiser (the same layout and colour scheme as the live window),
+split across a process pool, into numbered PNG files, which can then be joined into a GIF or an MP4.
+
+Example:
+    >>> graph.run_simulation(1000, visualise=False, record_frames="run.frames")
+    >>> export_frames("run.frames", "run.gif", fps=10)
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+NO_COLOUR = np.iinfo(np.int16).min # Colour value of nodes without a colour, i.e. rocks
+
+
+def frame_dtype(num_nodes:int, num_fire_fighters:int):
+    """Returns the record type of one frame."""
+    return np.dtype([("step", np.int32), ("colours", np.int16, (num_nodes,)), ("fire_fighters", np.int32, (num_fire_fighters,))])
+
+
+class FrameRecorder:
+    """Appends the frames of a simulation to a binary file."""
+    def __init__(self, path:str, node_ids, edges, positions=None, num_fire_fighters=0):
+        """
+        Parameters
+        ----------
+        path: str
+            File the frames are appended to. The graph is saved to path + ".npz".
+        node_ids: iterable of int
+            Node ID's in the order of the colours of every frame.
+        edges: list of (int, int)
+            Edges of the graph, used when exporting.
+        positions: dict, optional
+            Position of every node, a layout is computed when exporting if not given.
+        num_fire_fighters: int
+            Number of fire fighters in every frame.
+        """
+        self.path = path
+        self.node_ids = np.asarray(sorted(node_ids), dtype=np.int64)
+        self.index_of = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        self.dtype = frame_dtype(len(self.node_ids), num_fire_fighters)
+        has_positions = bool(positions)
+        coordinates = np.array([positions[node] for node in self.node_ids.tolist()], dtype=np.float64) if has_positions else np.zeros((0, 2))
+        np.savez(path + ".npz", node_ids=self.node_ids, edges=np.asarray(edges, dtype=np.int64).reshape(-1, 2),
+                 positions=coordinates, num_fire_fighters=num_fire_fighters)
+        self.file = open(path, "wb")
+        self.record = np.zeros(1, dtype=self.dtype)
+
+    @classmethod
+    def for_graph(cls, path:str, graph):
+        """Creates a FrameRecorder for the nodes, edges, positions and fire fighters of a Classes.Graph."""
+        return cls(path, graph.get_nodes(), graph.get_edges(), graph.get_positions(), len(graph.get_fire_fighters()))
+
+    def record_arrays(self, step:int, colours, fire_fighter_indices):
+        """Appends a frame given as arrays of colour values (in node order) and fire fighter node indices."""
+        self.record["step"] = step
+        self.record["colours"] = colours
+        self.record["fire_fighters"] = fire_fighter_indices
+        self.file.write(self.record.tobytes())
+
+    def record_graph(self, step:int, graph):
+        """
+        Appends the current frame of a Classes.Graph, copied from its colours array when it keeps one
+        (see Graph.track_colours), or built from its color map otherwise.
+        """
+        fire_fighters = [self.index_of[node] for node in graph.get_fire_fighter_positions()]
+        if graph.colours is not None:
+            self.record_arrays(step, graph.colours, fire_fighters)
+            return
+        colours = np.full(len(self.node_ids), NO_COLOUR, dtype=np.int16)
+        colour_map = graph.get_colormap()
+        if colour_map:
+            keys = np.fromiter((self.index_of[node] for node in colour_map.keys()), dtype=np.int64, count=len(colour_map))
+            colours[keys] = np.fromiter(colour_map.values(), dtype=np.float64, count=len(colour_map)).astype(np.int16)
+        self.record_arrays(step, colours, fire_fighters)
+
+    def close(self):
+        """Flushes and closes the frame file."""
+        self.file.close()
+
+
+def load_frames(path:str):
+    """Returns the graph (node ID's, edges, positions) and a read-only memory map of the frames recorded at path."""
+    graph = dict(np.load(path + ".npz"))
+    dtype = frame_dtype(len(graph["node_ids"]), int(graph["num_fire_fighters"]))
+    if os.path.getsize(path) == 0:
+        return graph, np.zeros(0, dtype=dtype)
+    return graph, np.memmap(path, dtype=dtype, mode="r")
+
+
+def _layout(graph):
+    """Returns the node positions of a recorded graph, computing a spring layout once if none were recorded."""
+    if len(graph["positions"]):
+        return {node: tuple(position) for node, position in zip(graph["node_ids"].tolist(), graph["positions"].tolist())}
+    import networkx as nx
+    layout_graph = nx.Graph()
+    layout_graph.add_nodes_from(graph["node_ids"].tolist())
+    layout_graph.add_edges_from(graph["edges"].tolist())
+    return nx.spring_layout(layout_graph, k=2, seed=0)
+
+
+def _render_frames(path:str, positions, frame_indices, directory:str):
+    """Renders some frames of a recording to numbered PNG files, in a worker process."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import visualiser_random_forest_graph as vis
+
+    graph, frames = load_frames(path)
+    node_ids = graph["node_ids"]
+    visual = vis.Visualiser(graph["edges"].tolist(), pos_nodes=positions, frame_pause=0, nodes=node_ids.tolist())
+    for i in frame_indices:
+        colours = frames[i]["colours"]
+        coloured = colours != NO_COLOUR
+        colour_map = dict(zip(node_ids[coloured].tolist(), colours[coloured].tolist()))
+        visual.update_frame(colour_map, node_ids[frames[i]["fire_fighters"]].tolist())
+        visual.save_snapshot(os.path.join(directory, f"frame_{i:06d}.png"))
+    visual.close()
+
+
+def render_pngs(path:str, directory:str, max_workers=None):
+    """Renders every frame of a recording to directory/frame_NNNNNN.png across a process pool and returns the file names."""
+    graph, frames = load_frames(path)
+    positions = _layout(graph)
+    count = len(frames)
+    del frames
+    os.makedirs(directory, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = [range(start, count, max_workers) for start in range(min(max_workers, count))]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(_render_frames, [path] * len(chunks), [positions] * len(chunks), chunks, [directory] * len(chunks)))
+    return [os.path.join(directory, f"frame_{i:06d}.png") for i in range(count)]
+
+
+def _load_images(files):
+    """Yields the images of PNG files one at a time, each loaded into memory and its file closed again."""
+    from PIL import Image
+
+    for file in files:
+        with Image.open(file) as image:
+            yield image.copy()
+
+
+def export_frames(path:str, output:str, fps=5, max_workers=None):
+    """
+    Exports a recording to output, a directory of PNG files or a .gif or .mp4 file.
+
+    MP4 export needs the ffmpeg program.
+    """
+    extension = os.path.splitext(output)[1].lower()
+    if extension == "":
+        return render_pngs(path, output, max_workers)
+    if extension not in (".gif", ".mp4"):
+        raise ValueError(f"Cannot export frames to {extension} files, use a directory, .gif or .mp4")
+    if extension == ".mp4" and shutil.which("ffmpeg") is None:
+        raise RuntimeError("Exporting to MP4 needs the ffmpeg program")
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = render_pngs(path, directory, max_workers)
+        if extension == ".gif":
+            images = _load_images(files)
+            next(images).save(output, save_all=True, append_images=images, duration=int(1000 / fps), loop=0)
+        else:
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-framerate", str(fps),
+                            "-i", os.path.join(directory, "frame_%06d.png"), "-pix_fmt", "yuv420p", output], check=True)
+    return output
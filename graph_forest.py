@@ -8,9 +8,15 @@ import math
 import time
 import matplotlib.pyplot as plt
 import Classes
+import headless
+import sys
 
 
 if __name__ == "__main__":
+    # Any command line flags run the simulation headless, see headless.py
+    if len(sys.argv) > 1:
+        sys.exit(headless.main(sys.argv[1:]))
+
     while True:
         print("\nWelcome to the program.\nThis program will simulate random forest fires on a random graph.\nType 1 or 2 and enter to make a choice.")
         graph = Classes.Graph()
@@ -48,15 +54,16 @@ if __name__ == "__main__":
                         time.sleep(2)
                         continue
                     graph.generate_adjacency_list()
-                    if gh.edges_planar(graph.get_edges()):
+                    report = graph.validate(check_planar=True)
+                    if report.planar:
                         print("\nThe graph is planar.")
-                    elif not gh.edges_planar(graph.get_edges()):
+                    else:
                         print("\nThe graph is not planar.\nPlease upload a planar and connected graph, or randomly generate one.")
                         time.sleep(2)
                         continue
-                    if graph.is_connected():    
+                    if report.is_connected():
                         print("\nThe graph is connected.")
-                    elif not graph.is_connected():
+                    else:
                         print("\nThe graph is not connected.\nPlease upload a planar and connected graph, or randomly generate one.")
                         time.sleep(2)
                         continue
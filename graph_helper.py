@@ -1,5 +1,6 @@
 """
 This module provides a set of helper functions, to:
+voronoi_arrays: generate the arrays (edges, CSR adjacency, positions) of a random planar graph.
 voronoi_to_edges: generate collection of edges defining a planar graph.
 edges_planar: verifies if the given set of edges defines a planar graph
 
@@ -20,11 +21,73 @@ Notes
 This module provided as material for the phase 2 project for DM857, DS830 (2023). 
 """
 
+import math
 import numpy as np
 import networkx as nx
-from scipy.spatial import Voronoi
+from scipy.spatial import Delaunay
 from typing import List, Optional, Dict,Tuple 
-def voronoi_to_edges(minpoints:int,npoints:Optional[int]=0)->Tuple[List[Tuple[int,int]],Dict[int,Tuple[float,float]]]:
+from graph_io import GraphArrays
+
+def _voronoi_dual(points:np.ndarray)->Tuple[np.ndarray,np.ndarray]:
+  '''
+   Returns the vertices and ridges of the Voronoi diagram of points, computed from their Delaunay triangulation
+
+   Every Delaunay triangle gives the Voronoi vertex at its circumcenter, and every pair of neighboring triangles
+   gives a finite ridge. This is the same graph as scipy.spatial.Voronoi without the infinite ridges,
+   but qhull only has to triangulate, which is about twice as fast.
+  '''
+  tri = Delaunay(points)
+  a, b, c = (points[tri.simplices[:, k]] for k in range(3))
+  b = b - a
+  c = c - a
+  d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+  bb = (b ** 2).sum(axis=1)
+  cc = (c ** 2).sum(axis=1)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    vertices = a + np.stack(((c[:, 1] * bb - b[:, 1] * cc) / d, (b[:, 0] * cc - c[:, 0] * bb) / d), axis=1)
+  triangles = np.repeat(np.arange(len(tri.simplices)), 3)
+  neighbors = tri.neighbors.reshape(-1)
+  keep = triangles < neighbors # Every ridge once, and none to the outside (-1)
+  return vertices, np.stack((triangles[keep], neighbors[keep]), axis=1)
+
+
+def voronoi_arrays(minpoints:int,npoints:Optional[int]=0,rng:Optional[np.random.Generator]=None)->GraphArrays:
+  '''
+   Generates a random planar graph containing at least minpoints (based on the Voronoi graph), as arrays
+
+   Only the ridges with both vertices in [0,1]x[0,1] are kept, selected with array masks, and the kept vertices
+   are numbered 0..n-1 in the order of the Voronoi vertices.
+   The Voronoi diagram of n random points has about 2n vertices in the square, minus about 3.5*sqrt(n) near its border,
+   so n is chosen to give minpoints vertices with a small margin. If too few vertices are kept anyway, n is scaled by the
+   observed ratio and the diagram is generated again, which is rarely needed.
+
+   Parameters:
+   ----------
+   minpoints: Minimal number of points requested for the graph
+   npoints: Number of points in the Voronoi graph generation, chosen from minpoints if not given
+   rng: Random generator used for the points, numpy's global random state if not given
+
+   Return: GraphArrays
+   ----------
+   The edges, CSR adjacency and positions (in [0,1]x[0,1]) of the graph.
+  '''
+  if(minpoints<4):
+     raise Exception("voronoi_arrays, the number of points must be larger than 3")
+  if(npoints<4):
+     npoints=max(4, math.ceil(minpoints / 2 + 2 * math.sqrt(minpoints)))
+  while True:
+    points=rng.random((npoints,2)) if rng is not None else np.random.rand(npoints,2)
+    vertices, ridges = _voronoi_dual(points)
+    # NaN vertices (of degenerate triangles) compare False and are dropped too
+    inside = np.all((vertices >= 0) & (vertices <= 1), axis=1)
+    ridges = ridges[inside[ridges].all(axis=1)]
+    used, edges = np.unique(ridges, return_inverse=True)
+    if len(used) >= minpoints:
+      return GraphArrays.from_edges(edges.reshape(-1, 2), vertices[used])
+    npoints = max(npoints + 1, math.ceil(1.05 * npoints * minpoints / max(len(used), 1)))
+
+
+def voronoi_to_edges(minpoints:int,npoints:Optional[int]=0,rng:Optional[np.random.Generator]=None)->Tuple[List[Tuple[int,int]],Dict[int,Tuple[float,float]]]:
   '''
    Generates a random planar graph containing at least minpoints (based on the Voronoi graph)
 
@@ -32,6 +95,7 @@ def voronoi_to_edges(minpoints:int,npoints:Optional[int]=0)->Tuple[List[Tuple[in
    ----------
    minpoints: Minimal number of points requested for the graph
    npoints: Number of points in the Voronoi graph generation
+   rng: Random generator used for the points, numpy's global random state if not given
    
    Return: Tuple[edges,coord_map]
    ----------
@@ -42,33 +106,8 @@ def voronoi_to_edges(minpoints:int,npoints:Optional[int]=0)->Tuple[List[Tuple[in
   '''
   if(minpoints<4):
      raise Exception("voronoi_to_edges, the number of points must be larger than 3")
-  if(npoints<4):
-     npoints=minpoints
-  points=np.random.rand(npoints,2)
-# we get the voronoi diagram
-  vor = Voronoi(points)
-# storage variable
-  res=[]
-  map={}
-  jj=0
-# Add an edge for each ridge in the Voronoi diagram that connects two points in the range [0,1] 
-  for simplex in vor.ridge_vertices:
-      if -1 not in simplex:
-          i, j = simplex
-          p = vor.vertices[i]
-          q = vor.vertices[j]
-          if 0 <= p[0] <= 1 and 0 <= p[1] <= 1 and 0 <= q[0] <= 1 and 0 <= q[1] <= 1:
-              if tuple(p) not in map:
-                 map[tuple(p)]=jj
-                 jj+=1
-              if tuple(q) not in map:
-                 map[tuple(q)]=jj
-                 jj+=1
-              res.append((tuple(p), tuple(q)))
-  if len(map) < minpoints:
-   return voronoi_to_edges(minpoints, npoints+1)
-  else:
-   return [(map[i[0]],map[i[1]]) for i in res],{v: k for k, v in map.items()}
+  arrays = voronoi_arrays(minpoints, npoints, rng)
+  return arrays.edge_list(), arrays.position_map()
   
 
 def edges_planar(edges=List[Tuple[int,int]])-> bool:
@@ -0,0 +1,276 @@
+"""
+This module provides GraphArrays, a compact array representation of a graph, and a binary cache for graph files.
+
+A GraphArrays holds the sorted node ID's, the edges, the CSR adjacency (offsets and indices in node index space,
+in the same neighbor order as Graph.generate_adjacency_list) and optionally the node positions.
+It is saved either as a single .npz file or as a directory of raw .npy files, which load memory-mapped (zero-copy).
+
+Text .dat graph files are parsed in chunks by iter_edge_chunks, which records malformed lines in a ParseReport,
+and are converted once and cached in such a directory, keyed by the SHA-256 hash of their content:
+
+    >>> arrays = load_cached("graph1.dat")   # parses the file and writes .graph_cache/<hash>/
+    >>> arrays = load_cached("graph1.dat")   # memory-maps the cached arrays
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+
+ARRAY_NAMES = ("node_ids", "edges", "offsets", "indices", "positions")
+CACHE_DIRECTORY = ".graph_cache"
+
+
+class GraphArrays:
+    """Array representation of an undirected graph."""
+    def __init__(self, node_ids, edges, offsets, indices, positions=None):
+        self.node_ids = node_ids
+        self.edges = edges
+        self.offsets = offsets
+        self.indices = indices
+        self.positions = positions if positions is not None and len(positions) else None
+        self.parse_report = None #ParseReport of the text file the arrays were made from, if known
+        self.cache_entry = None #Cache directory the arrays were loaded from, where reports about them can be kept too
+
+    @classmethod
+    def from_edges(cls, edges, positions=None, node_ids=None):
+        """
+        Builds the arrays of a graph from its edges, and optionally a dictionary or array of node positions.
+
+        Every edge (a, b) gives b as neighbor of a and a as neighbor of b, in the order of the edges.
+        The nodes are the nodes of the edges, or the sorted node_ids if given, which may include nodes without edges.
+        """
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if node_ids is None:
+            node_ids, inverse = np.unique(edges, return_inverse=True)
+        else:
+            node_ids = np.asarray(node_ids, dtype=np.int64)
+            inverse = np.searchsorted(node_ids, edges)
+        inverse = inverse.reshape(-1, 2)
+        # Both directions of every edge, interleaved so a stable sort keeps the order of generate_adjacency_list
+        sources = inverse.reshape(-1)
+        targets = inverse[:, ::-1].reshape(-1)
+        order = np.argsort(sources, kind="stable")
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_ids)), out=offsets[1:])
+        indices = targets[order]
+        if isinstance(positions, dict):
+            positions = np.array([positions[node] for node in node_ids.tolist()], dtype=np.float64) if positions else None
+        return cls(node_ids, edges, offsets, indices, positions)
+
+    def num_nodes(self):
+        """Returns the number of nodes."""
+        return len(self.node_ids)
+
+    def edge_list(self):
+        """Returns the edges as a list of tuples, like Graph.edges."""
+        return list(map(tuple, self.edges.tolist()))
+
+    def position_map(self):
+        """Returns the positions as a dictionary mapping node ID's to position tuples, empty if there are none."""
+        if self.positions is None:
+            return {}
+        return dict(zip(self.node_ids.tolist(), map(tuple, self.positions.tolist())))
+
+    def save(self, path:str):
+        """Saves the arrays to a .npz file, or to a directory of memory-mappable .npy files for any other path."""
+        arrays = {name: getattr(self, name) for name in ARRAY_NAMES if getattr(self, name) is not None}
+        if path.endswith(".npz"):
+            np.savez(path, **arrays)
+            return
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(array))
+
+    @classmethod
+    def load(cls, path:str, mmap=True):
+        """Loads arrays saved with save, memory-mapped from a directory unless mmap is False."""
+        if path.endswith(".npz"):
+            with np.load(path) as data:
+                return cls(**{name: data[name] for name in ARRAY_NAMES if name in data})
+        arrays = {}
+        for name in ARRAY_NAMES:
+            file_name = os.path.join(path, name + ".npy")
+            if os.path.exists(file_name):
+                arrays[name] = np.load(file_name, mmap_mode="r" if mmap else None)
+        return cls(**arrays)
+
+
+class ParseReport:
+    """Summary of parsing a text graph file, with the line number and reason of every malformed line."""
+    def __init__(self, max_diagnostics=1000):
+        self.lines = 0
+        self.edges = 0
+        self.ignored = 0 #Empty and comment lines
+        self.malformed = 0
+        self.diagnostics = [] #(line number, reason) of the first max_diagnostics malformed lines
+        self.max_diagnostics = max_diagnostics
+
+    def add_diagnostic(self, line_number:int, reason:str):
+        """Records a malformed line, keeping at most max_diagnostics of them so memory stays bounded."""
+        self.malformed += 1
+        if len(self.diagnostics) < self.max_diagnostics:
+            self.diagnostics.append((line_number, reason))
+
+    def to_dict(self):
+        """Returns the report as a dictionary that can be saved as JSON."""
+        return {"lines": self.lines, "edges": self.edges, "ignored": self.ignored, "malformed": self.malformed,
+                "diagnostics": self.diagnostics}
+
+    @classmethod
+    def from_dict(cls, values):
+        """Creates a report from a dictionary made by to_dict."""
+        report = cls()
+        report.lines, report.edges, report.ignored, report.malformed = values["lines"], values["edges"], values["ignored"], values["malformed"]
+        report.diagnostics = [tuple(diagnostic) for diagnostic in values["diagnostics"]]
+        return report
+
+    def summary(self):
+        """Returns a short human readable description of the malformed lines, empty if there are none."""
+        if not self.malformed:
+            return ""
+        shown = ", ".join(f"line {line_number} ({reason})" for line_number, reason in self.diagnostics[:5])
+        more = f" and {self.malformed - 5} more" if self.malformed > 5 else ""
+        return f"{self.malformed} malformed entries were ignored: {shown}{more}"
+
+
+# A line that is exactly one edge, optionally in parentheses, and a line that is empty or a comment
+EDGE_LINE = re.compile(r"^[ \t\r\f\v]*[()]*[ \t\r\f\v]*([+-]?[0-9]+)[ \t\r\f\v]*,[ \t\r\f\v]*([+-]?[0-9]+)[ \t\r\f\v]*[()]*[ \t\r\f\v]*$", re.M)
+IGNORED_LINE = re.compile(r"^[ \t\r\f\v]*(?:#.*)?$", re.M)
+
+
+def _parse_lines(text:str, first_line:int, report:ParseReport):
+    """Parses lines one at a time with the rules of Graph.load_graph, recording every malformed line in the report."""
+    edges = []
+    for line_number, line in enumerate(text.split("\n"), first_line):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            report.ignored += 1
+            continue
+        parts = line.strip("()").split(",")
+        if len(parts) != 2:
+            report.add_diagnostic(line_number, f"expected 2 comma-separated values, found {len(parts)}")
+            continue
+        try:
+            edges.append((int(parts[0]), int(parts[1])))
+        except ValueError:
+            report.add_diagnostic(line_number, "value is not an integer")
+    return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def _parse_chunk(text:str, first_line:int, report:ParseReport):
+    """
+    Parses a chunk of whole lines. The edges are found with one regular expression over the whole chunk,
+    and only a chunk with malformed lines is parsed again line by line to find them.
+    """
+    lines = text.count("\n") + 1
+    report.lines += lines
+    found = EDGE_LINE.findall(text)
+    ignored = len(IGNORED_LINE.findall(text))
+    if len(found) + ignored != lines:
+        edges = _parse_lines(text, first_line, report)
+    else:
+        report.ignored += ignored
+        edges = np.array(found, dtype=str).astype(np.int64).reshape(-1, 2) if found else np.zeros((0, 2), dtype=np.int64)
+    report.edges += len(edges)
+    return edges
+
+
+def iter_edge_chunks(data_file:str, report=None, chunk_size=1 << 22):
+    """
+    Reads a text graph file in chunks of about chunk_size characters and yields the edges of every chunk as an (E, 2) array.
+
+    The rules are the same as Graph.load_graph: empty lines and lines starting with '#' are ignored, and every line
+    that is not two comma-separated integers, optionally in parentheses, is recorded in the ParseReport and skipped.
+    Only one chunk is in memory at a time.
+    """
+    report = report if report is not None else ParseReport()
+    line_number = 1
+    remainder = ""
+    with open(data_file, "r") as data:
+        while True:
+            block = data.read(chunk_size)
+            if not block:
+                break
+            block = remainder + block
+            end = block.rfind("\n")
+            if end < 0:
+                remainder = block
+                continue
+            text, remainder = block[:end], block[end + 1:]
+            yield _parse_chunk(text, line_number, report)
+            line_number += text.count("\n") + 1
+    if remainder:
+        yield _parse_chunk(remainder, line_number, report)
+
+
+def parse_edges_text(data_file:str, report=None, chunk_size=1 << 22):
+    """Parses a whole text graph file with iter_edge_chunks and returns its edges as an (E, 2) array and the ParseReport."""
+    report = report if report is not None else ParseReport()
+    chunks = list(iter_edge_chunks(data_file, report, chunk_size))
+    edges = np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.int64)
+    return edges, report
+
+
+def file_hash(data_file:str, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of the content of a file."""
+    digest = hashlib.sha256()
+    with open(data_file, "rb") as data:
+        for chunk in iter(lambda: data.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cached_hash(data_file:str, cache_dir:str):
+    """
+    Returns the content hash of a file, reusing the hash remembered for the same path, size and modification time,
+    so an unchanged file is not read again.
+    """
+    stat = os.stat(data_file)
+    key = f"{os.path.abspath(data_file)}:{stat.st_size}:{stat.st_mtime_ns}"
+    index_file = os.path.join(cache_dir, "index.json")
+    try:
+        with open(index_file, "r") as index:
+            hashes = json.load(index)
+    except (OSError, ValueError):
+        hashes = {}
+    if key not in hashes:
+        hashes[key] = file_hash(data_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=cache_dir, delete=False) as index:
+            json.dump(hashes, index)
+        os.replace(index.name, index_file)
+    return hashes[key]
+
+
+def load_cached(data_file:str, cache_dir=None, mmap=True):
+    """
+    Loads the GraphArrays of a text graph file from the cache, converting and caching the file first if needed.
+
+    The cache directory defaults to .graph_cache next to the graph file.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(data_file)), CACHE_DIRECTORY)
+    entry = os.path.join(cache_dir, _cached_hash(data_file, cache_dir))
+    if not os.path.isdir(entry):
+        edges, report = parse_edges_text(data_file)
+        arrays = GraphArrays.from_edges(edges)
+        # Written to a temporary directory first, so a cache entry is never seen half-written
+        temporary = tempfile.mkdtemp(dir=cache_dir)
+        arrays.save(temporary)
+        with open(os.path.join(temporary, "report.json"), "w") as report_file:
+            json.dump(report.to_dict(), report_file)
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            shutil.rmtree(temporary) # Another process cached the same file in the meantime
+    arrays = GraphArrays.load(entry, mmap)
+    arrays.cache_entry = entry
+    report_file = os.path.join(entry, "report.json")
+    if os.path.exists(report_file):
+        with open(report_file, "r") as report:
+            arrays.parse_report = ParseReport.from_dict(json.load(report))
+    return arrays
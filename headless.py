@@ -0,0 +1,194 @@
+"""
+This module runs forest fire simulations without the Visualiser and without any user input.
+
+A simulation is described by a scenario, either given as command line flags or as a JSON scenario file:
+
+    python graph_forest.py --nodes 5000 --fire-fighters 200 --steps 2000 --output stats.csv
+    python graph_forest.py --scenario scenario.json --runs 100
+    python graph_forest.py --raster-file tile.npy --steps 500
+
+Scenario file keys are the same as the long flag names, with underscores instead of dashes, e.g.
+{"graph_file": "graph1.dat", "fire_fighters": 2, "steps": 500, "output": "stats.csv"}.
+The statistics of every run are written to a CSV file with one row per update step.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import numpy as np
+import landscapes
+import Classes
+
+DEFAULT_SCENARIO = {
+    "nodes": 100,
+    "graph_file": None,
+    "fire_fighters": 10,
+    "skill_lower": 0.4,
+    "skill_upper": 0.6,
+    "tree_probability": 0.8,
+    "ignition_probability": 0.1,
+    "probability_spread_fire": 0.3,
+    "steps": 100,
+    "runs": 1,
+    "seed": None,
+    "synchronous": False,
+    "output": "simulation_stats.csv",
+    "skip_validation": False,
+    "graph_cache": None,
+    "landscape": "voronoi",
+    "raster_file": None,
+}
+
+LANDSCAPES = ("voronoi", "square", "hex", "delaunay")
+
+
+class ScenarioError(ValueError):
+    """Raised when a scenario has invalid values or describes a graph that cannot be simulated."""
+
+
+def load_scenario(scenario_file: str):
+    """Loads a scenario from a JSON file and returns it merged with the default scenario."""
+    with open(scenario_file, "r") as data:
+        values = json.load(data)
+    unknown = set(values) - set(DEFAULT_SCENARIO)
+    if unknown:
+        raise ScenarioError(f"Unknown scenario keys: {', '.join(sorted(unknown))}")
+    scenario = dict(DEFAULT_SCENARIO)
+    scenario.update(values)
+    return scenario
+
+
+def check_scenario(scenario):
+    """Checks that the values of a scenario are usable, and raises ScenarioError if they are not."""
+    if scenario["landscape"] not in LANDSCAPES:
+        raise ScenarioError(f"The landscape must be one of {', '.join(LANDSCAPES)}")
+    if scenario["graph_file"] is None and scenario["raster_file"] is None and scenario["nodes"] < 4:
+        raise ScenarioError("The number of nodes must be at least 4")
+    if scenario["fire_fighters"] < 0:
+        raise ScenarioError("The amount of fire fighters cannot be negative")
+    if not 0 <= scenario["skill_lower"] <= scenario["skill_upper"]:
+        raise ScenarioError("The skill levels must satisfy 0 <= skill_lower <= skill_upper")
+    for key in ("tree_probability", "ignition_probability", "probability_spread_fire"):
+        if not 0 <= scenario[key] <= 1:
+            raise ScenarioError(f"{key} must be between 0 and 1")
+    if scenario["steps"] < 1 or scenario["runs"] < 1:
+        raise ScenarioError("steps and runs must be at least 1")
+
+
+def generate_landscape(scenario, rng=None):
+    """Generates the lattice or Delaunay landscape of a scenario, with about the given number of nodes."""
+    if scenario["landscape"] == "delaunay":
+        return landscapes.delaunay(num_points=scenario["nodes"], probability_tree=scenario["tree_probability"], rng=rng)
+    side = int(np.ceil(np.sqrt(scenario["nodes"])))
+    lattice = landscapes.hex_lattice if scenario["landscape"] == "hex" else landscapes.square_lattice
+    return lattice(side, side, probability_tree=scenario["tree_probability"], rng=rng)
+
+
+def build_graph(scenario, rng=None):
+    """Builds a graph with land patches, fire fighters and initial fires from a scenario."""
+    graph = Classes.Graph(rng=rng)
+    if scenario["graph_file"] is not None:
+        graph.load_graph(scenario["graph_file"], use_cache=scenario["graph_cache"] is not None,
+                         cache_dir=scenario["graph_cache"] or None)
+        graph.create_node_list()
+        if len(graph.get_nodes()) < 4:
+            raise ScenarioError("Number of nodes in the graph file was below 4")
+        graph.generate_adjacency_list()
+        if not scenario["skip_validation"]:
+            report = graph.validate(check_planar=True)
+            if not report.planar:
+                raise ScenarioError("The graph is not planar")
+            if not report.is_connected():
+                raise ScenarioError(f"The graph is not connected, it has {report.components} components")
+    elif scenario["raster_file"] is not None:
+        graph.load_landscape(landscapes.from_raster(np.load(scenario["raster_file"])))
+        if len(graph.get_nodes()) < 4:
+            raise ScenarioError("Number of land cells in the raster file was below 4")
+    elif scenario["landscape"] != "voronoi":
+        graph.load_landscape(generate_landscape(scenario, graph.rng))
+    else:
+        graph.generate_graph(scenario["nodes"])
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+
+    if scenario["fire_fighters"] > len(graph.get_nodes()):
+        raise ScenarioError("There cannot be more fire fighters than nodes")
+    graph.generate_fire_fighters(scenario["fire_fighters"], scenario["skill_lower"], scenario["skill_upper"])
+    if not graph.get_landpatches(): # Landscapes come with their land patches
+        graph.generate_land_patches(scenario["tree_probability"])
+    graph.initial_ignition(scenario["ignition_probability"])
+    return graph
+
+
+def run_scenario(scenario, rng=None):
+    """Runs a scenario once without visualisation and returns the simulated graph."""
+    graph = build_graph(scenario, rng)
+    graph.run_simulation(scenario["steps"], scenario["probability_spread_fire"], visualise=False,
+                         synchronous=scenario["synchronous"])
+    return graph
+
+
+def write_stats(writer, run: int, graph):
+    """Writes the statistics of one simulated graph as rows of a CSV writer."""
+    for row in zip(graph.updates, graph.tree_patches, graph.rock_patches, graph.wild_fires):
+        writer.writerow((run,) + row)
+
+
+def parse_arguments(argv=None):
+    """Parses the command line flags and returns the resulting scenario."""
+    parser = argparse.ArgumentParser(description="Run forest fire simulations without visualisation.")
+    parser.add_argument("--scenario", help="JSON scenario file, flags given on the command line override its values")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--nodes", type=int, help="approximate number of nodes of a randomly generated graph")
+    source.add_argument("--graph-file", help="file with the edges of the graph")
+    source.add_argument("--raster-file", help=".npy file with a 2D raster of land cover codes (1 tree, 2 rock, others no data)")
+    parser.add_argument("--landscape", choices=LANDSCAPES, help="kind of generated graph, voronoi by default")
+    parser.add_argument("--fire-fighters", type=int)
+    parser.add_argument("--skill-lower", type=float)
+    parser.add_argument("--skill-upper", type=float)
+    parser.add_argument("--tree-probability", type=float)
+    parser.add_argument("--ignition-probability", type=float)
+    parser.add_argument("--probability-spread-fire", type=float)
+    parser.add_argument("--steps", type=int, help="number of update steps of every run")
+    parser.add_argument("--runs", type=int, help="number of independent runs of the scenario")
+    parser.add_argument("--output", help="CSV file the statistics are written to")
+    parser.add_argument("--seed", type=int, help="seed of the random generator, so the runs can be reproduced")
+    parser.add_argument("--synchronous", action="store_true", default=None,
+                        help="update every land patch from the state at the start of the step")
+    parser.add_argument("--graph-cache", help="directory of the binary cache of graph files, the file is parsed again every run if not given")
+    parser.add_argument("--skip-validation", action="store_true", default=None,
+                        help="do not check that a loaded graph is planar and connected")
+    arguments = vars(parser.parse_args(argv))
+
+    scenario_file = arguments.pop("scenario")
+    scenario = load_scenario(scenario_file) if scenario_file else dict(DEFAULT_SCENARIO)
+    if arguments["nodes"] is not None:
+        scenario["graph_file"] = scenario["raster_file"] = None
+    if arguments["graph_file"] is not None:
+        scenario["nodes"] = scenario["raster_file"] = None
+    if arguments["raster_file"] is not None:
+        scenario["nodes"] = scenario["graph_file"] = None
+    scenario.update({key: value for key, value in arguments.items() if value is not None})
+    return scenario
+
+
+def main(argv=None):
+    """Runs the scenario given on the command line and writes its statistics to disk."""
+    scenario = parse_arguments(argv)
+    try:
+        check_scenario(scenario)
+        with open(scenario["output"], "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(("run", "step", "tree_patches", "rock_patches", "wild_fires"))
+            rng = np.random.default_rng(scenario["seed"])
+            for run in range(scenario["runs"]):
+                write_stats(writer, run, run_scenario(scenario, rng))
+    except (ScenarioError, OSError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+This module provides opt-in instrumentation of a simulation: timers around its phases and counters of its events.
+
+The phases are the land update, fire spreading (part of the land update), moving the fire fighters, updating the
+fire fighter positions, generating the color map and handing frames to the render process and frame recorder.
+The events are the draws from the random generator (counted by CountingGenerator), spread attempts, ignitions,
+extinguishes and mutations between trees and rocks.
+
+Every step gives one record of the seconds spent in every phase and the count of every event, and summary()
+gives the totals and averages of the run. The whole run can also be wrapped in cProfile.
+
+Example:
+    >>> instrumentation = graph.run_simulation(500, visualise=False, instrument=True)
+    >>> print(instrumentation.format_summary())
+    >>> instrumentation.records[10]["spread_fire"], instrumentation.records[10]["ignitions"]
+"""
+
+import cProfile
+import io
+import pstats
+import time
+import numpy as np
+
+PHASES = ("land_update", "spread_fire", "fire_fighter_move", "update_fire_fighter_positions", "generate_colormap", "render")
+COUNTERS = ("rng_draws", "spread_attempts", "ignitions", "extinguishes", "mutations")
+
+
+class CountingGenerator:
+    """Wraps a numpy random Generator and counts the number of values drawn from it, without changing the values."""
+    def __init__(self, rng):
+        self.rng = rng
+        self.draws = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.rng, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            self.draws += np.size(result)
+            return result
+        return counted
+
+
+class Instrumentation:
+    """Collects the time spent in every phase and the count of every event, per step and for the whole run."""
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, profile=False):
+        """
+        Parameters
+        ----------
+        profile: bool, default False
+            Whether the run is also wrapped in cProfile, whose statistics are kept in profile_stats.
+        """
+        self.records = [] #One dictionary per step with the step, the seconds of every phase and the count of every event
+        self.current = dict.fromkeys(PHASES + COUNTERS, 0)
+        self.rng = None
+        self.profiler = cProfile.Profile() if profile else None
+        self.profile_stats = None
+
+    def start(self, graph):
+        """Starts instrumenting a graph, wrapping its random generator in a CountingGenerator."""
+        self.rng = CountingGenerator(graph.rng)
+        graph.rng = self.rng
+        graph.instrumentation = self
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self, graph):
+        """Stops instrumenting a graph and gives it back its own random generator."""
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profile_stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        graph.rng = self.rng.rng
+        graph.instrumentation = None
+
+    def add_time(self, phase:str, started:float):
+        """Adds the time since started, a value of clock(), to a phase of the current step."""
+        self.current[phase] += self.clock() - started
+
+    def count(self, counter:str, amount=1):
+        """Adds to an event counter of the current step."""
+        self.current[counter] += amount
+
+    def end_step(self, step:int):
+        """Stores the record of a finished step and starts the next one."""
+        self.current["rng_draws"] = self.rng.draws
+        self.rng.draws = 0
+        self.records.append(dict(self.current, step=step))
+        self.current = dict.fromkeys(PHASES + COUNTERS, 0)
+
+    def summary(self):
+        """Returns the total, the mean per step and the maximum of every phase and counter over the recorded steps."""
+        summary = {"steps": len(self.records)}
+        for name in PHASES + COUNTERS:
+            values = np.array([record[name] for record in self.records], dtype=np.float64)
+            summary[name] = {"total": float(values.sum()), "mean": float(values.mean()) if len(values) else 0.0,
+                             "max": float(values.max(initial=0))}
+        return summary
+
+    def format_summary(self, profile_lines=20):
+        """Returns the summary as a table, followed by the most expensive functions if the run was profiled."""
+        summary = self.summary()
+        total = sum(summary[phase]["total"] for phase in PHASES if phase != "spread_fire") or 1.0 # spread_fire is part of land_update
+        lines = [f"{summary['steps']} steps", f"{'phase':<32}{'total s':>12}{'ms/step':>12}{'share':>8}"]
+        for phase in PHASES:
+            lines.append(f"{phase:<32}{summary[phase]['total']:>12.4f}{1000 * summary[phase]['mean']:>12.4f}{summary[phase]['total'] / total:>8.1%}")
+        lines.append(f"{'counter':<32}{'total':>12}{'per step':>12}")
+        for counter in COUNTERS:
+            lines.append(f"{counter:<32}{summary[counter]['total']:>12.0f}{summary[counter]['mean']:>12.1f}")
+        if self.profile_stats is not None:
+            self.profile_stats.sort_stats("cumulative").print_stats(profile_lines)
+            lines.append(self.profile_stats.stream.getvalue())
+        return "\n".join(lines)
@@ -0,0 +1,143 @@
+"""
+This module generates landscapes: graphs with known node positions and the initial land cover of every node.
+
+Besides the Voronoi graphs of Graph.generate_graph, landscapes can be
+- square lattices (4 or 8 neighbors) and hexagonal lattices (6 neighbors),
+- Delaunay triangulations of random or given points,
+- imported from a 2D raster of land cover codes, such as a classified map tile, where every cell becomes a node.
+
+Everything is built with array operations, so landscapes of millions of nodes take seconds, and the positions are
+known up front, so no layout has to be computed to show them. A Landscape is loaded into a Classes.Graph with
+Graph.load_landscape, which replaces create_node_list, generate_adjacency_list and generate_land_patches,
+or into an array_engine.ArrayForest directly with Landscape.array_forest.
+
+Example:
+    >>> landscape = from_raster(np.load("tile.npy"))
+    >>> graph = Classes.Graph(seed=1)
+    >>> graph.load_landscape(landscape)
+"""
+
+import math
+import numpy as np
+from scipy.spatial import Delaunay
+from array_engine import ROCK, TREE, NEW_TREE_TREESTATS, ArrayForest
+from graph_io import GraphArrays
+
+# Default land cover codes of a raster, cells with any other code are left out of the graph
+RASTER_NO_DATA = 0
+RASTER_TREE = 1
+RASTER_ROCK = 2
+
+SQUARE_OFFSETS = ((0, 1, None), (1, 0, None)) # (row offset, column offset, parity of the rows it applies to)
+DIAGONAL_OFFSETS = ((1, 1, None), (1, -1, None))
+HEX_OFFSETS = ((0, 1, None), (1, 0, None), (1, -1, 0), (1, 1, 1)) # Odd rows are shifted half a cell to the right
+
+
+class Landscape:
+    """The arrays of a graph together with the initial patch type (TREE or ROCK) of every node."""
+    def __init__(self, arrays:GraphArrays, patch_type):
+        self.arrays = arrays
+        self.patch_type = np.asarray(patch_type, dtype=np.int8)
+
+    def num_nodes(self):
+        """Returns the number of nodes."""
+        return self.arrays.num_nodes()
+
+    def is_tree(self):
+        """Returns a boolean mask of the nodes that start as trees, in node order."""
+        return self.patch_type == TREE
+
+    def array_forest(self, rng=None, probability_ignition=0.0, probability_spread_fire=0.3,
+                     fire_fighter_positions=None, fire_fighter_skills=None):
+        """
+        Creates an ArrayForest of the landscape, with new trees that are set on fire with probability_ignition,
+        like Graph.initial_ignition. Fire fighters are given as node indices and skill levels.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        trees = self.is_tree()
+        treestats = np.where(trees, NEW_TREE_TREESTATS, 0)
+        burning = trees & (rng.random(self.num_nodes()) <= probability_ignition)
+        forest = ArrayForest(self.arrays.node_ids, self.arrays.offsets, self.arrays.indices, self.patch_type, treestats,
+                             burning, fire_fighter_positions, fire_fighter_skills, rng, probability_spread_fire)
+        forest.update_has_fire_fighter()
+        return forest
+
+
+def random_patch_types(num_nodes:int, probability_tree=0.8, rng=None):
+    """Returns TREE with probability probability_tree and ROCK otherwise for every node, like Graph.generate_land_patches."""
+    rng = rng if rng is not None else np.random.default_rng()
+    return np.where(rng.random(num_nodes) < probability_tree, TREE, ROCK).astype(np.int8)
+
+
+def _grid_edges(valid, offsets):
+    """Returns the edges between the valid cells of a grid, numbered row by row, that are the given offsets apart."""
+    rows, columns = valid.shape
+    ids = np.arange(rows * columns, dtype=np.int64).reshape(rows, columns)
+    edges = []
+    for row_offset, column_offset, parity in offsets:
+        first_column = max(0, -column_offset)
+        last_column = columns - max(0, column_offset)
+        source = (slice(0, rows - row_offset), slice(first_column, last_column))
+        target = (slice(row_offset, rows), slice(first_column + column_offset, last_column + column_offset))
+        mask = valid[source] & valid[target]
+        if parity is not None:
+            mask &= (np.arange(rows - row_offset) % 2 == parity)[:, None]
+        edges.append(np.stack((ids[source][mask], ids[target][mask]), axis=1))
+    return np.concatenate(edges)
+
+
+def _grid_positions(rows:int, columns:int, hexagonal=False):
+    """Returns the positions of the cells of a grid, row 0 at the top, scaled into [0,1]x[0,1] keeping the aspect ratio."""
+    row, column = np.divmod(np.arange(rows * columns), columns)
+    x = column + 0.5 * (row % 2) if hexagonal else column.astype(np.float64)
+    y = (rows - 1 - row) * (math.sqrt(3) / 2 if hexagonal else 1.0)
+    scale = max(x.max(), y.max(), 1.0)
+    return np.stack((x, y), axis=1) / scale
+
+
+def square_lattice(rows:int, columns:int, probability_tree=0.8, diagonal=False, rng=None):
+    """Generates a rows x columns square lattice, where every cell has 4 neighbors, or 8 with diagonal."""
+    valid = np.ones((rows, columns), dtype=bool)
+    edges = _grid_edges(valid, SQUARE_OFFSETS + (DIAGONAL_OFFSETS if diagonal else ()))
+    arrays = GraphArrays.from_edges(edges, _grid_positions(rows, columns), np.arange(rows * columns))
+    return Landscape(arrays, random_patch_types(rows * columns, probability_tree, rng))
+
+
+def hex_lattice(rows:int, columns:int, probability_tree=0.8, rng=None):
+    """Generates a rows x columns hexagonal lattice, where every cell has 6 neighbors."""
+    valid = np.ones((rows, columns), dtype=bool)
+    edges = _grid_edges(valid, HEX_OFFSETS)
+    arrays = GraphArrays.from_edges(edges, _grid_positions(rows, columns, hexagonal=True), np.arange(rows * columns))
+    return Landscape(arrays, random_patch_types(rows * columns, probability_tree, rng))
+
+
+def delaunay(points=None, num_points=100, probability_tree=0.8, rng=None):
+    """
+    Generates the Delaunay triangulation of the given (N, 2) points, or of num_points random points in [0,1]x[0,1].
+    Node i is point i.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    points = np.asarray(points, dtype=np.float64) if points is not None else rng.random((num_points, 2))
+    simplices = Delaunay(points).simplices
+    sides = np.sort(np.concatenate((simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]])), axis=1).astype(np.int64)
+    keys = np.unique(sides[:, 0] * len(points) + sides[:, 1]) # Every side once, although most belong to two triangles
+    edges = np.stack(np.divmod(keys, len(points)), axis=1)
+    arrays = GraphArrays.from_edges(edges, points, np.arange(len(points)))
+    return Landscape(arrays, random_patch_types(len(points), probability_tree, rng))
+
+
+def from_raster(raster, tree_values=(RASTER_TREE,), rock_values=(RASTER_ROCK,), diagonal=False):
+    """
+    Imports a 2D raster of land cover codes. Every cell with one of the tree_values or rock_values becomes a node,
+    with the ID row * columns + column, connected to the neighboring cells (4, or 8 with diagonal) that are nodes too.
+    All other cells are no-data and left out. A land cell without neighboring land cells is kept as a node without edges.
+    """
+    raster = np.asarray(raster)
+    if raster.ndim != 2:
+        raise ValueError(f"A raster must have 2 dimensions, not {raster.ndim}")
+    trees = np.isin(raster, tree_values)
+    valid = trees | np.isin(raster, rock_values)
+    edges = _grid_edges(valid, SQUARE_OFFSETS + (DIAGONAL_OFFSETS if diagonal else ()))
+    positions = _grid_positions(*raster.shape)[valid.reshape(-1)]
+    arrays = GraphArrays.from_edges(edges, positions, np.flatnonzero(valid))
+    return Landscape(arrays, np.where(trees[valid], TREE, ROCK))
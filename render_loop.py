@@ -0,0 +1,118 @@
+"""
+This module provides RenderProcess, which shows the frames of a simulation in a separate process.
+
+The simulation publishes frames to a bounded queue and keeps running. The render process draws at most
+target_fps frames per second: when it falls behind it coalesces the waiting frames and only draws the newest,
+and when the queue is full new frames are dropped. Frames that must be saved as snapshots are never dropped,
+the simulation waits for room in the queue instead, as long as the render process is alive and at most timeout seconds.
+"""
+
+import multiprocessing
+import queue
+import time
+import visualiser_random_forest_graph as vis
+
+ALIVE_CHECK_INTERVAL = 0.5 # Seconds between two checks that the render process is alive while waiting for it
+
+
+def _render(frames, finished, edges, positions, target_fps, wait_close, nodes):
+    """Draws the frames of the queue until the closing sentinel (None) arrives, and then sets finished."""
+    visual = vis.Visualiser(edges, pos_nodes=positions, frame_pause=0, nodes=nodes)
+    interval = 1 / target_fps
+    closing = False
+    while not closing:
+        started = time.perf_counter()
+        batch = [frames.get()]
+        while True:
+            try:
+                batch.append(frames.get_nowait())
+            except queue.Empty:
+                break
+        if batch[-1] is None:
+            closing = True
+            batch.pop()
+
+        for step, colour_map, fire_fighter_positions, snapshot_file in batch:
+            if snapshot_file is not None:
+                visual.update_frame(colour_map, fire_fighter_positions)
+                visual.save_snapshot(snapshot_file)
+        if batch:
+            step, colour_map, fire_fighter_positions, snapshot_file = batch[-1]
+            if snapshot_file is None:
+                visual.update_frame(colour_map, fire_fighter_positions)
+
+        remaining = interval - (time.perf_counter() - started)
+        if remaining > 0 and not closing:
+            time.sleep(remaining)
+    finished.set()
+    if wait_close:
+        visual.wait_close()
+
+
+class RenderProcess:
+    """Publishes simulation frames to a Visualiser running in its own process."""
+    def __init__(self, edges, positions, target_fps=5, queue_size=4, wait_close=True, nodes=None, timeout=30):
+        """
+        Parameters
+        ----------
+        edges, positions, nodes:
+            The edges, node positions and nodes (including nodes without edges) given to the Visualiser.
+        target_fps: float, default 5
+            Maximum number of frames drawn per second.
+        queue_size: int, default 4
+            Number of frames that can wait to be drawn before new frames are dropped.
+        wait_close: bool, default True
+            Whether close waits for the window to be closed by the user after the last frame.
+        timeout: float, default 30
+            Seconds to wait for room in the queue for a snapshot frame, and for the last frames to be drawn by close.
+        """
+        context = multiprocessing.get_context("spawn") # GUI toolkits do not survive a fork
+        self.frames = context.Queue(queue_size)
+        self.finished = context.Event()
+        self.dropped_frames = 0
+        self.wait_close = wait_close
+        self.timeout = timeout
+        self.process = context.Process(target=_render, args=(self.frames, self.finished, edges, positions, target_fps, wait_close, nodes), daemon=True)
+        self.process.start()
+
+    def wants_frame(self):
+        """Returns whether a published frame would currently be drawn instead of dropped."""
+        return not self.frames.full()
+
+    def publish(self, step:int, colour_map, fire_fighter_positions, snapshot_file=None):
+        """Publishes a frame, which is dropped if the queue is full unless it has to be saved to snapshot_file."""
+        frame = (step, colour_map, list(fire_fighter_positions), snapshot_file)
+        if snapshot_file is not None:
+            if not self.put(frame, time.monotonic() + self.timeout):
+                raise RuntimeError(f"The render process did not take the frame of step {step} to save as {snapshot_file}")
+            return
+        try:
+            self.frames.put_nowait(frame)
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def put(self, item, deadline:float):
+        """Waits for room in the queue and puts an item in it, and returns False if the render process exited or the deadline passed."""
+        while self.process.is_alive() and time.monotonic() < deadline:
+            try:
+                self.frames.put(item, timeout=ALIVE_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def close(self):
+        """
+        Tells the render process that there are no more frames and waits for it to draw them, for at most timeout seconds,
+        after which it is terminated. With wait_close it then waits until the user closes the window.
+        """
+        deadline = time.monotonic() + self.timeout
+        if self.put(None, deadline):
+            while not self.finished.wait(ALIVE_CHECK_INTERVAL) and self.process.is_alive() and time.monotonic() < deadline:
+                pass
+        if self.wait_close and self.finished.is_set():
+            self.process.join()
+        self.process.join(max(deadline - time.monotonic(), 0))
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
@@ -0,0 +1,118 @@
+"""
+This module streams the statistics of every update step to disk and reads them back lazily for plotting.
+
+A ColumnarSink keeps one raw binary file per statistic in a directory, next to a columns.json describing them,
+and appends to them in fixed-size batches, so the memory used by a simulation stays the same however long it runs.
+The columns are read back as read-only memory maps with load_telemetry, and downsample_minmax reduces a column
+to a fixed number of points while keeping every peak and dip, so plotting a run of 10 million steps draws no more
+points than plotting a run of 100 steps.
+
+Example:
+    >>> graph.run_simulation(10_000_000, visualise=False, telemetry="run.telemetry")
+    >>> graph.show_plot()   # reads run.telemetry lazily
+"""
+
+import json
+import os
+import numpy as np
+
+COLUMNS = ("step", "tree_patches", "rock_patches", "wild_fires", "burned_area", "average_treestats", "fire_fighter_utilisation")
+COLUMNS_FILE = "columns.json"
+
+
+def column_dtype(name:str):
+    """Returns the data type a column is stored with, int64 for steps and counts and float64 for averages and fractions."""
+    return np.dtype(np.float64) if name in ("average_treestats", "fire_fighter_utilisation") else np.dtype(np.int64)
+
+
+class ColumnarSink:
+    """
+    Appends rows of statistics to a directory of column files, in batches of batch_size rows.
+
+    With rows set, the column files already in the directory are cut back to their first rows rows and appended to,
+    which is how the telemetry of a simulation resumed from a checkpoint continues. Otherwise they are started empty.
+    """
+    def __init__(self, path:str, columns=COLUMNS, batch_size=4096, rows=None):
+        self.path = path
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.buffers = {name: np.empty(batch_size, dtype=column_dtype(name)) for name in self.columns}
+        self.buffered = 0
+        os.makedirs(path, exist_ok=True)
+        if rows is not None:
+            for name in self.columns:
+                file_name = os.path.join(path, name + ".bin")
+                size = rows * self.buffers[name].dtype.itemsize
+                if (os.path.getsize(file_name) if os.path.exists(file_name) else 0) < size:
+                    raise ValueError(f"The telemetry in {path} has fewer than {rows} rows of {name} to continue from")
+                if os.path.exists(file_name):
+                    os.truncate(file_name, size)
+        with open(os.path.join(path, COLUMNS_FILE), "w") as description:
+            json.dump({name: self.buffers[name].dtype.str for name in self.columns}, description)
+        self.files = {name: open(os.path.join(path, name + ".bin"), "wb" if rows is None else "ab") for name in self.columns}
+
+    def append(self, *values):
+        """Appends one row, with a value for every column in order."""
+        for name, value in zip(self.columns, values):
+            self.buffers[name][self.buffered] = value
+        self.buffered += 1
+        if self.buffered == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to the column files."""
+        for name in self.columns:
+            self.files[name].write(self.buffers[name][:self.buffered].tobytes())
+            self.files[name].flush()
+        self.buffered = 0
+
+    def close(self):
+        """Writes the buffered rows and closes the column files."""
+        self.flush()
+        for file in self.files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def load_telemetry(path:str):
+    """Returns a dictionary mapping every column of a telemetry directory to a read-only memory map of its values."""
+    with open(os.path.join(path, COLUMNS_FILE), "r") as description:
+        dtypes = {name: np.dtype(dtype) for name, dtype in json.load(description).items()}
+    # Columns are written one after the other, so a column written while reading may be a batch ahead of the others
+    rows = min(os.path.getsize(os.path.join(path, name + ".bin")) // dtype.itemsize for name, dtype in dtypes.items())
+    columns = {}
+    for name, dtype in dtypes.items():
+        if rows == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, name + ".bin"), dtype=dtype, mode="r", shape=(rows,))
+    return columns
+
+
+def downsample_minmax(x, y, max_points=2000):
+    """
+    Reduces a series to at most about max_points points, keeping the minimum and the maximum of every bucket
+    of consecutive points in their original order, so the downsampled line has the same envelope as the full one.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    count = len(y)
+    if count <= max_points:
+        return x, y
+    size = -(-count // max(max_points // 2, 1)) # Points per bucket
+    full = count // size * size
+    buckets = y[:full].reshape(-1, size)
+    starts = np.arange(len(buckets)) * size
+    low = starts + buckets.argmin(axis=1)
+    high = starts + buckets.argmax(axis=1)
+    indices = [np.stack((np.minimum(low, high), np.maximum(low, high)), axis=1).reshape(-1)]
+    if full < count:
+        tail = y[full:]
+        indices.append(np.sort(full + np.array([tail.argmin(), tail.argmax()])))
+    indices = np.concatenate(indices)
+    return x[indices], y[indices]
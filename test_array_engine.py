@@ -0,0 +1,57 @@
+import numpy as np
+import Classes
+import array_engine
+import unittest
+
+class TestArrayForest(unittest.TestCase):
+
+    def setUp(self):
+        # A path graph 0 - 1 - 2 - 3 with only trees
+        edges = [(0, 1), (1, 2), (2, 3)]
+        self.graph = Classes.Graph(edges)
+        self.graph.create_node_list()
+        self.graph.generate_adjacency_list()
+        self.graph.generate_land_patches(1)
+
+    def test_csr_matches_adjacency_list(self):
+        forest = array_engine.ArrayForest.from_graph(self.graph)
+        for i, node in enumerate(forest.node_ids.tolist()):
+            neighbors = forest.node_ids[forest.get_neighbors(i)].tolist()
+            self.assertEqual(neighbors, self.graph.search_adj_list_neighbors(node))
+
+    def test_trees_grow_until_limit(self):
+        forest = array_engine.ArrayForest.from_graph(self.graph)
+        forest.run(20)
+        self.assertTrue(np.all(forest.treestats == 250))
+        self.assertEqual(forest.wild_fires, [0] * 21)
+
+    def test_burning_tree_burns_out_to_rock(self):
+        self.graph.search_landpatches(0).set_is_on_fire(True)
+        forest = array_engine.ArrayForest.from_graph(self.graph, rng=np.random.default_rng(1))
+        # Without any spread, a tree with treestats 100 burns out after 5 steps
+        forest.spread_fire = lambda sources: np.zeros(len(forest.node_ids), dtype=bool)
+        for _ in range(5):
+            forest.update_land()
+        self.assertEqual(forest.patch_type[0], array_engine.ROCK)
+        self.assertFalse(forest.burning[0])
+
+    def test_spread_fire_ignites_neighbors(self):
+        self.graph.search_landpatches(1).set_is_on_fire(True)
+        forest = array_engine.ArrayForest.from_graph(self.graph, probability_spread_fire=1)
+        ignited = forest.spread_fire(np.flatnonzero(forest.burning))
+        self.assertEqual(np.flatnonzero(ignited).tolist(), [0, 2])
+        forest.probability_spread_fire = 0
+        self.assertFalse(forest.spread_fire(np.flatnonzero(forest.burning)).any())
+
+    def test_fire_fighter_extinguishes_fire(self):
+        self.graph.search_landpatches(0).set_is_on_fire(True)
+        self.graph.generate_fire_fighters(1, 0.9, 0.9)
+        self.graph.search_fire_fighters(0).set_current_position(0)
+        forest = array_engine.ArrayForest.from_graph(self.graph)
+        forest.spread_fire = lambda sources: np.zeros(len(forest.node_ids), dtype=bool)
+        forest.update_land()
+        self.assertFalse(forest.burning[0])
+        self.assertEqual(forest.treestats[0], 190)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import warnings
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import Classes
+import array_engine
+import backends
+import unittest
+from unittest import mock
+
+class TestBackends(unittest.TestCase):
+
+    def create_graph(self, seed, num_nodes=400, fire_fighters=10, probability_tree=0.8):
+        graph = Classes.Graph(seed=seed)
+        graph.generate_graph(num_nodes)
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_fire_fighters(fire_fighters)
+        graph.generate_land_patches(probability_tree)
+        graph.initial_ignition(0.1)
+        graph.update_fire_fighter_positions()
+        return graph
+
+    def mean_statistics(self, run, seeds=range(6)):
+        # Mean amount of trees, rocks and fires over the steps after the initial fires, and over the seeds
+        statistics = []
+        for seed in seeds:
+            graph = self.create_graph(seed)
+            tree_patches, rock_patches, wild_fires = run(graph)
+            statistics.append((np.mean(tree_patches[20:]), np.mean(rock_patches[20:]), np.mean(wild_fires)))
+        return np.mean(statistics, axis=0)
+
+    def test_registry(self):
+        self.assertEqual(list(backends.BACKENDS), ["object", "numpy", "numba", "domains"])
+        with self.assertRaises(ValueError):
+            backends.get_backend("fortran")
+        if backends.numba is None:
+            self.assertNotIn("numba", backends.available_backends())
+            with self.assertWarns(RuntimeWarning):
+                self.assertEqual(backends.get_backend("numba").name, "numpy")
+        else:
+            self.assertIs(backends.get_backend("numba").forest_class, backends.JitForest)
+
+    def test_fused_step_matches_array_forest(self):
+        # Without fire fighters and before the first tree burns out, both draw the same numbers for the same outcome
+        for probability_spread_fire in (0, 1):
+            forests = [forest_class.from_graph(self.create_graph(1, fire_fighters=0, probability_tree=1),
+                                               probability_spread_fire=probability_spread_fire)
+                       for forest_class in (array_engine.ArrayForest, backends.JitForest)]
+            for forest in forests:
+                forest.run(6)
+            self.assertEqual(forests[0].wild_fires, forests[1].wild_fires)
+            self.assertEqual(forests[0].tree_patches, forests[1].tree_patches)
+            self.assertTrue(np.array_equal(forests[0].treestats, forests[1].treestats))
+            self.assertTrue(np.array_equal(forests[0].burning, forests[1].burning))
+
+    @unittest.skipUnless(backends.numba is not None, "needs Numba")
+    def test_numba_kernel_matches_interpreter(self):
+        self.assertIsNot(backends.fused_step, backends._fused_step)
+        runs = []
+        for kernel in (backends.fused_step, backends._fused_step):
+            with mock.patch.object(backends, "fused_step", kernel):
+                forest = backends.JitForest.from_graph(self.create_graph(2), probability_spread_fire=0.5)
+                forest.run(20)
+            runs.append((forest.tree_patches, forest.wild_fires, forest.treestats.tolist(), forest.get_fire_fighter_positions()))
+        self.assertEqual(runs[0], runs[1])
+
+    def test_backends_conform(self):
+        def run_backend(name):
+            def run(graph):
+                graph.run_simulation(60, 0.4, visualise=False, synchronous=name == "object", backend=name)
+                return graph.tree_patches, graph.rock_patches, graph.wild_fires
+            return run
+
+        def run_fused(graph):
+            forest = backends.JitForest.from_graph(graph, probability_spread_fire=0.4)
+            forest.run(60)
+            return forest.tree_patches, forest.rock_patches, forest.wild_fires
+
+        reference = self.mean_statistics(run_backend("object"))
+        runs = {name: run_backend(name) for name in backends.available_backends() if name != "object"}
+        runs["fused"] = run_fused # Also without Numba, with the kernel run by the interpreter
+        for name, run in runs.items():
+            np.testing.assert_allclose(self.mean_statistics(run), reference, rtol=0.1, err_msg=name)
+
+    def test_array_backend_writes_back_state(self):
+        graph = self.create_graph(3)
+        graph.run_simulation(30, visualise=False, backend="numpy")
+        self.assertEqual(len(graph.tree_patches), 31)
+        self.assertEqual((graph.tree_count, graph.rock_count, graph.fire_count),
+                         (graph.tree_patches[-1], graph.rock_patches[-1], graph.wild_fires[-1]))
+        with self.assertRaises(ValueError):
+            graph.run_simulation(5, visualise=False, synchronous=True, backend="numpy")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            Classes.Graph(backend="numba").run_simulation(0, visualise=False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+import matplotlib
+matplotlib.use("Agg")
+import benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_suite_results(self):
+        results = benchmarks.run_suite(nodes=(50,), fire_fighters=(1, 100), repeats=1)
+        names = {entry["name"] for entry in results["results"]}
+        self.assertEqual(names, {"generate_graph", "load_graph", "generate_adjacency_list", "generate_land_patches",
+                                 "run_simulation_step", "fire_fighter_heavy_step", "spread_heavy_step", "visualiser_frame"})
+        self.assertTrue(all(entry["seconds"] > 0 for entry in results["results"]))
+        # More fire fighters than nodes are skipped
+        self.assertFalse(any(entry["fire_fighters"] == 100 for entry in results["results"]))
+        json.dumps(results)
+
+    def test_compare(self):
+        baseline = {"results": [{"name": "load_graph", "nodes": 100, "fire_fighters": 0, "seconds": 1.0},
+                                {"name": "generate_graph", "nodes": 100, "fire_fighters": 0, "seconds": 1.0}]}
+        results = {"results": [{"name": "load_graph", "nodes": 100, "fire_fighters": 0, "seconds": 1.2},
+                               {"name": "generate_graph", "nodes": 100, "fire_fighters": 0, "seconds": 1.5},
+                               {"name": "generate_graph", "nodes": 1000, "fire_fighters": 0, "seconds": 9.0}]}
+        regressions = benchmarks.compare(results, baseline, max_regression=0.25)
+        self.assertEqual([entry["name"] for entry in regressions], ["generate_graph"])
+        self.assertAlmostEqual(regressions[0]["ratio"], 1.5)
+        self.assertEqual(benchmarks.compare(results, baseline, 0.25, limits={"generate_graph": 0.6}), [])
+        self.assertEqual(len(benchmarks.compare(results, baseline, 0.1)), 2)
+
+    def test_main_exit_code(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            arguments = ["--nodes", "50", "--fire-fighters", "1", "--repeats", "1", "--no-visualiser", "--output", output]
+            self.assertEqual(benchmarks.main(arguments), 0)
+            with open(output, "r") as data:
+                results = json.load(data)
+            for entry in results["results"]:
+                entry["seconds"] /= 100
+            baseline = os.path.join(directory, "baseline.json")
+            with open(baseline, "w") as data:
+                json.dump(results, data)
+            self.assertEqual(benchmarks.main(arguments + ["--baseline", baseline]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
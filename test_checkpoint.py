@@ -0,0 +1,70 @@
+import os
+import tempfile
+import Classes
+import checkpoint
+import telemetry
+import unittest
+
+class TestCheckpoint(unittest.TestCase):
+
+    def create_graph(self):
+        graph = Classes.Graph(seed=11)
+        graph.generate_graph(120)
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_fire_fighters(6)
+        graph.generate_land_patches(0.8)
+        graph.initial_ignition(0.1)
+        return graph
+
+    def state(self, graph):
+        patches = [(type(land).__name__, getattr(land, "treestats", None), getattr(land, "is_on_fire", None),
+                    getattr(land, "has_fire_fighter", None)) for node, land in sorted(graph.get_landpatches().items())]
+        return (patches, graph.get_fire_fighter_positions(), graph.updates, graph.tree_patches, graph.wild_fires, graph.burned_area,
+                graph.average_treestats, graph.rng.bit_generator.state)
+
+    def test_resume_is_bit_exact(self):
+        for options in ({}, {"synchronous": True}, {"active_frontier": True, "rock_events": True}, {"dispatch_fire_fighters": True}):
+            with tempfile.TemporaryDirectory() as directory:
+                graph = self.create_graph()
+                graph.run_simulation(40, visualise=False, **options)
+                interrupted = self.create_graph()
+                interrupted.run_simulation(25, visualise=False, checkpoint_every=10, checkpoint_dir=directory, **options)
+                self.assertEqual(os.path.basename(checkpoint.latest_checkpoint(directory)), "checkpoint_000000020.npz")
+                resumed = checkpoint.load_checkpoint(checkpoint.latest_checkpoint(directory))
+                self.assertEqual(resumed.current_step, 20)
+                resumed.run_simulation(20, visualise=False, resume=True)
+                self.assertEqual(self.state(resumed), self.state(graph), options)
+
+    def test_resume_continues_telemetry(self):
+        with tempfile.TemporaryDirectory() as directory:
+            uninterrupted = os.path.join(directory, "uninterrupted")
+            self.create_graph().run_simulation(15, visualise=False, telemetry=uninterrupted)
+            streamed = os.path.join(directory, "streamed")
+            self.create_graph().run_simulation(12, visualise=False, telemetry=streamed, checkpoint_every=5, checkpoint_dir=directory)
+            resumed = checkpoint.load_checkpoint(os.path.join(directory, "checkpoint_000000010.npz"))
+            resumed.run_simulation(5, visualise=False, telemetry=streamed, resume=True)
+            expected = telemetry.load_telemetry(uninterrupted)
+            columns = telemetry.load_telemetry(streamed)
+            self.assertEqual(columns["step"].tolist(), list(range(16)))
+            for name, values in expected.items():
+                self.assertEqual(columns[name].tolist(), values.tolist(), name)
+
+    def test_failed_step_writes_outputs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            graph = self.create_graph()
+            update_step = graph.update_step
+            def update_until_seven(step):
+                if step == 7:
+                    raise RuntimeError("step failed")
+                update_step(step)
+            graph.update_step = update_until_seven
+            streamed = os.path.join(directory, "streamed")
+            with self.assertRaises(RuntimeError):
+                graph.run_simulation(10, visualise=False, telemetry=streamed, checkpoint_every=5, checkpoint_dir=directory)
+            self.assertEqual(os.path.basename(checkpoint.latest_checkpoint(directory)), "checkpoint_000000005.npz")
+            self.assertEqual(telemetry.load_telemetry(streamed)["step"].tolist(), list(range(7)))
+            self.assertIsNone(graph.telemetry)
+
+if __name__ == '__main__':
+    unittest.main()
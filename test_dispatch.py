@@ -0,0 +1,57 @@
+from collections import deque
+import numpy as np
+import Classes
+import unittest
+
+class TestFireDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Classes.Graph(seed=5)
+        self.graph.generate_graph(150)
+        self.graph.create_node_list()
+        self.graph.generate_adjacency_list()
+        self.graph.generate_land_patches(1)
+
+    def full_distances(self):
+        # Multi-source BFS from scratch, from every burning patch without a fire fighter
+        sources = [node for node in self.graph.get_nodes()
+                   if self.graph.is_unclaimed_fire(node) and node not in self.graph.dispatcher.claimed]
+        distances = {node: 0 for node in sources}
+        queue = deque(sources)
+        while queue:
+            node = queue.popleft()
+            for neighbor in self.graph.search_adj_list_neighbors(node):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    queue.append(neighbor)
+        return distances
+
+    def test_incremental_field_matches_full_bfs(self):
+        self.graph.run_simulation(0, visualise=False, dispatch_fire_fighters=True)
+        dispatcher = self.graph.dispatcher
+        rng = np.random.default_rng(0)
+        nodes = sorted(self.graph.get_nodes())
+        for _ in range(200):
+            land = self.graph.search_landpatches(nodes[rng.integers(len(nodes))])
+            land.set_is_on_fire(not land.get_is_on_fire())
+            self.assertEqual(dispatcher.distance, self.full_distances())
+            for node, next_hop in dispatcher.next_hop.items():
+                if dispatcher.distance[node] > 0:
+                    self.assertEqual(dispatcher.distance[next_hop], dispatcher.distance[node] - 1)
+                    self.assertIn(next_hop, self.graph.search_adj_list_neighbors(node))
+
+    def test_fire_fighter_walks_to_distant_fire(self):
+        self.graph.generate_fire_fighters(1)
+        fire_fighter = self.graph.search_fire_fighters(0)
+        start = fire_fighter.get_current_position()
+        fire = max(self.graph.get_nodes(), key=lambda node: abs(node - start))
+        self.graph.search_landpatches(fire).set_is_on_fire(True)
+        self.graph.run_simulation(0, visualise=False, dispatch_fire_fighters=True)
+        distance = self.graph.dispatcher.distance[start]
+        for _ in range(distance):
+            fire_fighter.move()
+        self.assertEqual(fire_fighter.get_current_position(), fire)
+        self.assertNotIn(fire, self.graph.dispatcher.next_hop)
+
+if __name__ == '__main__':
+    unittest.main()
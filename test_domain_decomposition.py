@@ -0,0 +1,122 @@
+import os
+import signal
+import time
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import Classes
+import array_engine
+import domain_decomposition
+import graph_helper as gh
+import unittest
+
+class TestDomainDecomposition(unittest.TestCase):
+
+    def create_graph(self, seed, num_nodes=400, fire_fighters=10):
+        graph = Classes.Graph(seed=seed)
+        graph.generate_graph(num_nodes)
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_fire_fighters(fire_fighters)
+        graph.generate_land_patches(0.8)
+        graph.initial_ignition(0.1)
+        graph.update_fire_fighter_positions()
+        return graph
+
+    def test_spatial_partition(self):
+        arrays = gh.voronoi_arrays(1000, rng=np.random.default_rng(1))
+        domain_of = domain_decomposition.partition(arrays.offsets, arrays.indices, 6, arrays.positions)
+        sizes = np.bincount(domain_of)
+        self.assertEqual(len(sizes), 6)
+        self.assertLessEqual(sizes.max() - sizes.min(), 1)
+        # Domains are compact, so far fewer edges cross them than a random split would cut
+        cut = domain_decomposition.cut_edges(arrays.offsets, arrays.indices, domain_of)
+        self.assertLess(cut, 0.2 * len(arrays.edges))
+
+    def test_graph_partition_without_positions(self):
+        arrays = gh.voronoi_arrays(1000, rng=np.random.default_rng(2))
+        domain_of = domain_decomposition.partition(arrays.offsets, arrays.indices, 4)
+        sizes = np.bincount(domain_of)
+        self.assertEqual(len(sizes), 4)
+        self.assertLessEqual(sizes.max() - sizes.min(), 1)
+        self.assertLess(domain_decomposition.cut_edges(arrays.offsets, arrays.indices, domain_of), 0.2 * len(arrays.edges))
+
+    def test_fire_crosses_domain_boundary(self):
+        # A path graph 0 - 1 - 2 - 3 split into {0, 1} and {2, 3}, with a fire at node 1
+        graph = Classes.Graph([(0, 1), (1, 2), (2, 3)], pos_nodes={0: (0, 0), 1: (1, 0), 2: (2, 0), 3: (3, 0)})
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_land_patches(1)
+        graph.search_landpatches(1).set_is_on_fire(True)
+        with domain_decomposition.DomainForest.from_graph(graph, probability_spread_fire=1, num_domains=2) as forest:
+            forest.run(1)
+            self.assertEqual(forest.domain_of.tolist(), [0, 0, 1, 1])
+        self.assertEqual(forest.burning.tolist(), [True, True, True, False])
+        self.assertEqual(forest.wild_fires, [1, 3])
+
+    def test_fire_fighters_migrate(self):
+        # A fire fighter in domain {0, 1} next to a fire at node 2 in domain {2, 3}
+        graph = Classes.Graph([(0, 1), (1, 2), (2, 3)], pos_nodes={0: (0, 0), 1: (1, 0), 2: (2, 0), 3: (3, 0)})
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_land_patches(1)
+        graph.search_landpatches(2).set_is_on_fire(True)
+        graph.generate_fire_fighters(1)
+        graph.search_fire_fighters(0).set_current_position(1)
+        with domain_decomposition.DomainForest.from_graph(graph, probability_spread_fire=0, num_domains=2) as forest:
+            forest.run(1)
+            self.assertEqual(forest.get_fire_fighter_positions(), [2])
+            forest.run(1) # Now moved by the worker of the other domain, and staying at the fire
+            self.assertEqual(forest.get_fire_fighter_positions(), [2])
+            self.assertTrue(forest.has_fire_fighter[2])
+
+    def test_reproducible_and_equivalent_to_serial(self):
+        def mean_statistics(create_forest):
+            statistics = []
+            for seed in range(6):
+                forest = create_forest(self.create_graph(seed))
+                forest.run(60)
+                forest.close()
+                self.assertEqual(forest.tree_patches[-1], forest.count_patches()[0])
+                statistics.append((np.mean(forest.tree_patches[20:]), np.mean(forest.rock_patches[20:]), np.mean(forest.wild_fires)))
+            return np.mean(statistics, axis=0)
+
+        runs = []
+        for _ in range(2):
+            with domain_decomposition.DomainForest.from_graph(self.create_graph(7), num_domains=3) as forest:
+                forest.run(30)
+            runs.append((forest.tree_patches, forest.wild_fires, forest.get_fire_fighter_positions()))
+        self.assertEqual(runs[0], runs[1])
+
+        serial = mean_statistics(lambda graph: array_engine.ArrayForest.from_graph(graph, probability_spread_fire=0.4))
+        parallel = mean_statistics(lambda graph: domain_decomposition.DomainForest.from_graph(graph, probability_spread_fire=0.4, num_domains=4))
+        np.testing.assert_allclose(parallel, serial, rtol=0.1)
+
+    def test_dead_worker_raises(self):
+        forest = domain_decomposition.DomainForest.from_graph(self.create_graph(4), num_domains=2)
+        forest.run(2)
+        forest.workers[1].kill()
+        started = time.perf_counter()
+        with self.assertRaises(domain_decomposition.DomainError):
+            forest.run(5)
+        self.assertLess(time.perf_counter() - started, 10)
+        self.assertEqual((forest.workers, forest.blocks), ([], {}))
+
+    @unittest.skipUnless(hasattr(signal, "SIGSTOP"), "needs SIGSTOP to hang a worker")
+    def test_stuck_worker_times_out(self):
+        forest = domain_decomposition.DomainForest.from_graph(self.create_graph(4), num_domains=2, timeout=1)
+        self.addCleanup(forest.close)
+        forest.run(2)
+        os.kill(forest.workers[1].pid, signal.SIGSTOP)
+        with self.assertRaises(domain_decomposition.DomainError):
+            forest.run(5)
+        self.assertEqual((forest.workers, forest.blocks), ([], {}))
+
+    def test_domains_backend(self):
+        graph = self.create_graph(5)
+        graph.run_simulation(20, visualise=False, backend="domains")
+        self.assertEqual(len(graph.wild_fires), 21)
+        self.assertEqual((graph.tree_count, graph.fire_count), (graph.tree_patches[-1], graph.wild_fires[-1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import numpy as np
+import ensemble
+import headless
+import unittest
+
+class TestEnsemble(unittest.TestCase):
+
+    def setUp(self):
+        self.values = np.random.default_rng(0).integers(0, 20, (500, 30))
+
+    def test_streaming_statistics(self):
+        statistics = ensemble.StreamingStatistics(30)
+        for values in self.values:
+            statistics.add(values)
+        np.testing.assert_allclose(statistics.mean, self.values.mean(axis=0))
+        np.testing.assert_allclose(statistics.variance(), self.values.var(axis=0, ddof=1))
+        np.testing.assert_allclose(statistics.quantile(0.5), np.median(self.values, axis=0), atol=1)
+
+    def test_merge_matches_single_pass(self):
+        single = ensemble.StreamingStatistics(30)
+        first = ensemble.StreamingStatistics(30)
+        second = ensemble.StreamingStatistics(30, bins=4)
+        for i, values in enumerate(self.values):
+            single.add(values)
+            (first if i % 3 else second).add(values)
+        first.merge(second)
+        np.testing.assert_allclose(first.mean, single.mean)
+        np.testing.assert_allclose(first.variance(), single.variance())
+        np.testing.assert_array_equal(first.histogram[:, :20], single.histogram[:, :20])
+
+    def test_ensemble_is_reproducible(self):
+        scenario = dict(headless.DEFAULT_SCENARIO, nodes=30, fire_fighters=2, steps=10)
+        first = ensemble.run_ensemble(scenario, 4, seed=7, max_workers=1)
+        second = ensemble.run_ensemble(scenario, 4, seed=7, max_workers=1)
+        self.assertEqual(first.replicas, 4)
+        np.testing.assert_array_equal(first.statistics["wild_fires"].mean, second.statistics["wild_fires"].mean)
+
+    def test_bin_width_follows_graph_size(self):
+        scenario = dict(headless.DEFAULT_SCENARIO, nodes=2000, landscape="square", steps=3) # A 45 x 45 lattice
+        result = ensemble.run_ensemble(scenario, 2, seed=1, max_workers=1)
+        for statistics in result.statistics.values():
+            self.assertEqual(statistics.bin_width, 8)
+            self.assertEqual(statistics.histogram.shape[1], ensemble.HISTOGRAM_BINS)
+
+if __name__ == '__main__':
+    unittest.main()
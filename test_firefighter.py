@@ -60,5 +60,31 @@ class TestFireFighter(unittest.TestCase):
             # Reset the fire for the next iteration if needed
             fire_patch.set_is_on_fire(False)
 
+    def test_position_index(self):
+        self.fire_fighter.set_current_position(0)
+        fire_patch = self.graph.search_landpatches(1)
+        fire_patch.set_is_on_fire(True)
+
+        # Move onto the fire, and claim it on the next move
+        self.fire_fighter.move()
+        self.fire_fighter.move()
+        self.assertEqual(self.graph.get_fire_fighters_at(1), [self.fire_fighter])
+        self.assertEqual(self.graph.get_fire_fighters_at(0), [])
+        self.assertEqual(self.graph.get_fire_fighter_positions(), [1])
+        self.assertTrue(fire_patch.get_has_fire_fighter())
+
+        # Leaving the patch releases it
+        self.fire_fighter.set_current_position(0)
+        self.assertFalse(fire_patch.get_has_fire_fighter())
+        self.assertEqual(self.graph.get_fire_fighters_at(1), [])
+
+    def test_fire_fighters_replaced_directly(self):
+        replacement = Classes.FireFighter(0, self.graph, 5, 0.5)
+        self.graph.get_fire_fighters()[0] = replacement # Same amount of fire fighters, another one at another node
+        self.graph.update_fire_fighter_positions()
+        self.assertEqual(self.graph.get_fire_fighter_positions(), [5])
+        self.assertEqual(self.graph.get_fire_fighters_at(5), [replacement])
+        self.assertEqual(self.graph.get_fire_fighters_at(self.fire_fighter.get_current_position()), [])
+
 if __name__ == '__main__':
     unittest.main()
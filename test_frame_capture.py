@@ -0,0 +1,63 @@
+import os
+import tempfile
+import numpy as np
+import Classes
+import frame_capture
+import unittest
+
+class TestFrameCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.frames")
+        self.graph = Classes.Graph(seed=4)
+        self.graph.generate_graph(40)
+        self.graph.create_node_list()
+        self.graph.generate_adjacency_list()
+        self.graph.generate_fire_fighters(2)
+        self.graph.generate_land_patches(0.8)
+        self.graph.initial_ignition(0.2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_recorded_frames_match_colormap(self):
+        for options in ({}, {"synchronous": True}, {"active_frontier": True, "rock_events": True}):
+            graph = Classes.Graph(seed=4)
+            graph.generate_graph(40)
+            graph.create_node_list()
+            graph.generate_adjacency_list()
+            graph.generate_fire_fighters(2)
+            graph.generate_land_patches(0.8)
+            graph.initial_ignition(0.2)
+            for step in range(1, 16): # One step at a time, to compare every recorded frame
+                graph.run_simulation(1, 0.5, visualise=False, record_frames=self.path, resume=step > 1, **(options if step == 1 else {}))
+                recorded, frames = frame_capture.load_frames(self.path)
+                self.assertEqual(frames["step"].tolist(), [step - 1, step])
+                node_ids = recorded["node_ids"]
+                colours = frames[-1]["colours"]
+                coloured = colours != frame_capture.NO_COLOUR
+                graph.generate_colormap()
+                expected = {node: int(value) for node, value in graph.get_colormap().items()}
+                self.assertEqual(dict(zip(node_ids[coloured].tolist(), colours[coloured].tolist())), expected, (options, step))
+                self.assertEqual(node_ids[frames[-1]["fire_fighters"]].tolist(), graph.get_fire_fighter_positions())
+            self.assertIsNone(graph.colours)
+
+    def test_export_to_png_files(self):
+        self.graph.run_simulation(2, visualise=False, record_frames=self.path)
+        output = os.path.join(self.directory.name, "frames")
+        files = frame_capture.export_frames(self.path, output, max_workers=1)
+        self.assertEqual(len(files), 3)
+        self.assertTrue(all(os.path.exists(file) for file in files))
+
+    def test_export_to_gif(self):
+        from PIL import Image
+
+        self.graph.run_simulation(4, visualise=False, record_frames=self.path)
+        output = os.path.join(self.directory.name, "run.gif")
+        frame_capture.export_frames(self.path, output, max_workers=1)
+        with Image.open(output) as gif:
+            self.assertEqual(gif.n_frames, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import Classes
+import unittest
+
+class TestGraph(unittest.TestCase):
+
+    def create_graph(self, seed=None, num_nodes=6):
+        # A path graph 0 - 1 - ... - num_nodes-1 with only trees and a fire at node 0
+        edges = [(i, i + 1) for i in range(num_nodes - 1)]
+        graph = Classes.Graph(edges, seed=seed)
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_land_patches(1)
+        graph.search_landpatches(0).set_is_on_fire(True)
+        return graph
+
+    def burning_nodes(self, graph):
+        return [node for node in graph.get_nodes() if isinstance(graph.search_landpatches(node), Classes.Treepatch)
+                and graph.search_landpatches(node).get_is_on_fire()]
+
+    def test_same_seed_gives_same_simulation(self):
+        results = []
+        for _ in range(2):
+            graph = Classes.Graph(seed=42)
+            graph.generate_graph(50)
+            graph.create_node_list()
+            graph.generate_adjacency_list()
+            graph.generate_fire_fighters(3)
+            graph.generate_land_patches(0.7)
+            graph.initial_ignition(0.2)
+            graph.run_simulation(30, visualise=False)
+            results.append((graph.get_edges(), graph.tree_patches, graph.wild_fires, graph.get_fire_fighter_positions()))
+        self.assertEqual(results[0], results[1])
+
+    def test_synchronous_step_spreads_one_hop(self):
+        graph = self.create_graph()
+        graph.run_simulation(1, probability_spread_fire=1, visualise=False, synchronous=True)
+        self.assertEqual(sorted(self.burning_nodes(graph)), [0, 1])
+        self.assertEqual(graph.wild_fires, [1, 2])
+
+    def test_asynchronous_step_depends_on_order(self):
+        graph = self.create_graph()
+        graph.run_simulation(1, probability_spread_fire=1, visualise=False)
+        # Nodes are updated in increasing order, so the fire runs through the whole path in one step
+        self.assertEqual(sorted(self.burning_nodes(graph)), list(range(6)))
+
+    def test_active_frontier_matches_full_update(self):
+        states = []
+        for active_frontier in (False, True):
+            graph = Classes.Graph(seed=3)
+            graph.generate_graph(200)
+            graph.create_node_list()
+            graph.generate_adjacency_list()
+            graph.generate_fire_fighters(4)
+            graph.generate_land_patches(0.9)
+            graph.initial_ignition(0.05)
+            graph.run_simulation(80, visualise=False, synchronous=True, active_frontier=active_frontier)
+            states.append(([(type(land), getattr(land, "treestats", None)) for node, land in sorted(graph.get_landpatches().items())],
+                           graph.wild_fires, graph.get_fire_fighter_positions()))
+        self.assertEqual(states[0], states[1])
+
+    def test_fully_grown_trees_leave_frontier(self):
+        graph = self.create_graph()
+        graph.search_landpatches(0).set_is_on_fire(False)
+        graph.run_simulation(20, visualise=False, active_frontier=True)
+        self.assertEqual(graph.active_patches, set())
+
+    def test_scheduled_rock_regrowth(self):
+        for active_frontier in (True, False):
+            graph = Classes.Graph(seed=11)
+            graph.generate_graph(300)
+            graph.create_node_list()
+            graph.generate_adjacency_list()
+            graph.generate_land_patches(0)
+            rocks = len(graph.get_nodes())
+            graph.run_simulation(100, visualise=False, active_frontier=active_frontier, rock_events=True)
+            actual_rocks = sum(isinstance(land, Classes.Rockpatch) for land in graph.get_landpatches().values())
+            self.assertEqual(graph.rock_patches[-1], actual_rocks)
+            # Every rock becomes a tree with a 1% chance per step, so about 0.99**100 of them are left
+            self.assertAlmostEqual(actual_rocks / rocks, 0.99 ** 100, delta=0.1)
+            for land in graph.get_landpatches().values():
+                if isinstance(land, Classes.Rockpatch):
+                    self.assertGreater(land.convert_step, 100)
+            # Only the rocks still waiting to become trees have an event
+            self.assertEqual(len(graph.rock_events), actual_rocks)
+
+    def test_render_process_saves_requested_snapshots(self):
+        graph = self.create_graph(seed=2)
+        with tempfile.TemporaryDirectory() as directory:
+            graph.run_simulation(6, target_fps=1000, snapshot_every=2,
+                                 snapshot_file=os.path.join(directory, "step_{step}.png"),
+                                 final_snapshot_file=os.path.join(directory, "final.png"))
+            self.assertEqual(sorted(os.listdir(directory)), ["final.png", "step_2.png", "step_4.png"])
+
+    def test_live_counters_match_recount(self):
+        for options in ({}, {"synchronous": True}, {"active_frontier": True, "rock_events": True}, {"dispatch_fire_fighters": True}):
+            graph = Classes.Graph(seed=8)
+            graph.generate_graph(150)
+            graph.create_node_list()
+            graph.generate_adjacency_list()
+            graph.generate_fire_fighters(5)
+            graph.generate_land_patches(0.8)
+            graph.initial_ignition(0.1)
+            graph.run_simulation(40, visualise=False, **options)
+            counters = (graph.tree_count, graph.rock_count, graph.fire_count, graph.fighting_fire_fighters)
+            treestats_total = graph.treestats_total
+            graph.recount()
+            self.assertEqual(counters, (graph.tree_count, graph.rock_count, graph.fire_count, graph.fighting_fire_fighters))
+            self.assertAlmostEqual(treestats_total, graph.treestats_total) # Skill boosts make the treestats floats
+            self.assertEqual(len(graph.burned_area), 41)
+            self.assertTrue(all(0 <= value <= 1 for value in graph.fire_fighter_utilisation))
+
+    def test_patches_change_kind_in_place(self):
+        for synchronous in (False, True):
+            graph = self.create_graph(seed=4, num_nodes=2)
+            patches = dict(graph.get_landpatches())
+            graph.search_landpatches(0).set_treestats(10)
+            graph.run_simulation(1, probability_spread_fire=0, visualise=False, synchronous=synchronous)
+            self.assertIsInstance(graph.search_landpatches(0), Classes.Rockpatch)
+            self.assertIsNone(graph.search_landpatches(0).treestats)
+            self.assertEqual(graph.rock_count, 1)
+            graph.search_landpatches(0).mutate()
+            graph.commit_next_state()
+            self.assertIsInstance(graph.search_landpatches(0), Classes.Treepatch)
+            self.assertEqual((graph.search_landpatches(0).get_treestats(), graph.search_landpatches(0).get_is_on_fire()), (100, False))
+            self.assertTrue(all(graph.search_landpatches(node) is patches[node] for node in patches))
+            self.assertIs(patches[0].get_neighbors(), graph.search_adj_list_neighbors(0))
+            self.assertFalse(hasattr(patches[0], "__dict__"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import numpy as np
+from scipy.spatial import Voronoi
+import Classes
+import graph_helper as gh
+import unittest
+
+class TestGraphHelper(unittest.TestCase):
+
+    def test_voronoi_dual_matches_scipy(self):
+        points = np.random.default_rng(3).random((200, 2))
+        voronoi = Voronoi(points)
+        expected = {frozenset(map(tuple, np.round(voronoi.vertices[[i, j]], 9))) for i, j in voronoi.ridge_vertices if i >= 0 and j >= 0}
+        vertices, ridges = gh._voronoi_dual(points)
+        self.assertEqual({frozenset(map(tuple, np.round(vertices[[i, j]], 9))) for i, j in ridges}, expected)
+
+    def test_voronoi_arrays(self):
+        for minpoints in (4, 30, 2000):
+            arrays = gh.voronoi_arrays(minpoints, rng=np.random.default_rng(minpoints))
+            self.assertGreaterEqual(arrays.num_nodes(), minpoints)
+            self.assertTrue(np.all((arrays.positions >= 0) & (arrays.positions <= 1)))
+            self.assertEqual(arrays.node_ids.tolist(), list(range(arrays.num_nodes())))
+        self.assertTrue(gh.edges_planar(arrays.edge_list()))
+
+    def test_generate_graph_keeps_arrays(self):
+        graph = Classes.Graph(seed=5)
+        graph.generate_graph(100)
+        graph.create_node_list()
+        self.assertEqual(sorted(graph.get_nodes()), graph.graph_arrays.node_ids.tolist())
+        self.assertEqual(set(graph.get_positions()), graph.get_nodes())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import os
+import tempfile
+import numpy as np
+import Classes
+import graph_io
+import unittest
+
+class TestGraphIO(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_csr_matches_adjacency_list(self):
+        edges = [(5, 1), (1, 2), (2, 5), (7, 1), (2, 7)]
+        graph = Classes.Graph(list(edges))
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        arrays = graph_io.GraphArrays.from_edges(edges)
+        for i, node in enumerate(arrays.node_ids.tolist()):
+            neighbors = arrays.node_ids[arrays.indices[arrays.offsets[i]:arrays.offsets[i + 1]]].tolist()
+            self.assertEqual(neighbors, graph.search_adj_list_neighbors(node))
+
+    def test_save_and_load(self):
+        arrays = graph_io.GraphArrays.from_edges([(0, 1), (1, 2)], {0: (0.0, 0.0), 1: (0.5, 0.5), 2: (1.0, 1.0)})
+        for name in ("graph.npz", "graph"):
+            path = os.path.join(self.directory.name, name)
+            arrays.save(path)
+            loaded = graph_io.GraphArrays.load(path)
+            np.testing.assert_array_equal(loaded.indices, arrays.indices)
+            self.assertEqual(loaded.position_map(), arrays.position_map())
+            self.assertEqual(loaded.edge_list(), [(0, 1), (1, 2)])
+
+    def test_cached_load_graph(self):
+        graph = Classes.Graph()
+        graph.load_graph("graph1.dat")
+        for _ in range(2):
+            cached = Classes.Graph()
+            cached.load_graph("graph1.dat", use_cache=True, cache_dir=self.directory.name)
+            self.assertEqual(cached.get_edges(), graph.get_edges())
+        self.assertIsInstance(cached.graph_arrays.indices, np.memmap)
+        self.assertEqual(len(os.listdir(self.directory.name)), 2) # One cache entry and the index
+
+    def test_parse_report(self):
+        path = os.path.join(self.directory.name, "graph.dat")
+        with open(path, "w") as data:
+            data.write("# comment\n(1, 2)\n2,3\n\n3, x\n1,2,3\n  -4 , +5 \n1_0,2")
+        for chunk_size in (4, 1 << 20):
+            edges, report = graph_io.parse_edges_text(path, chunk_size=chunk_size)
+            self.assertEqual(edges.tolist(), [[1, 2], [2, 3], [-4, 5], [10, 2]])
+            self.assertEqual((report.lines, report.edges, report.ignored, report.malformed), (8, 4, 2, 2))
+            self.assertEqual([line for line, reason in report.diagnostics], [5, 6])
+        graph = Classes.Graph()
+        graph.load_graph(path)
+        self.assertEqual(graph.get_edges(), [(1, 2), (2, 3), (-4, 5), (10, 2)])
+        cached = graph_io.load_cached(path, self.directory.name)
+        self.assertEqual(cached.parse_report.diagnostics, graph.parse_report.diagnostics)
+        for _ in range(2): # Converting the file, then reading the cache
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                Classes.Graph().load_graph(path, use_cache=True, cache_dir=self.directory.name)
+            self.assertIn(graph.parse_report.summary(), output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
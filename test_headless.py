@@ -0,0 +1,33 @@
+import csv
+import os
+import tempfile
+import headless
+import unittest
+
+class TestHeadless(unittest.TestCase):
+
+    def test_flags_override_defaults(self):
+        scenario = headless.parse_arguments(["--graph-file", "graph1.dat", "--steps", "3000", "--fire-fighters", "1"])
+        self.assertEqual(scenario["graph_file"], "graph1.dat")
+        self.assertIsNone(scenario["nodes"])
+        self.assertEqual(scenario["steps"], 3000)
+        self.assertEqual(scenario["tree_probability"], headless.DEFAULT_SCENARIO["tree_probability"])
+
+    def test_invalid_scenario_is_rejected(self):
+        scenario = dict(headless.DEFAULT_SCENARIO, tree_probability=1.5)
+        with self.assertRaises(headless.ScenarioError):
+            headless.check_scenario(scenario)
+
+    def test_main_writes_stats(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "stats.csv")
+            status = headless.main(["--graph-file", "graph1.dat", "--fire-fighters", "1", "--steps", "5",
+                                    "--runs", "2", "--output", output])
+            self.assertEqual(status, 0)
+            with open(output, newline="") as data:
+                rows = list(csv.reader(data))
+        self.assertEqual(rows[0], ["run", "step", "tree_patches", "rock_patches", "wild_fires"])
+        self.assertEqual(len(rows), 1 + 2 * 6)
+
+if __name__ == '__main__':
+    unittest.main()
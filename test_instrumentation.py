@@ -0,0 +1,57 @@
+import sys
+import Classes
+import instrumentation
+import unittest
+
+class TestInstrumentation(unittest.TestCase):
+
+    def create_graph(self):
+        graph = Classes.Graph(seed=9)
+        graph.generate_graph(100)
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_fire_fighters(4)
+        graph.generate_land_patches(0.9)
+        graph.initial_ignition(0.1)
+        return graph
+
+    def test_instrumented_run_is_unchanged(self):
+        graph = self.create_graph()
+        self.assertIsNone(graph.run_simulation(30, visualise=False))
+        instrumented = self.create_graph()
+        result = instrumented.run_simulation(30, visualise=False, instrument=True)
+        self.assertEqual(instrumented.wild_fires, graph.wild_fires)
+        self.assertEqual(instrumented.rng.bit_generator.state, graph.rng.bit_generator.state)
+        self.assertIsNone(instrumented.instrumentation)
+        self.assertNotIsInstance(instrumented.rng, instrumentation.CountingGenerator)
+
+        self.assertEqual([record["step"] for record in result.records], list(range(1, 31)))
+        summary = result.summary()
+        self.assertGreater(summary["rng_draws"]["total"], summary["spread_attempts"]["total"])
+        self.assertGreater(summary["ignitions"]["total"], 0)
+        self.assertGreater(summary["land_update"]["total"], summary["spread_fire"]["total"])
+
+    def test_profile(self):
+        result = self.create_graph().run_simulation(5, visualise=False, instrument=True, profile=True)
+        self.assertIn("update_step", result.format_summary())
+
+    def test_failed_run_stops_instrumentation(self):
+        graph = self.create_graph()
+        rng = graph.rng
+        def fail(step):
+            raise RuntimeError("step failed")
+        graph.update_step = fail
+        with self.assertRaises(RuntimeError):
+            graph.run_simulation(5, visualise=False, instrument=True, profile=True)
+        self.assertIs(graph.rng, rng)
+        self.assertIsNone(graph.instrumentation)
+        self.assertIsNone(sys.getprofile())
+
+    def test_counting_generator(self):
+        rng = instrumentation.CountingGenerator(Classes.Graph(seed=1).rng)
+        rng.random()
+        rng.integers(0, 10, size=7)
+        self.assertEqual(rng.draws, 8)
+
+if __name__ == '__main__':
+    unittest.main()
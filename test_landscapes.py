@@ -0,0 +1,82 @@
+import os
+import tempfile
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import Classes
+import array_engine
+import headless
+import landscapes
+import unittest
+
+class TestLandscapes(unittest.TestCase):
+
+    def degrees(self, landscape):
+        return np.diff(landscape.arrays.offsets).reshape(-1).tolist()
+
+    def test_lattices(self):
+        self.assertEqual(self.degrees(landscapes.square_lattice(3, 3)), [2, 3, 2, 3, 4, 3, 2, 3, 2])
+        self.assertEqual(self.degrees(landscapes.square_lattice(3, 3, diagonal=True))[4], 8)
+        hexagonal = landscapes.hex_lattice(4, 4)
+        self.assertEqual(max(self.degrees(hexagonal)), 6)
+        positions = hexagonal.arrays.positions
+        lengths = np.linalg.norm(positions[hexagonal.arrays.edges[:, 0]] - positions[hexagonal.arrays.edges[:, 1]], axis=1)
+        np.testing.assert_allclose(lengths, lengths[0]) # All neighbors are equally far apart
+
+    def test_delaunay(self):
+        points = np.array([(0, 0), (1, 0), (0, 1), (1, 1.1)])
+        landscape = landscapes.delaunay(points)
+        self.assertEqual(len(landscape.arrays.edges), 5)
+        self.assertEqual(landscape.arrays.position_map()[3], (1.0, 1.1))
+
+    def test_raster(self):
+        raster = np.array([[1, 1, 0],
+                           [2, 1, 1],
+                           [0, 0, 2]])
+        landscape = landscapes.from_raster(raster)
+        self.assertEqual(landscape.arrays.node_ids.tolist(), [0, 1, 3, 4, 5, 8])
+        self.assertEqual(sorted(landscape.arrays.edge_list()), [(0, 1), (0, 3), (1, 4), (3, 4), (4, 5), (5, 8)])
+        self.assertEqual(landscape.is_tree().tolist(), [True, True, False, True, True, False])
+
+    def test_load_landscape(self):
+        graph = Classes.Graph(seed=2)
+        landscape = landscapes.square_lattice(5, 6, rng=graph.rng)
+        graph.load_landscape(landscape)
+        expected = Classes.Graph(landscape.arrays.edge_list())
+        expected.create_node_list()
+        expected.generate_adjacency_list()
+        self.assertEqual(graph.get_adj_list(), expected.get_adj_list())
+        trees = {node for node in graph.get_nodes() if isinstance(graph.search_landpatches(node), Classes.Treepatch)}
+        self.assertEqual(trees, set(landscape.arrays.node_ids[landscape.is_tree()].tolist()))
+        forest = array_engine.ArrayForest.from_graph(graph)
+        self.assertIs(forest.indices, landscape.arrays.indices)
+
+    def test_isolated_raster_cells(self):
+        # Node 3 is a land cell without land neighbors
+        landscape = landscapes.from_raster([[1, 1, 0, 1], [1, 1, 0, 0], [0, 0, 0, 0]])
+        self.assertEqual(landscape.arrays.node_ids.tolist(), [0, 1, 3, 4, 5])
+        for dispatch_fire_fighters in (False, True):
+            graph = Classes.Graph(seed=3)
+            graph.load_landscape(landscape)
+            self.assertIn(3, graph.get_nodes())
+            graph.generate_fire_fighters(5)
+            graph.initial_ignition(0.5)
+            graph.run_simulation(10, visualise=False, dispatch_fire_fighters=dispatch_fire_fighters)
+            self.assertEqual(len(graph.get_landpatches()), 5)
+        import visualiser_random_forest_graph as vis
+        graph.generate_colormap()
+        visual = vis.Visualiser(graph.get_edges(), Colour_map=graph.get_colormap(), pos_nodes=graph.get_positions(), frame_pause=0)
+        visual.update_frame(graph.get_colormap(), graph.get_fire_fighter_positions())
+        visual.close()
+
+    def test_headless_raster(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raster_file = os.path.join(directory, "tile.npy")
+            np.save(raster_file, np.random.default_rng(0).integers(0, 3, (20, 20)))
+            scenario = headless.parse_arguments(["--raster-file", raster_file, "--fire-fighters", "2", "--seed", "1"])
+            headless.check_scenario(scenario)
+            graph = headless.build_graph(scenario, np.random.default_rng(1))
+        self.assertEqual(len(graph.get_landpatches()), len(graph.get_nodes()))
+
+if __name__ == '__main__':
+    unittest.main()
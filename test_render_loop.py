@@ -0,0 +1,38 @@
+import os
+import tempfile
+import time
+os.environ["MPLBACKEND"] = "Agg" # Also used by the spawned render processes
+import render_loop
+import unittest
+
+class TestRenderLoop(unittest.TestCase):
+
+    def setUp(self):
+        self.edges = [(0, 1), (1, 2), (2, 0)]
+        self.positions = {0: (0, 0), 1: (1, 0), 2: (0, 1)}
+        self.colour_map = {0: 1, 1: 2, 2: 0}
+
+    def test_snapshot_and_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = os.path.join(directory, "last.png")
+            renderer = render_loop.RenderProcess(self.edges, self.positions, target_fps=100, wait_close=False)
+            for step in range(5):
+                renderer.publish(step, self.colour_map, [0])
+            renderer.publish(5, self.colour_map, [1], snapshot)
+            renderer.close()
+            self.assertFalse(renderer.process.is_alive())
+            self.assertTrue(os.path.exists(snapshot))
+
+    def test_dead_render_process(self):
+        renderer = render_loop.RenderProcess(self.edges, self.positions, queue_size=1, timeout=5)
+        renderer.process.terminate()
+        renderer.process.join()
+        started = time.perf_counter()
+        renderer.publish(0, self.colour_map, [0])
+        with self.assertRaises(RuntimeError):
+            renderer.publish(1, self.colour_map, [0], "never.png")
+        renderer.close()
+        self.assertLess(time.perf_counter() - started, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import Classes
+import telemetry
+import unittest
+
+class TestTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.telemetry")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_graph(self):
+        graph = Classes.Graph(seed=6)
+        graph.generate_graph(60)
+        graph.create_node_list()
+        graph.generate_adjacency_list()
+        graph.generate_fire_fighters(3)
+        graph.generate_land_patches(0.8)
+        graph.initial_ignition(0.1)
+        return graph
+
+    def test_streamed_statistics_match_lists(self):
+        graph = self.create_graph()
+        graph.run_simulation(25, visualise=False)
+        streamed = self.create_graph()
+        streamed.run_simulation(25, visualise=False, telemetry=telemetry.ColumnarSink(self.path, batch_size=7))
+        self.assertEqual(streamed.wild_fires, [])
+        columns = telemetry.load_telemetry(self.path)
+        self.assertEqual(columns["step"].tolist(), graph.updates)
+        for name in ("tree_patches", "rock_patches", "wild_fires", "burned_area"):
+            self.assertEqual(columns[name].tolist(), getattr(graph, name))
+        np.testing.assert_allclose(columns["average_treestats"], graph.average_treestats)
+        streamed.show_plot()
+
+    def test_downsample_keeps_extremes(self):
+        steps = np.arange(100_001)
+        values = np.sin(steps / 500.0)
+        values[12_345] = 5
+        values[67_890] = -5
+        x, y = telemetry.downsample_minmax(steps, values, 1000)
+        self.assertLessEqual(len(y), 1002)
+        self.assertEqual((y.max(), y.min()), (5, -5))
+        self.assertTrue(np.all(np.diff(x) > 0))
+        np.testing.assert_array_equal(values[x], y)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import numpy as np
+import networkx as nx
+import Classes
+import validation
+import unittest
+
+class TestValidation(unittest.TestCase):
+
+    def test_union_find_matches_networkx(self):
+        rng = np.random.default_rng(0)
+        pairs = rng.integers(0, 500, (400, 2))
+        roots = validation.union_find(500, pairs)
+        graph = nx.Graph(pairs.tolist())
+        graph.add_nodes_from(range(500))
+        for component in nx.connected_components(graph):
+            self.assertEqual(set(roots[list(component)].tolist()), {min(component)})
+
+    def test_report(self):
+        report = validation.validate_edges([(1, 2), (2, 3), (7, 8)])
+        self.assertEqual((report.nodes, report.components, report.largest_component), (5, 2, 3))
+        self.assertFalse(report.is_connected())
+        self.assertIsNone(report.planar)
+        self.assertFalse(validation.validate_edges(nx.complete_graph(5).edges(), check_planar=True).planar)
+
+    def test_report_is_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            graph = Classes.Graph()
+            graph.load_graph("graph1.dat", use_cache=True, cache_dir=directory)
+            report = graph.validate(check_planar=True)
+            self.assertTrue(report.is_connected() and report.planar)
+            graph.create_node_list()
+            graph.generate_adjacency_list()
+            self.assertTrue(graph.is_connected())
+            report_file = os.path.join(graph.graph_arrays.cache_entry, validation.REPORT_FILE)
+            with open(report_file, "w") as data:
+                json.dump(dict(report.to_dict(), components=3), data)
+            cached = Classes.Graph()
+            cached.load_graph("graph1.dat", use_cache=True, cache_dir=directory)
+            self.assertEqual(cached.validate(check_planar=True).components, 3)
+
+if __name__ == '__main__':
+    unittest.main()
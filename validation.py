@@ -0,0 +1,106 @@
+"""
+This module validates graphs before they are simulated: it counts the connected components and optionally checks planarity.
+
+The components are found with an array-based union-find over the edges of a graph_io.GraphArrays, which is built once
+per graph (and reused from Graph.graph_arrays or the binary cache when present). Planarity is only checked when asked,
+as it is by far the most expensive check. When the arrays come from the binary cache (Graph.load_graph with use_cache),
+the report is saved in the cache entry of the graph file, so an unchanged file is only validated once.
+
+Example:
+    >>> graph.load_graph("graph1.dat", use_cache=True)
+    >>> report = graph.validate(check_planar=True)
+    >>> report.is_connected() and report.planar
+    True
+"""
+
+import json
+import os
+import tempfile
+import networkx as nx
+import numpy as np
+from graph_io import GraphArrays
+
+REPORT_FILE = "validation.json"
+
+
+class ValidationReport:
+    """Structure of a graph: its size, its connected components and whether it is planar (None if not checked)."""
+    def __init__(self, nodes:int, edges:int, components:int, largest_component:int, planar=None):
+        self.nodes = nodes
+        self.edges = edges
+        self.components = components
+        self.largest_component = largest_component #Number of nodes in the largest connected component
+        self.planar = planar
+
+    def is_connected(self):
+        """Returns whether all nodes are in one connected component."""
+        return self.components <= 1
+
+    def to_dict(self):
+        """Returns the report as a dictionary that can be saved as JSON."""
+        return {"nodes": self.nodes, "edges": self.edges, "components": self.components,
+                "largest_component": self.largest_component, "planar": self.planar}
+
+    @classmethod
+    def from_dict(cls, values):
+        """Creates a report from a dictionary made by to_dict."""
+        return cls(values["nodes"], values["edges"], values["components"], values["largest_component"], values["planar"])
+
+
+def union_find(num_nodes:int, pairs):
+    """
+    Returns the root (the smallest node index) of the connected component of every node index,
+    given the edges as an (E, 2) array of node indices.
+
+    Every round hooks the root of each edge's larger endpoint onto the smaller root, and then compresses all paths
+    by pointer jumping, so every node points at its root again. Edges inside one set are dropped after every round.
+    Each round is a few linear passes over the arrays, and few rounds are needed.
+    """
+    parent = np.arange(num_nodes, dtype=np.int64)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    first, second = pairs[:, 0], pairs[:, 1]
+    while len(first):
+        first_root, second_root = parent[first], parent[second]
+        crossing = first_root != second_root
+        first, second = first[crossing], second[crossing]
+        first_root, second_root = first_root[crossing], second_root[crossing]
+        np.minimum.at(parent, np.maximum(first_root, second_root), np.minimum(first_root, second_root))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent
+
+
+def validate_arrays(arrays:GraphArrays, check_planar=False):
+    """
+    Returns the ValidationReport of a graph. Planarity is only checked if check_planar is True.
+    A report saved in the cache entry of the arrays is reused, and a new report is saved there.
+    """
+    report_file = os.path.join(arrays.cache_entry, REPORT_FILE) if arrays.cache_entry is not None else None
+    report = None
+    if report_file is not None and os.path.exists(report_file):
+        with open(report_file, "r") as data:
+            report = ValidationReport.from_dict(json.load(data))
+    cached = report is not None and (report.planar is not None or not check_planar)
+
+    if report is None:
+        node_index = np.searchsorted(arrays.node_ids, arrays.edges)
+        roots = union_find(arrays.num_nodes(), node_index)
+        sizes = np.bincount(roots, minlength=arrays.num_nodes())
+        report = ValidationReport(arrays.num_nodes(), len(arrays.edges), int(np.count_nonzero(sizes)), int(sizes.max(initial=0)))
+    if check_planar and report.planar is None:
+        report.planar = nx.is_planar(nx.Graph(arrays.edge_list()))
+
+    if report_file is not None and not cached:
+        # Replaced in one step, so other processes never read a half-written report
+        with tempfile.NamedTemporaryFile("w", dir=arrays.cache_entry, delete=False) as data:
+            json.dump(report.to_dict(), data)
+        os.replace(data.name, report_file)
+    return report
+
+
+def validate_edges(edges, check_planar=False):
+    """Returns the ValidationReport of the graph given by a list of edges."""
+    return validate_arrays(GraphArrays.from_edges(edges), check_planar)
@@ -11,6 +11,9 @@ Python 3.7 or higher.
 
 Notes
 -----
+The nodes and edges are drawn once. Every frame only changes the face colours and fire fighter outlines
+of the existing node collection, and redraws it on top of a cached background (blitting) when the canvas supports it.
+
 This module provided as material for the phase 2 project for DM857, DS830 (2023). 
 """
 
@@ -18,18 +21,22 @@ from __future__ import annotations # to use a class in type hints of its members
 from typing import List, Optional, Dict
 import matplotlib.pyplot as plt
 import networkx as nx
+import numpy as np
 
 class Visualiser:
   """Each instance of this class maintains a window where it displays the status of a given collection of edges and sites forming the graph of a simulation."""
   colour_map={0:plt.cm.Greens,1:plt.cm.Reds}
   no_colour=plt.cm.Greys(100)
+  fire_fighter_colour=(0.0,0.0,1.0,1.0) # blue outline of nodes with a fire fighter
   def __init__(self:Visualiser, 
                edges:List[(int,int)],
                Colour_map: Optional[Dict[int:(int,int)]]={},
                pos_nodes: Optional[Dict[int:Tuple[float,float]]]={},
                node_size : Optional[int] = 100,
                vis_labels: Optional[bool] = False,
-               window_title : Optional[str]=None)->None:
+               window_title : Optional[str]=None,
+               frame_pause : Optional[float]=0.2,
+               nodes : Optional[List[int]]=None)->None:
     """
     Parameters
     ----------
@@ -46,18 +53,24 @@ class Visualiser:
       switch to visualize/hide the labels (used to track the species)
     window_title : Optional[str], default = None
       The title of the window.
+    frame_pause : Optional[float], default = 0.2
+      Seconds the window event loop runs after every frame, 0 to return as soon as the frame is drawn.
+    nodes : Optional[List[int]], default = None
+      All nodes of the graph, including nodes without edges. By default the nodes of pos_nodes and of the edges.
     """
     self._edges = edges
     self._vis_labels = vis_labels
-    self._H = nx.Graph(self._edges)  # create a Graph dict mapping nodes to nbrs
-    self._cmap = [self.no_colour]*self._H.number_of_nodes()
+    self._H = nx.Graph()  # create a Graph dict mapping nodes to nbrs
+    self._H.add_nodes_from(nodes if nodes is not None else pos_nodes)
+    self._H.add_edges_from(self._edges)
+    self._index = {node:i for i,node in enumerate(self._H.nodes())} # node -> position in the node collection
+    self._cmap = self._colours(Colour_map)
     self._lnodes_edges =[]
     self._window_title=window_title
-    for key,val in Colour_map.items():
-      if(val>0):
-        self._cmap[list(self._H.nodes()).index(key)] = self.colour_map[0](val)
-      else:
-        self._cmap[list(self._H.nodes()).index(key)] = self.colour_map[1](-val)
+    self._nodes = None # node collection, created on the first plot
+    self._background = None # canvas without the nodes, used for blitting
+    self._saving = False
+    self._frame_pause = frame_pause
 
     self._node_size = node_size
     # Need to create a layout when doing
@@ -76,6 +89,8 @@ class Visualiser:
     def on_close(_)->None:
       self._is_open = False
     self._fig.canvas.mpl_connect('close_event', on_close )
+    self._canvas = self._fig.canvas
+    self._canvas.mpl_connect('draw_event', self._on_draw)
    
   def is_open(self:Visualiser) -> bool:
     """
@@ -93,15 +108,21 @@ class Visualiser:
     """
     plt.show()
 
+  def _colours(self:Visualiser,Colour_map:Dict[int:int]) -> np.ndarray:
+    """Converts a colour map of node values into an array with the RGBA colour of every node."""
+    cmap = np.tile(self.no_colour,(self._H.number_of_nodes(),1))
+    if Colour_map:
+      keys = np.fromiter((self._index[key] for key in Colour_map.keys()),dtype=np.int64,count=len(Colour_map))
+      vals = np.fromiter(Colour_map.values(),dtype=np.float64,count=len(Colour_map)).astype(np.int64)
+      green = vals>0
+      cmap[keys[green]] = self.colour_map[0](vals[green])
+      cmap[keys[~green]] = self.colour_map[1](-vals[~green])
+    return cmap
+
   def update_node_colours(self:Visualiser,Colour_map:Dict[int:int]) -> None:
     """Informs this visualiser that the status of its colours has been updated."""
     if self.is_open() :
-      self._cmap = [self.no_colour]*self._H.number_of_nodes()
-      for key,val in Colour_map.items():
-        if(val>0):
-          self._cmap[list(self._H.nodes()).index(key)] = self.colour_map[0](val)
-        else:
-          self._cmap[list(self._H.nodes()).index(key)] = self.colour_map[1](-val)
+      self._cmap = self._colours(Colour_map)
     self._replot()
 
   def update_node_edges(self:Visualiser,lab_map:List[int]) -> None:
@@ -109,20 +130,72 @@ class Visualiser:
     self._lnodes_edges=lab_map
     self._replot()
 
+  def update_frame(self:Visualiser,Colour_map:Dict[int:int],lab_map:List[int]) -> None:
+    """Informs this visualiser that both its colours and its labels have been updated, drawing a single frame."""
+    if self.is_open() :
+      self._cmap = self._colours(Colour_map)
+    self._lnodes_edges=lab_map
+    self._replot()
+
+  def save_snapshot(self:Visualiser,file_name:str) -> None:
+    """Saves the current frame to a file, the format given by its extension (e.g. pdf or png)."""
+    if self._nodes is None:
+      self._draw_static()
+    self._update_nodes()
+    self._saving = True
+    self._nodes.set_animated(False)
+    try:
+      self._fig.savefig(file_name)
+    finally:
+      self._nodes.set_animated(self._use_blit())
+      self._saving = False
+
+  def _use_blit(self:Visualiser) -> bool:
+    '''Whether frames are drawn by blitting the nodes on top of a cached background'''
+    return self._canvas.supports_blit
+
+  def _draw_static(self:Visualiser) -> None:
+    '''Draws the edges and creates the node collection, once'''
+    self._fig.clf()
+    ax = self._fig.add_subplot()
+    nx.draw_networkx_edges(self._H, self._pos, arrows=False, ax=ax)
+    self._nodes = nx.draw_networkx_nodes(self._H, self._pos, nodelist=list(self._index),
+                       node_color = self._cmap, node_size = self._node_size,linewidths=1, ax=ax)
+    self._nodes.set_animated(self._use_blit())
+    self._canvas.draw()
+
+  def _on_draw(self:Visualiser,event) -> None:
+    '''Caches the background (everything but the nodes) after every full draw of the canvas'''
+    if self._nodes is None or self._saving or event.canvas is not self._canvas:
+      return
+    if self._use_blit():
+      self._background = self._canvas.copy_from_bbox(self._fig.bbox)
+      self._fig.draw_artist(self._nodes)
+
+  def _update_nodes(self:Visualiser) -> None:
+    '''Sets the face colours and fire fighter outlines of the existing node collection'''
+    edge_colours = self._cmap.copy()
+    line_widths = np.ones(len(self._cmap))
+    if(self._lnodes_edges):
+      fire_fighters = [self._index[i] for i in self._lnodes_edges]
+      edge_colours[fire_fighters] = self.fire_fighter_colour
+      line_widths[fire_fighters] = 2
+    self._nodes.set_facecolor(self._cmap)
+    self._nodes.set_edgecolor(edge_colours)
+    self._nodes.set_linewidth(line_widths)
+
   def _replot(self:Visualiser) -> None:
     '''Plotting facility'''
-    plt.clf()
-    nx.draw_networkx_nodes(self._H, self._pos,
-                       node_color = self._cmap, node_size = self._node_size,linewidths=1)
-    nx.draw_networkx_edges(self._H, self._pos, arrows=False)
-    if(self._lnodes_edges):
-       lcmap=[self._cmap[i] for i in self._lnodes_edges]
-       nx.draw_networkx_nodes(self._H,self._pos,node_color = lcmap,
-                              nodelist=self._lnodes_edges, node_size = self._node_size, edgecolors="blue",linewidths=2)
-    self._fig.canvas.draw()
-    self._fig.canvas.flush_events()
+    if self._nodes is None:
+      self._draw_static()
+    self._update_nodes()
+    if self._use_blit() and self._background is not None:
+      self._canvas.restore_region(self._background)
+      self._fig.draw_artist(self._nodes)
+      self._canvas.blit(self._fig.bbox)
+    else:
+      self._canvas.draw_idle()
+    self._canvas.flush_events()
     plt.show(block=False)
-    plt.savefig('generic_graph_1.pdf')
-    plt.pause(0.2)
-
-  
\ No newline at end of file
+    if self._frame_pause:
+      self._canvas.start_event_loop(self._frame_pause)